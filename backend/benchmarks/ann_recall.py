@@ -0,0 +1,80 @@
+"""Recall and latency of the IVF-flat ANN index against exact search.
+
+Run from the backend directory:
+
+    python -m benchmarks.ann_recall [--vectors 50000] [--dimension 64]
+
+Vectors are drawn around random cluster centres, like embeddings of a
+site's pages around its topics. Queries are fresh draws that are never
+stored, split into one set that tunes n_probe and another that measures
+recall@k, so neither is flattered by finding itself. The default spread
+barely separates the clusters, a hard case that needs many probes;
+`--spread 1.0` is closer to pages grouped by topic.
+"""
+import argparse
+import time
+import numpy as np
+from modules.embeddings.ann_index import IVFFlatIndex
+
+def clustered_vectors(rng, count: int, centres: np.ndarray, spread: float) -> np.ndarray:
+    vectors = centres[rng.integers(0, len(centres), count)] + spread * rng.normal(size=(count, centres.shape[1]))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+def percentile_ms(samples, q: float) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=50000)
+    parser.add_argument('--dimension', type=int, default=64)
+    parser.add_argument('--clusters', type=int, default=200)
+    parser.add_argument('--spread', type=float, default=1.5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--target', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centres = rng.normal(size=(args.clusters, args.dimension))
+    stored = clustered_vectors(rng, args.vectors, centres, args.spread)
+    tuning_queries = clustered_vectors(rng, args.queries, centres, args.spread)
+    eval_queries = clustered_vectors(rng, args.queries, centres, args.spread)
+
+    index = IVFFlatIndex(args.dimension)
+    started = time.perf_counter()
+    for start in range(0, args.vectors, 5000):
+        index.add([f"page-{i}" for i in range(start, min(start + 5000, args.vectors))], stored[start:start + 5000])
+    build_seconds = time.perf_counter() - started
+    lists = len(index.centroids) if index.centroids is not None else 0
+
+    held_out_recall = index.tune(args.target, args.k)
+    held_out_probe = index.n_probe
+    # Stored vectors querying for themselves, for comparison
+    self_recall = index.evaluate_recall(stored[rng.choice(args.vectors, args.queries, replace=False)], args.k)
+    tuned_recall = index.tune(args.target, args.k, queries=tuning_queries)
+    eval_recall = index.evaluate_recall(eval_queries, args.k)
+
+    approximate, exact = [], []
+    for query in eval_queries:
+        started = time.perf_counter()
+        index.search(query, args.k)
+        approximate.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index.exact_search(query, args.k)
+        exact.append(time.perf_counter() - started)
+
+    print(f"vectors={args.vectors} dimension={args.dimension} lists={lists} build={build_seconds:.2f}s")
+    print(f"self-queries:            recall@{args.k}={self_recall:.3f} n_probe={held_out_probe}")
+    print(f"held-out stored vectors: recall@{args.k}={held_out_recall:.3f} n_probe={held_out_probe}")
+    print(f"tuning queries:          recall@{args.k}={tuned_recall:.3f} n_probe={index.n_probe}")
+    print(f"evaluation queries:      recall@{args.k}={eval_recall:.3f}")
+    print(
+        f"latency ms  ann p50={percentile_ms(approximate, 50):.3f} p95={percentile_ms(approximate, 95):.3f}  "
+        f"exact p50={percentile_ms(exact, 50):.3f} p95={percentile_ms(exact, 95):.3f}  "
+        f"speedup={np.median(exact) / np.median(approximate):.1f}x"
+    )
+
+if __name__ == '__main__':
+    main()
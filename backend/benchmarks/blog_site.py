@@ -0,0 +1,72 @@
+"""Synthetic blog site for measuring how well a crawl budget is spent.
+
+The site has a hub linking ten categories, each paginated over four
+pages of ten articles. Every article links back to the hub and its
+category, to three of sixty tag archives, to the next article and to two
+`?replytocom=` variants of itself. Tag archives link to five random
+articles. That is about 1.3k pages, most of them archives and reply
+variants that matter little for internal linking.
+"""
+import random
+import re
+from typing import Dict, Iterable, List
+
+import httpx
+
+HOST = 'https://blog.test'
+# Pages that are not content: archives, pagination and comment reply variants
+NON_CONTENT = re.compile(r'/tag/|replytocom|/page/')
+
+def build_blog_site(seed: int = 1, categories: int = 10, articles: int = 40, tags: int = 60) -> Dict[str, List[str]]:
+    """Return the site's link graph as path -> linked paths."""
+    rng = random.Random(seed)
+    graph = {'/': [f'/cat/{c}' for c in range(categories)] + ['/about', '/contact']}
+    for c in range(categories):
+        posts = [f'/blog/c{c}-post-{i}' for i in range(articles)]
+        graph[f'/cat/{c}'] = posts[:10] + [f'/cat/{c}/page/2']
+        last_page = (articles + 9) // 10 + 1
+        for page in range(2, last_page):
+            graph[f'/cat/{c}/page/{page}'] = posts[(page - 1) * 10:page * 10] + [f'/cat/{c}/page/{page + 1}']
+        graph[f'/cat/{c}/page/{last_page}'] = []
+        for i, post in enumerate(posts):
+            graph[post] = (
+                ['/', f'/cat/{c}']
+                + [f'/tag/t{rng.randrange(tags)}' for _ in range(3)]
+                + [f'/blog/c{c}-post-{(i + 1) % articles}']
+                + [f'{post}?replytocom={k}' for k in range(2)]
+            )
+            for k in range(2):
+                graph[f'{post}?replytocom={k}'] = [post]
+    for t in range(tags):
+        graph[f'/tag/t{t}'] = [f'/blog/c{rng.randrange(categories)}-post-{rng.randrange(articles)}' for _ in range(5)]
+    graph['/about'] = ['/']
+    graph['/contact'] = ['/']
+    return graph
+
+def inbound_counts(graph: Dict[str, List[str]]) -> Dict[str, int]:
+    """Count the distinct pages linking to each path."""
+    counts: Dict[str, int] = {}
+    for targets in graph.values():
+        for target in set(targets):
+            counts[target] = counts.get(target, 0) + 1
+    return counts
+
+def budget_coverage(graph: Dict[str, List[str]], crawled: Iterable[str], budget: int) -> float:
+    """Share of inbound links to content pages captured, relative to the best possible `budget` pages."""
+    content = {path: count for path, count in inbound_counts(graph).items() if not NON_CONTENT.search(path)}
+    ideal = sum(sorted(content.values(), reverse=True)[:budget])
+    return sum(content.get(path, 0) for path in crawled) / ideal
+
+def site_transport(graph: Dict[str, List[str]]) -> httpx.MockTransport:
+    """Serve the site's pages as minimal HTML, for crawling it with an httpx client."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.raw_path.decode()
+        if path not in graph:
+            return httpx.Response(404)
+        links = ''.join(f'<a href="{target}">{target}</a>' for target in graph[path])
+        return httpx.Response(
+            200,
+            text=f'<html><body><article><p>Page {path}</p>{links}</article></body></html>',
+            headers={'content-type': 'text/html'}
+        )
+    return httpx.MockTransport(handler)
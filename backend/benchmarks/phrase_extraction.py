@@ -0,0 +1,130 @@
+"""Throughput of phrase extraction before and after batched tagging.
+
+Run from the backend directory:
+
+    python -m benchmarks.phrase_extraction [--sentences 2000] [--repeat 5]
+
+Compares the per-sentence implementation PhraseExtractor replaced (tokenize
+and pos_tag each sentence, stopwords reloaded per extractor, list lookups
+for the tag patterns) with the current one, in tokens/sec. The candidate
+scan is also timed on its own over synthetic tagged sentences, which needs
+no NLTK data; the end-to-end comparison needs the punkt, tagger and
+stopwords packages (`nltk.download(...)`) and is skipped without them.
+"""
+import argparse
+import logging
+import random
+import time
+from typing import List, Set, Tuple
+
+from modules.keyword_extraction.phrase_extractor import PhraseExtractor, _candidate_ngrams
+from modules.keyword_extraction.phrase_matcher import PhraseMatcher
+
+LEGACY_BIGRAMS = [
+    ('JJ', 'NN'), ('NN', 'NN'), ('NNP', 'NNP'),
+    ('JJ', 'NNS'), ('VBG', 'NN'), ('NN', 'NNS')
+]
+LEGACY_TRIGRAMS = [
+    ('JJ', 'JJ', 'NN'), ('JJ', 'NN', 'NN'),
+    ('NN', 'IN', 'NN'), ('NNP', 'NNP', 'NNP')
+]
+
+WORDS = {
+    'JJ': ['wild', 'active', 'warm', 'whole', 'rustic', 'simple', 'strong'],
+    'NN': ['sourdough', 'starter', 'flour', 'bread', 'dough', 'oven', 'crust', 'water'],
+    'NNS': ['loaves', 'grains', 'recipes', 'bakers'],
+    'NNP': ['Paris', 'Tartine', 'King', 'Arthur'],
+    'VBG': ['baking', 'proofing', 'mixing'],
+    'IN': ['of', 'with', 'for', 'in'],
+    'DT': ['the', 'a', 'every'],
+    'VBZ': ['needs', 'makes', 'keeps'],
+    'RB': ['slowly', 'often', 'always'],
+}
+TAGS = list(WORDS)
+
+def tagged_sentence(rng: random.Random, length: int) -> List[Tuple[str, str]]:
+    return [(rng.choice(WORDS[tag]), tag) for tag in rng.choices(TAGS, k=length)]
+
+def legacy_candidates(pos_tags: List[Tuple[str, str]]) -> Set[str]:
+    """The two-scan candidate generation with list pattern lookups."""
+    candidates = set()
+    for i in range(len(pos_tags) - 1):
+        if (pos_tags[i][1], pos_tags[i+1][1]) in LEGACY_BIGRAMS:
+            candidates.add(f"{pos_tags[i][0]} {pos_tags[i+1][0]}")
+    for i in range(len(pos_tags) - 2):
+        if (pos_tags[i][1], pos_tags[i+1][1], pos_tags[i+2][1]) in LEGACY_TRIGRAMS:
+            candidates.add(f"{pos_tags[i][0]} {pos_tags[i+1][0]} {pos_tags[i+2][0]}")
+    return candidates
+
+def legacy_extract_phrases(text: str) -> Set[str]:
+    """extract_phrases as it was: a fresh extractor, one pos_tag call per sentence."""
+    from nltk.corpus import stopwords
+    from nltk.tag import pos_tag
+    from nltk.tokenize import sent_tokenize, word_tokenize
+
+    set(stopwords.words('english'))
+    candidates = set()
+    for sentence in sent_tokenize(text):
+        candidates |= legacy_candidates(pos_tag(word_tokenize(sentence)))
+    return PhraseMatcher(candidates).found_in(text)
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def report(label: str, tokens: int, before: float, after: float) -> None:
+    print(f"{label:<12} {tokens / before:>12,.0f} {tokens / after:>12,.0f} {before / after:>8.1f}x")
+
+def nltk_data_missing() -> List[str]:
+    import nltk
+    missing = []
+    for resource in ('tokenizers/punkt_tab', 'taggers/averaged_perceptron_tagger_eng', 'corpora/stopwords'):
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(resource.split('/')[1])
+    return missing
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sentences', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(args.seed)
+    tagged = [tagged_sentence(rng, rng.randint(8, 30)) for _ in range(args.sentences)]
+    tokens = sum(len(sentence) for sentence in tagged)
+
+    current = set()
+    for sentence in tagged:
+        current.update(_candidate_ngrams(sentence))
+    assert current == set().union(*(legacy_candidates(sentence) for sentence in tagged))
+
+    print(f"{tokens:,} tokens in {args.sentences:,} sentences")
+    print(f"{'stage':<12} {'before tok/s':>12} {'after tok/s':>12} {'speedup':>9}")
+    report('candidates', tokens,
+           best_of(args.repeat, lambda: [legacy_candidates(sentence) for sentence in tagged]),
+           best_of(args.repeat, lambda: [set(_candidate_ngrams(sentence)) for sentence in tagged]))
+
+    missing = nltk_data_missing()
+    if missing:
+        print(f"end-to-end   skipped, NLTK data not installed: {', '.join(missing)}")
+        return
+
+    text = ' '.join(' '.join(word for word, _ in sentence).capitalize() + '.' for sentence in tagged)
+    from nltk.tokenize import word_tokenize
+    text_tokens = len(word_tokenize(text))
+    extractor = PhraseExtractor()
+    assert extractor.extract_phrases(text) == legacy_extract_phrases(text)
+    report('end-to-end', text_tokens,
+           best_of(args.repeat, legacy_extract_phrases, text),
+           best_of(args.repeat, lambda: PhraseExtractor().extract_phrases(text)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Build, update and scoring time of the TF-IDF engine on a large synthetic site.
+
+Run from the backend directory:
+
+    python -m benchmarks.tfidf_engine [--pages 50000] [--changed 1 100]
+
+Pages draw their words from a Zipf-like vocabulary, like a blog's posts.
+Times a full build, incremental updates that re-index `changed` pages
+(and remove as many), and ranking every page against a source text, and
+checks the updated engine scores like one rebuilt from scratch.
+"""
+import argparse
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from modules.link_suggester.tfidf_engine import TfidfEngine
+
+def page_counts(rng: random.Random, vocabulary, cumulative, length: int) -> Counter:
+    return Counter(rng.choices(vocabulary, cum_weights=cumulative, k=length))
+
+def best_of(repeat: int, func):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50000)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--changed', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(args.seed)
+    vocabulary = [f"term{i}" for i in range(args.vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(args.vocabulary)))
+    term_counts = {
+        f"https://site.test/post-{i}": page_counts(rng, vocabulary, cumulative, rng.randint(args.words // 2, args.words))
+        for i in range(args.pages)
+    }
+    source = ' '.join(rng.choices(vocabulary, cum_weights=cumulative, k=args.words))
+
+    build_seconds, engine = best_of(1, lambda: TfidfEngine.build(term_counts))
+    print(f"{args.pages:,} pages, {len(engine.vocabulary):,} terms, {len(engine._entry_tf):,} entries")
+    print(f"full build          {build_seconds * 1000:>9.1f} ms")
+
+    score_seconds, _ = best_of(args.repeat, lambda: np.argsort(-engine.score(source)))
+    print(f"rank all pages      {score_seconds * 1000:>9.1f} ms")
+
+    for count in args.changed:
+        urls = rng.sample(list(term_counts), 2 * count)
+        changed = {url: page_counts(rng, vocabulary, cumulative, args.words) for url in urls[:count]}
+        removed = urls[count:]
+        update_seconds, updated = best_of(args.repeat, lambda: engine.updated(changed, removed))
+        updated_score_seconds, _ = best_of(args.repeat, lambda: np.argsort(-updated.score(source)))
+        print(f"update {count:>5} pages  {update_seconds * 1000:>9.1f} ms "
+              f"({build_seconds / update_seconds:.0f}x faster than a build), ranking {updated_score_seconds * 1000:.1f} ms")
+
+        expected_counts = {url: counts for url, counts in term_counts.items() if url not in removed}
+        expected_counts.update(changed)
+        rebuilt = TfidfEngine.build(expected_counts)
+        scores, expected = updated.score(source), rebuilt.score(source)
+        assert set(updated.rows) == set(rebuilt.rows)
+        assert all(abs(scores[updated.rows[url]] - expected[rebuilt.rows[url]]) < 1e-5 for url in rebuilt.rows)
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
+import asyncio
+import json
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+from contextlib import asynccontextmanager
+from modules.batch_analyzer import analyze_batch
 from modules.content_extractor import extract_content
+from modules.crawlers.snapshot_store import normalize_url
+from modules.cpu_executor import get_process_pool, shutdown_process_pool
+from modules.embeddings import load_ann_indexes, save_ann_indexes
+from modules.http_clients import HTTPClients
 from modules.keyword_extractor import extract_keywords
-from modules.link_suggester import generate_link_suggestions
+from modules.link_suggester import generate_link_suggestions, iter_link_suggestions
+from modules.link_suggester.candidate_retriever import schedule_crawl_changes, wait_for_crawl_changes
+from modules.request_coalescer import SingleFlight
 
 # Configure logging
 logging.basicConfig(
@@ -14,7 +25,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start shared resources on startup and release them on shutdown."""
+    get_process_pool()
+    app.state.http_clients = HTTPClients()
+    app.state.analysis_flights = SingleFlight()
+    load_ann_indexes()
+    yield
+    await wait_for_crawl_changes()
+    await app.state.http_clients.aclose()
+    save_ann_indexes()
+    shutdown_process_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +51,9 @@ app.add_middleware(
 class AnalysisRequest(BaseModel):
     url: HttpUrl
 
+class BatchAnalysisRequest(BaseModel):
+    urls: List[HttpUrl]
+
 class LinkSuggestion(BaseModel):
     suggestedAnchorText: str
     context: str
@@ -37,15 +64,43 @@ class AnalysisResponse(BaseModel):
     keywords: Dict[str, List[str]]
     outboundSuggestions: List[LinkSuggestion]
 
+def get_http_clients(request: Request) -> HTTPClients:
+    """Provide the shared HTTP clients created in the lifespan."""
+    return request.app.state.http_clients
+
+def get_analysis_flights(request: Request) -> SingleFlight:
+    """Provide the coalescer shared by concurrent /analyze calls."""
+    return request.app.state.analysis_flights
+
+def analysis_key(request: AnalysisRequest) -> str:
+    """Build the coalescing key from the normalized URL and the other request fields."""
+    params = request.model_dump(mode='json', exclude={'url'})
+    return json.dumps(
+        {'url': normalize_url(str(request.url)), 'params': params},
+        sort_keys=True
+    )
+
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_page(request: AnalysisRequest):
+async def analyze_page(
+    request: AnalysisRequest,
+    http_clients: HTTPClients = Depends(get_http_clients),
+    analysis_flights: SingleFlight = Depends(get_analysis_flights)
+):
     """Analyze a webpage and generate outbound linking suggestions."""
+    # Concurrent requests for the same page share one pipeline run
+    return await analysis_flights.do(
+        analysis_key(request),
+        lambda: run_analysis(request, http_clients)
+    )
+
+async def run_analysis(request: AnalysisRequest, http_clients: HTTPClients) -> AnalysisResponse:
+    """Run the extraction, keyword and suggestion pipeline for one page."""
     try:
         logger.info(f"Starting analysis for URL: {request.url}")
         
         # Extract content
         try:
-            extracted_data = extract_content(str(request.url))
+            extracted_data = await extract_content(str(request.url), client=http_clients.crawler)
             logger.info("Content extraction complete")
             
             if not extracted_data['main_content'].get('content'):
@@ -58,9 +113,15 @@ async def analyze_page(request: AnalysisRequest):
                 detail=f"Failed to extract content: {str(e)}"
             )
         
+        # Re-index only the pages the crawl found changed, without holding up the response
+        schedule_crawl_changes(extracted_data['pages'], extracted_data['changes'])
+        
         # Extract keywords
         try:
-            keywords = await extract_keywords(extracted_data['main_content']['content'])
+            keywords = await extract_keywords(
+                extracted_data['main_content']['content'],
+                client=http_clients.openai
+            )
             logger.info("Keyword extraction complete")
             
             if not any(keywords.values()):
@@ -78,7 +139,8 @@ async def analyze_page(request: AnalysisRequest):
             suggestions = await generate_link_suggestions(
                 content=extracted_data['main_content']['content'],
                 keywords=keywords,
-                existing_links=extracted_data['main_content']['internal_links']
+                existing_links=extracted_data['main_content']['internal_links'],
+                url=str(request.url)
             )
             logger.info("Link suggestions generated")
             
@@ -104,4 +166,126 @@ async def analyze_page(request: AnalysisRequest):
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@app.post("/analyze/stream")
+async def analyze_page_stream(
+    request: AnalysisRequest,
+    http_clients: HTTPClients = Depends(get_http_clients),
+    analysis_flights: SingleFlight = Depends(get_analysis_flights)
+):
+    """Analyze a webpage, streaming NDJSON events as each stage of the pipeline finishes.
+    
+    Events, one JSON object per line, in order: `progress` after every
+    crawled page, `keywords`, one `suggestion` per suggestion as its
+    candidates resolve, then `done` with the same body /analyze returns.
+    A failing stage emits `error` and ends the stream.
+    
+    A `suggestion` with `provisional: true` was ranked against only part
+    of the candidates and may be missing from `done`, whose
+    `outboundSuggestions` replace every suggestion streamed before it.
+    Concurrent streams of the same page share one pipeline run, and late
+    joiners replay the events already sent.
+    """
+    events = analysis_flights.stream(
+        ('stream', analysis_key(request)),
+        lambda: stream_analysis(request, http_clients)
+    )
+    return StreamingResponse(
+        (json.dumps(event) + "\n" async for event in events),
+        media_type="application/x-ndjson"
+    )
+
+async def stream_analysis(request: AnalysisRequest, http_clients: HTTPClients) -> AsyncIterator[Dict]:
+    """Run the analysis pipeline for one page, yielding events as they become available."""
+    logger.info(f"Starting streaming analysis for URL: {request.url}")
+    
+    # Crawl progress is pushed from the crawler; None marks the end of the crawl
+    progress: asyncio.Queue = asyncio.Queue()
+    crawl = asyncio.create_task(extract_content(
+        str(request.url),
+        client=http_clients.crawler,
+        on_progress=lambda update: progress.put_nowait({'event': 'progress', **update})
+    ))
+    crawl.add_done_callback(lambda _: progress.put_nowait(None))
+    
+    try:
+        while (event := await progress.get()) is not None:
+            yield event
+            
+        # Extract content
+        try:
+            extracted_data = crawl.result()
+            if not extracted_data['main_content'].get('content'):
+                raise ValueError("No content extracted from the page")
+        except Exception as e:
+            logger.error(f"Content extraction failed: {str(e)}", exc_info=True)
+            yield {'event': 'error', 'stage': 'extract', 'detail': f"Failed to extract content: {str(e)}"}
+            return
+        
+        schedule_crawl_changes(extracted_data['pages'], extracted_data['changes'])
+        
+        # Extract keywords
+        try:
+            keywords = await extract_keywords(
+                extracted_data['main_content']['content'],
+                client=http_clients.openai
+            )
+        except Exception as e:
+            logger.error(f"Keyword extraction failed: {str(e)}", exc_info=True)
+            yield {'event': 'error', 'stage': 'keywords', 'detail': f"Failed to extract keywords: {str(e)}"}
+            return
+        yield {'event': 'keywords', 'keywords': keywords}
+        
+        # Generate suggestions
+        try:
+            async for item in iter_link_suggestions(
+                content=extracted_data['main_content']['content'],
+                keywords=keywords,
+                existing_links=extracted_data['main_content']['internal_links'],
+                url=str(request.url)
+            ):
+                if 'suggestion' in item:
+                    suggestion = LinkSuggestion.model_validate(item['suggestion'])
+                    yield {
+                        'event': 'suggestion',
+                        'provisional': item['provisional'],
+                        'suggestion': suggestion.model_dump()
+                    }
+                else:
+                    response = AnalysisResponse(
+                        keywords=keywords,
+                        outboundSuggestions=item['outboundSuggestions']
+                    )
+                    yield {'event': 'done', **response.model_dump()}
+        except Exception as e:
+            logger.error(f"Link suggestion generation failed: {str(e)}", exc_info=True)
+            yield {'event': 'error', 'stage': 'suggestions', 'detail': f"Failed to generate link suggestions: {str(e)}"}
+            return
+        
+        logger.info("Streaming analysis completed successfully")
+        
+    finally:
+        # The client may disconnect mid-crawl
+        crawl.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch_pages(
+    request: BatchAnalysisRequest,
+    http_clients: HTTPClients = Depends(get_http_clients)
+):
+    """Analyze many pages, streaming one NDJSON line per URL as each finishes."""
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    
+    logger.info(f"Starting batch analysis for {len(request.urls)} URLs")
+    
+    async def stream_results():
+        async for result in analyze_batch(
+            [str(url) for url in request.urls],
+            crawler_client=http_clients.crawler,
+            openai_client=http_clients.openai
+        ):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+import httpx
+from .crawlers.content_extractor import ContentExtractor
+from .crawlers.snapshot_store import normalize_url
+from .keyword_extractor import extract_keywords_batch
+from .link_suggester import generate_link_suggestions
+from .link_suggester.candidate_retriever import schedule_crawl_changes
+
+logger = logging.getLogger(__name__)
+
+# Sites crawled at the same time, and pages whose keywords are scored together
+BATCH_SITE_CONCURRENCY = int(os.getenv('BATCH_SITE_CONCURRENCY', '4'))
+BATCH_SCORING_PAGES = int(os.getenv('BATCH_SCORING_PAGES', '10'))
+BATCH_MIN_CRAWL_PAGES = 50
+
+def group_urls_by_site(urls: List[str]) -> Dict[str, List[str]]:
+    """Group URLs by host, dropping duplicates and keeping the request order."""
+    sites: Dict[str, List[str]] = {}
+    seen = set()
+    for url in urls:
+        key = normalize_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        sites.setdefault(urlparse(key).netloc, []).append(url)
+    return sites
+
+async def analyze_batch(
+    urls: List[str],
+    crawler_client: Optional[httpx.AsyncClient] = None,
+    openai_client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[Dict]:
+    """Analyze many URLs, yielding each URL's result as soon as it is ready.
+
+    Every site is crawled once and its parsed pages are reused for all of
+    its URLs; keyword scoring for a site's pages is packed into shared API
+    calls. Each yielded item has either `keywords` and `outboundSuggestions`
+    or an `error`.
+    """
+    sites = group_urls_by_site(urls)
+    total = sum(len(site_urls) for site_urls in sites.values())
+    logger.info(f"Starting batch analysis of {total} URLs across {len(sites)} sites")
+
+    started = time.monotonic()
+    results: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(BATCH_SITE_CONCURRENCY)
+
+    async def run_site(site_urls: List[str]):
+        emitted = set()
+
+        def emit(url: str, payload: Dict):
+            emitted.add(url)
+            results.put_nowait({'url': url, **payload})
+
+        async with semaphore:
+            try:
+                await _analyze_site(site_urls, crawler_client, openai_client, emit)
+            except Exception as e:
+                logger.error(f"Batch analysis failed for site of {site_urls[0]}: {str(e)}", exc_info=True)
+                for url in site_urls:
+                    if url not in emitted:
+                        emit(url, {'error': f"Site analysis failed: {str(e)}"})
+
+    tasks = [asyncio.create_task(run_site(site_urls)) for site_urls in sites.values()]
+    try:
+        for _ in range(total):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Batch analysis finished: {total} URLs in {elapsed:.1f}s ({total * 60 / max(elapsed, 1e-9):.1f} URLs/minute)")
+
+async def _analyze_site(
+    site_urls: List[str],
+    crawler_client: Optional[httpx.AsyncClient],
+    openai_client: Optional[httpx.AsyncClient],
+    emit: Callable[[str, Dict], None]
+) -> None:
+    """Crawl one site once, then extract, score and suggest for each requested URL."""
+    extractor = ContentExtractor(site_urls[0], client=crawler_client)
+    crawl_results = await extractor.crawl_site(
+        max(BATCH_MIN_CRAWL_PAGES, len(site_urls)),
+        seed_urls=site_urls
+    )
+    schedule_crawl_changes(crawl_results['pages'], crawl_results['changes'])
+
+    extracted = await asyncio.gather(
+        *(extractor.analyze_crawled_page(url, crawl_results) for url in site_urls),
+        return_exceptions=True
+    )
+
+    pages = []
+    for url, data in zip(site_urls, extracted):
+        if isinstance(data, Exception):
+            emit(url, {'error': f"Failed to extract content: {str(data)}"})
+        elif not data['main_content'].get('content'):
+            emit(url, {'error': "Failed to extract content: No content extracted from the page"})
+        else:
+            pages.append((url, data))
+
+    for i in range(0, len(pages), BATCH_SCORING_PAGES):
+        chunk = pages[i:i + BATCH_SCORING_PAGES]
+        keyword_sets = await extract_keywords_batch(
+            [data['main_content']['content'] for _, data in chunk],
+            client=openai_client
+        )
+
+        for (url, data), keywords in zip(chunk, keyword_sets):
+            try:
+                suggestions = await generate_link_suggestions(
+                    content=data['main_content']['content'],
+                    keywords=keywords,
+                    existing_links=data['main_content']['internal_links'],
+                    url=url
+                )
+                emit(url, {
+                    'keywords': keywords,
+                    'outboundSuggestions': suggestions['outboundSuggestions']
+                })
+            except Exception as e:
+                logger.error(f"Link suggestion generation failed for {url}: {str(e)}", exc_info=True)
+                emit(url, {'error': f"Failed to generate link suggestions: {str(e)}"})
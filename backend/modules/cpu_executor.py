@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def _configured_workers() -> int:
+    """Number of worker processes for CPU-bound stages (0 runs them in threads)."""
+    return int(os.getenv('ANALYSIS_PROCESS_WORKERS', str(os.cpu_count() or 1)))
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared process pool, creating it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        workers = _configured_workers()
+        if workers <= 0:
+            return None
+        logger.info(f"Starting process pool with {workers} workers")
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+    return _process_pool
+
+async def run_cpu_bound(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run a CPU-bound callable off the event loop thread.
+
+    The callable and its arguments must be picklable when a process pool is
+    configured. With ANALYSIS_PROCESS_WORKERS=0 the work runs in the default
+    thread pool instead.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_process_pool(), call)
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool, if it was started."""
+    global _process_pool
+    if _process_pool is not None:
+        logger.info("Shutting down process pool")
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
@@ -1,172 +1,472 @@
 import logging
-from urllib.parse import urlparse, urljoin
-from typing import Dict, Set, List
+import os
+from urllib.parse import urldefrag, urlparse
+from typing import Callable, Dict, Set, List, Optional, Tuple, Union
 import asyncio
+import re
+import time
 import httpx
 from bs4 import BeautifulSoup
+from .rate_limiter import HostThrottle, get_host_throttle
+from .checkpoint import CrawlCheckpoint, open_checkpoint
+from .frontier import CrawlFrontier
+from .fingerprint import content_hash, link_structure_hash, simhash
+from .near_duplicates import NearDuplicateIndex
+from .snapshot_store import SnapshotStore, get_snapshot_store
+from .url_canonicalizer import get_url_canonicalizer
+from .url_set import make_url_set
+from .page_parser import parse_page, extract_main_content, extract_links, is_internal_url
+from ..cpu_executor import run_cpu_bound
+from ..http_clients import client_session
 
 logger = logging.getLogger(__name__)
 
+BODY_END = re.compile(rb'</body\s*>', re.IGNORECASE)
+
 class BaseCrawler:
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: Optional[int] = None,
+        per_host_concurrency: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        max_page_bytes: Optional[int] = None,
+        near_duplicate_distance: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
-        self.visited_urls: Set[str] = set()
+        self.canonicalizer = get_url_canonicalizer()
+        self.domain = urlparse(self.canonicalizer.canonicalize(base_url)).netloc
+        # Canonical URLs fetched, and canonical URLs ever queued, as compact hashed sets
+        self.visited_urls = make_url_set()
+        self.seen_urls = make_url_set()
+        self.pages_crawled = 0
+        # Fetches that failed for reasons other than the page being gone
+        self.fetch_errors = 0
         self.link_graph: Dict[str, List[Dict]] = {}
         self.page_contents: Dict[str, Dict] = {}
+        # Parsed documents (title, content, links with context) keyed by URL
+        self.documents: Dict[str, Dict] = {}
+        # URLs by how they compare with the stored fingerprints of the last crawl
+        self.changes: Dict[str, List[str]] = {'added': [], 'changed': [], 'unchanged': [], 'removed': []}
+        
+        # Crawl engine settings, overridable through the environment
+        self.max_concurrency = max_concurrency or int(os.getenv('CRAWLER_MAX_CONCURRENCY', '10'))
+        # Without explicit per-host limits the crawl shares the process-wide throttle, so
+        # concurrent crawls of one site stay within a single politeness budget
+        self._throttle: Optional[HostThrottle] = None
+        if per_host_concurrency is not None or requests_per_second is not None:
+            per_host_concurrency = per_host_concurrency or int(os.getenv('CRAWLER_PER_HOST_CONCURRENCY', '4'))
+            if requests_per_second is None:
+                requests_per_second = float(os.getenv('CRAWLER_REQUESTS_PER_SECOND', '20'))
+            self._throttle = HostThrottle(
+                per_host_concurrency=per_host_concurrency,
+                requests_per_second=requests_per_second,
+                burst=float(os.getenv('CRAWLER_BURST', str(per_host_concurrency)))
+            )
+        self.max_page_bytes = max_page_bytes or int(os.getenv('CRAWLER_MAX_PAGE_BYTES', str(2 * 1024 * 1024)))
+        self._in_flight = 0
+        self._checkpoint: Optional[CrawlCheckpoint] = None
+        # Change status of checkpointed pages being refetched, which the snapshot store already recorded
+        self._replayed_status: Dict[str, str] = {}
+        # Called after every fetched page with the crawl's progress so far
+        self.on_progress = on_progress
+        self.snapshot_store = snapshot_store or get_snapshot_store()
+        self.client = client
+        
+        # SimHash bit distance within which pages count as near-duplicates; negative disables
+        if near_duplicate_distance is None:
+            near_duplicate_distance = int(os.getenv('CRAWLER_NEAR_DUPLICATE_DISTANCE', '3'))
+        self.near_duplicates = NearDuplicateIndex(near_duplicate_distance) if near_duplicate_distance >= 0 else None
+        
+    @property
+    def throttle(self) -> HostThrottle:
+        """The per-host throttle for this crawl's fetches."""
+        return self._throttle or get_host_throttle()
+
+    async def crawl_site(self, max_pages: int = 100, seed_urls: Optional[List[str]] = None) -> Dict:
+        """Crawl the entire site and build a link graph.
         
-    async def crawl_site(self, max_pages: int = 100) -> Dict:
-        """Crawl the entire site and build a link graph."""
+        `seed_urls` are crawled first along with the base URL, so pages a
+        caller needs are crawled even if nothing links to them within the
+        budget. Other pages are crawled shallowest and most linked first
+        (see CrawlFrontier), so a small budget covers the pages that matter.
+        
+        Pages whose stored snapshot is still valid are served with their
+        stored parse, and the result's `changes` lists which pages were
+        added, changed, unchanged or removed since the last crawl. Pages
+        count as removed when they answer 404/410, or when a complete
+        crawl from the site root never reached them.
+        
+        Near-duplicate pages (facets, print versions, archives) are
+        collapsed: `pages` keeps only each cluster's canonical page and
+        `duplicates` maps every collapsed URL to its canonical one.
+        
+        Progress is checkpointed to an append-only log (see
+        CrawlCheckpoint); an interrupted crawl of the same site resumes
+        from it instead of refetching the pages it already has.
+        """
         try:
-            logger.info(f"Starting site crawl from {self.base_url}")
-            to_visit = {self.base_url}
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                while to_visit and len(self.visited_urls) < max_pages:
-                    current_url = to_visit.pop()
-                    if current_url in self.visited_urls:
-                        continue
-                        
-                    try:
-                        logger.info(f"Crawling {current_url}")
-                        response = await client.get(current_url)
-                        response.raise_for_status()
-                        
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        self.visited_urls.add(current_url)
-                        
-                        # Extract and store page content
-                        content = self._extract_content(soup)
-                        self.page_contents[current_url] = {
-                            'title': soup.title.string if soup.title else '',
-                            'content': content,
-                            'url': current_url
-                        }
-                        
-                        # Process links and update graph
-                        links = self._extract_links(soup, current_url)
-                        self.link_graph[current_url] = links
-                        
-                        # Add new internal links to visit
-                        new_urls = {
-                            link['url'] for link in links 
-                            if self._is_internal_url(link['url']) and 
-                            link['url'] not in self.visited_urls
-                        }
-                        to_visit.update(new_urls)
-                        
-                        # Small delay to be nice to the server
-                        await asyncio.sleep(0.5)
-                        
-                    except Exception as e:
-                        logger.error(f"Error crawling {current_url}: {str(e)}")
-                        continue
+            logger.info(
+                f"Starting site crawl from {self.base_url} "
+                f"({self.max_concurrency} workers, {self.throttle.per_host_concurrency} per host)"
+            )
+            frontier = CrawlFrontier()
+            seeds = []
+            for url in [self.base_url] + list(seed_urls or []):
+                seeds.append(self._clean_url(url))
+                if self.seen_urls.add(seeds[-1]):
+                    frontier.push(seeds[-1], 0, pinned=True, fetch_url=urldefrag(url).url)
+            
+            self._checkpoint = open_checkpoint(seeds[0])
+            completed = False
+            try:
+                if self._checkpoint is not None:
+                    self._resume(self._checkpoint.replay(), frontier)
+                budget_reached = await self._run_workers(frontier, max_pages)
+                completed = True
+            finally:
+                # An interrupted crawl keeps its log for the next attempt
+                if self._checkpoint is not None:
+                    if completed:
+                        await asyncio.to_thread(self._checkpoint.complete)
+                    else:
+                        await asyncio.to_thread(self._checkpoint.close)
+                    self._checkpoint = None
+            
+            # Stored pages the crawl never reached are gone only if it saw the whole site
+            if self._saw_whole_site(budget_reached) and self.snapshot_store:
+                live_urls = await asyncio.to_thread(self.snapshot_store.live_urls, self.domain)
+                await self._tombstone([url for url in live_urls if self._clean_url(url) not in self.seen_urls])
+            
+            duplicates = self._collapse_near_duplicates(set(seeds))
                         
-            logger.info(f"Crawl complete. Visited {len(self.visited_urls)} pages")
+            logger.info(
+                f"Crawl complete. Visited {self.pages_crawled} pages "
+                f"({len(self.changes['added'])} added, {len(self.changes['changed'])} changed, "
+                f"{len(self.changes['unchanged'])} unchanged, {len(self.changes['removed'])} removed, "
+                f"{len(duplicates)} near-duplicates collapsed)"
+            )
             return {
                 'pages': self.page_contents,
                 'link_graph': self.link_graph,
-                'crawled_pages': len(self.visited_urls)
+                'crawled_pages': self.pages_crawled,
+                'truncated_pages': [
+                    url for url, page in self.page_contents.items() if page.get('truncated')
+                ],
+                'changes': self.changes,
+                'duplicates': duplicates
             }
             
         except Exception as e:
             logger.error(f"Error in site crawl: {str(e)}")
             raise
             
-    def _extract_content(self, soup: BeautifulSoup) -> str:
-        """Extract main content from HTML."""
-        content_selectors = [
-            'article', 'main', '[role="main"]',
-            '.post-content', '.entry-content', '.content',
-            '.article-content', '#content', '[itemprop="articleBody"]'
-        ]
-        
-        content_area = None
-        for selector in content_selectors:
-            content_area = soup.select_one(selector)
-            if content_area:
-                break
-                
-        if not content_area:
-            content_area = soup.body
+    async def _run_workers(self, frontier: CrawlFrontier, max_pages: int) -> bool:
+        """Crawl the frontier with the worker pool; returns whether the page budget ran out."""
+        budget_reached = False
+        
+        async with client_session(self.client) as client:
+            # Notified whenever a fetch finishes, which may free budget
+            settled = asyncio.Condition()
             
-        if not content_area:
-            return ""
+            async def worker():
+                nonlocal budget_reached
+                while True:
+                    item = await frontier.get()
+                    if item is None:
+                        return
+                    current_url, fetch_url, depth = item
+                    try:
+                        if current_url in self.visited_urls:
+                            continue
+                        # Pages in flight count against the budget so workers never overshoot it;
+                        # a fetch that fails frees its share, so hold the URL until they settle
+                        async with settled:
+                            await settled.wait_for(
+                                lambda: self.pages_crawled + self._in_flight < max_pages or not self._in_flight
+                            )
+                            if self.pages_crawled >= max_pages:
+                                budget_reached = True
+                                continue
+                            self._in_flight += 1
+                        try:
+                            links = await self._crawl_page(client, current_url, depth, fetch_url)
+                        finally:
+                            self._in_flight -= 1
+                            async with settled:
+                                settled.notify_all()
+                        self._queue_links(frontier, links, depth)
+                        self._report_progress(current_url, max_pages, len(frontier))
+                    finally:
+                        frontier.task_done()
+                        
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+        
+        return budget_reached
+        
+    def _saw_whole_site(self, budget_reached: bool) -> bool:
+        """Whether the crawl started at the site root, ran out of links rather than budget and had no failed fetches.
+        
+        Anything less may miss pages that still exist: pages not linked
+        from a deeper start URL, or linked only from a page that failed.
+        """
+        start = urlparse(self._clean_url(self.base_url))
+        return not budget_reached and self.fetch_errors == 0 and start.path == '/' and not start.query
+        
+    def _report_progress(self, url: str, max_pages: int, queued: int) -> None:
+        if self.on_progress is None:
+            return
+        try:
+            self.on_progress({
+                'url': url,
+                'pagesCrawled': self.pages_crawled,
+                'maxPages': max_pages,
+                'queued': queued
+            })
+        except Exception as e:
+            logger.error(f"Crawl progress callback failed: {str(e)}")
             
-        # Extract text from content elements
-        content_elements = content_area.find_all(['p', 'article', 'section', 'div'])
-        paragraphs = []
+    def _queue_links(self, frontier: CrawlFrontier, links: List[Dict], depth: int) -> None:
+        """Queue new internal links once per canonical URL; links to URLs already queued raise their priority.
         
-        for element in content_elements:
-            # Skip navigation, header, footer, etc.
-            if any(cls in str(element.get('class', [])).lower() 
-                  for cls in ['nav', 'header', 'footer', 'sidebar', 'menu']):
-                continue
-                
-            text = element.get_text(strip=True)
-            if len(text) > 0:  # Keep all non-empty paragraphs
-                paragraphs.append(text)
+        The canonical URL only dedupes: the page is fetched at the link's
+        own URL, since servers often redirect or 404 other spellings.
+        """
+        targets: Dict[str, str] = {}
+        for link in links:
+            if self._is_internal_url(link['url']):
+                targets.setdefault(self._clean_url(link['url']), urldefrag(link['url']).url)
+        for url, fetch_url in targets.items():
+            if self.seen_urls.add(url):
+                frontier.push(url, depth + 1, fetch_url=fetch_url)
+            else:
+                frontier.reinforce(url, depth + 1)
                 
-        return '\n\n'.join(paragraphs)
-        
-    def _extract_links(self, soup: BeautifulSoup, current_url: str) -> List[Dict]:
-        """Extract all links with context."""
-        links = []
-        for link in soup.find_all('a', href=True):
-            href = link.get('href', '').strip()
-            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-                continue
-                
-            try:
-                absolute_url = urljoin(current_url, href)
-                context = self._get_link_context(link)
-                
-                links.append({
-                    'url': absolute_url,
-                    'text': link.get_text(strip=True),
-                    'context': context,
-                    'is_internal': self._is_internal_url(absolute_url)
+    def _resume(self, records: List[Dict], frontier: CrawlFrontier) -> None:
+        """Rebuild crawl state from checkpoint records, in the order they were written.
+        
+        Pages checkpointed longer ago than the snapshot freshness window
+        are queued again instead of replayed, so they are revalidated like
+        any stored page. Their recorded change status is kept, since the
+        snapshot store already holds their new fingerprints.
+        """
+        max_age = self.snapshot_store.max_age if self.snapshot_store else float(os.getenv('SNAPSHOT_MAX_AGE', '300'))
+        now = time.time()
+        for record in records:
+            if record['type'] == 'page' and now - record.get('at', 0) >= max_age:
+                if record['status'] != 'unchanged':
+                    self._replayed_status[record['url']] = record['status']
+                if self.seen_urls.add(record['url']):
+                    frontier.push(record['url'], record['depth'], fetch_url=record['page'].get('url'))
+            elif record['type'] == 'page':
+                links = self._add_page(record['url'], record['page'], record['status'])
+                self._queue_links(frontier, links, record['depth'])
+            elif record['type'] == 'gone':
+                self.visited_urls.add(record['url'])
+                self.changes['removed'].append(record['url'])
+        if records:
+            logger.info(
+                f"Resumed crawl of {self.domain} from checkpoint: {self.pages_crawled} pages done, "
+                f"{len(frontier)} queued"
+            )
+            
+    async def _crawl_page(
+        self,
+        client: httpx.AsyncClient,
+        current_url: str,
+        depth: int = 0,
+        fetch_url: Optional[str] = None
+    ) -> List[Dict]:
+        """Fetch a single page (at `fetch_url`, keyed by its canonical `current_url`), store its content and return its links."""
+        fetch_url = fetch_url or current_url
+        try:
+            logger.info(f"Crawling {fetch_url}")
+            html, truncated, snapshot, final_url = await self._fetch(client, fetch_url)
+            if not self._is_internal_url(final_url):
+                logger.info(f"{fetch_url} redirected off-site to {final_url}, skipping")
+                return []
+            
+            # A page served from its snapshot keeps its stored parse
+            page = self.snapshot_store.stored_document(snapshot) if snapshot else None
+            if page is not None:
+                page['url'] = final_url
+                status = 'unchanged'
+            else:
+                # Parsing is CPU-bound, so keep it off the event loop; relative
+                # links resolve against the URL the page was actually served from
+                page = await run_cpu_bound(parse_page, html, final_url, self.domain)
+                page['truncated'] = truncated
+                status = 'added'
+                if self.snapshot_store:
+                    status = await asyncio.to_thread(
+                        self.snapshot_store.record_document, current_url, page,
+                        content_hash(page['content']), link_structure_hash(page['links'])
+                    )
+            # A change found before a restart was never applied, even if the page has not changed since
+            if status == 'unchanged':
+                status = self._replayed_status.pop(current_url, status)
+            
+            if self._checkpoint is not None:
+                await self._checkpoint.append({
+                    'type': 'page', 'url': current_url, 'depth': depth, 'status': status,
+                    'page': page, 'at': time.time()
                 })
+            return self._add_page(current_url, page, status)
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (404, 410):
+                logger.info(f"Page {current_url} is gone ({e.response.status_code})")
+                await self._tombstone([current_url])
+                if self._checkpoint is not None:
+                    await self._checkpoint.append({'type': 'gone', 'url': current_url})
+            else:
+                self.fetch_errors += 1
+                logger.error(f"Error crawling {current_url}: {str(e)}")
+            return []
+        except Exception as e:
+            self.fetch_errors += 1
+            logger.error(f"Error crawling {current_url}: {str(e)}")
+            return []
+            
+    def _add_page(self, current_url: str, page: Dict, status: str) -> List[Dict]:
+        """Record a fetched and parsed page in the crawl results and return its links."""
+        self.pages_crawled += 1
+        self.visited_urls.add(current_url)
+        self.documents[current_url] = page
+        
+        # A page that redirected or declares another canonical URL is stored under that URL, once
+        page_url = self.canonicalizer.page_url(page.get('url') or current_url, page.get('canonical'), self.domain)
+        if page_url != current_url:
+            self.seen_urls.add(page_url)
+            if not self.visited_urls.add(page_url):
+                logger.debug(f"{current_url} is an alias of already crawled {page_url}")
+                return page['links']
+        
+        self.changes[status].append(page_url)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(page_url, simhash(page['content']))
+        
+        # Store page content
+        self.page_contents[page_url] = {
+            'title': page['title'],
+            'content': page['content'],
+            'url': page_url,
+            'truncated': page['truncated']
+        }
+        
+        # Update link graph
+        self.link_graph[page_url] = page['links']
+        return page['links']
+            
+    def _collapse_near_duplicates(self, keep_documents: Set[str]) -> Dict[str, str]:
+        """Drop near-duplicate pages from the crawl results, returning {duplicate: canonical}.
+        
+        Parsed documents are kept for URLs in `keep_documents` (the
+        frontier seeds), which callers may still analyze individually.
+        """
+        if self.near_duplicates is None:
+            return {}
+        duplicates = {}
+        for canonical, members in self.near_duplicates.clusters().items():
+            for url in members:
+                duplicates[url] = canonical
+                self.page_contents.pop(url, None)
+                if url not in keep_documents:
+                    self.documents.pop(url, None)
+        return duplicates
+        
+    async def _tombstone(self, urls: List[str]) -> None:
+        """Record pages as removed from the site."""
+        if not urls:
+            return
+        self.changes['removed'].extend(urls)
+        if self.snapshot_store:
+            await asyncio.to_thread(self.snapshot_store.tombstone, urls)
+            
+    async def _fetch_html(self, client: httpx.AsyncClient, url: str) -> Tuple[str, bool]:
+        """Fetch a page's HTML, serving or revalidating a stored snapshot when possible.
+        
+        Returns the HTML and whether it was truncated at the byte cap.
+        """
+        html, truncated, _, _ = await self._fetch(client, url)
+        return html, truncated
+        
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> Tuple[str, bool, Optional[Dict], str]:
+        """Like _fetch_html, but also return the snapshot when it was served unchanged, and the final URL after redirects."""
+        # Snapshot store calls are blocking SQLite I/O, so they run in threads
+        snapshot = await asyncio.to_thread(self.snapshot_store.get, url) if self.snapshot_store else None
+        if snapshot and self.snapshot_store.is_fresh(snapshot):
+            logger.debug(f"Serving fresh snapshot for {url}")
+            return snapshot['html'], bool(snapshot['truncated']), snapshot, url
+            
+        headers = self.snapshot_store.conditional_headers(snapshot) if self.snapshot_store else {}
+        async with self.throttle.slot(urlparse(url).netloc):
+            async with client.stream('GET', url, headers=headers, follow_redirects=True) as response:
+                final_url = str(response.url)
+                if response.status_code == 304 and snapshot:
+                    logger.debug(f"Snapshot for {url} revalidated (304)")
+                    await asyncio.to_thread(self.snapshot_store.touch, url)
+                    return snapshot['html'], bool(snapshot['truncated']), snapshot, final_url
+                    
+                response.raise_for_status()
+                html, truncated = await self._read_html(response)
                 
-            except Exception as e:
-                logger.error(f"Error processing link {href}: {str(e)}")
-                
-        return links
-        
-    def _get_link_context(self, link_element) -> str:
-        """Get the surrounding context of a link."""
-        parent = link_element.find_parent(['p', 'div', 'section'])
-        if parent:
-            # Get text before and after the link
-            html = str(parent)
-            link_html = str(link_element)
-            parts = html.split(link_html)
-            
-            if len(parts) >= 2:
-                before = BeautifulSoup(parts[0], 'html.parser').get_text(strip=True)
-                after = BeautifulSoup(parts[1], 'html.parser').get_text(strip=True)
+        if truncated:
+            logger.warning(f"Page {url} exceeded {self.max_page_bytes} bytes and was truncated")
+        if self.snapshot_store:
+            await asyncio.to_thread(
+                self.snapshot_store.put,
+                url,
+                html,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+                truncated=truncated
+            )
+        return html, truncated, None, final_url
+        
+    async def _read_html(self, response: httpx.Response) -> Tuple[str, bool]:
+        """Stream a response body, stopping after </body> or at the byte cap."""
+        body = bytearray()
+        truncated = False
+        
+        async for chunk in response.aiter_bytes():
+            # Re-scan a little of the previous chunk in case the tag was split
+            search_from = max(0, len(body) - 16)
+            body.extend(chunk)
+            
+            match = BODY_END.search(body, search_from, self.max_page_bytes)
+            if match:
+                del body[match.end():]
+                break
                 
-                # Limit context length
-                before = before[-150:] if len(before) > 150 else before
-                after = after[:150] if len(after) > 150 else after
+            if len(body) > self.max_page_bytes:
+                del body[self.max_page_bytes:]
+                truncated = True
+                break
                 
-                return f"{before} [LINK] {after}"
+        return body.decode(response.encoding or 'utf-8', errors='replace'), truncated
+            
+    def _extract_content(self, page: Union[str, BeautifulSoup]) -> str:
+        """Extract main content from HTML markup (through the configured parser) or a parsed soup."""
+        return extract_main_content(page)
         
-        return ""
+    def _extract_links(self, page: Union[str, BeautifulSoup], current_url: str) -> List[Dict]:
+        """Extract all links with context from HTML markup or a parsed soup."""
+        return extract_links(page, current_url, self.domain)
         
     def _is_internal_url(self, url: str) -> bool:
         """Check if URL belongs to the same domain."""
-        try:
-            return urlparse(url).netloc == self.domain
-        except Exception as e:
-            logger.error(f"Error parsing URL {url}: {str(e)}")
-            return False
+        return is_internal_url(url, self.domain)
             
     def _clean_url(self, url: str) -> str:
         """Clean and normalize URL."""
-        try:
-            parsed = urlparse(url)
-            return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-        except Exception as e:
-            logger.error(f"Error cleaning URL {url}: {str(e)}")
-            return url
\ No newline at end of file
+        return self.canonicalizer.canonicalize(url)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class CrawlCheckpoint:
+    """Append-only JSON-lines log of one site crawl, used to resume it after a restart.
+
+    Every crawled page is appended as a record with its parsed document,
+    its fingerprint status and its link depth; pages found gone are
+    appended too. Records are buffered and flushed to disk every
+    `flush_interval` seconds, so a crash loses at most that much work;
+    the flush (and its fsync) runs in a worker thread, off the event loop.
+    The frontier and visited set are rebuilt on resume by replaying the
+    records in order. The log is deleted once the crawl completes.
+
+    The file is locked while open, so two crawls of the same site never
+    write to the same log.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a+', encoding='utf-8')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._file.close()
+            raise
+        self._flushed_at = time.monotonic()
+        self._pending = 0
+        self._flushing = False
+        # Guards the file buffer between the event loop and the flushing thread;
+        # fsync holds only _sync_lock, so appends never wait for the disk
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def replay(self) -> List[Dict]:
+        """Return the records written so far, dropping a trailing partial line."""
+        self._file.seek(0)
+        records = []
+        valid_bytes = 0
+        for line in self._file:
+            if not line.endswith('\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line.encode('utf-8'))
+        # Cut off anything after the last complete record before appending again
+        self._file.truncate(valid_bytes)
+        self._file.seek(0, os.SEEK_END)
+        return records
+
+    async def append(self, record: Dict) -> None:
+        """Add a record, flushing to disk in a thread if the flush interval has passed."""
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+        if not self._flushing and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flushing = True
+            try:
+                await asyncio.to_thread(self.flush)
+            finally:
+                self._flushing = False
+
+    def flush(self) -> None:
+        """Write buffered records through to disk."""
+        self._flushed_at = time.monotonic()
+        with self._sync_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._file.flush()
+                self._pending = 0
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Flush and release the log, keeping it for a later resume."""
+        if not self._file.closed:
+            self.flush()
+            with self._sync_lock:
+                self._file.close()
+
+    def complete(self) -> None:
+        """Discard the log of a finished crawl."""
+        with self._sync_lock:
+            if not self._file.closed:
+                self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def open_checkpoint(base_url: str) -> Optional[CrawlCheckpoint]:
+    """Open the checkpoint log for a crawl from `base_url`, or None when disabled or busy.
+
+    Logs older than CRAWL_CHECKPOINT_MAX_AGE seconds are discarded rather
+    than resumed, since their pages are likely stale. It defaults to the
+    snapshot freshness window (SNAPSHOT_MAX_AGE), the age at which a
+    stored page would be revalidated anyway.
+    """
+    directory = os.getenv('CRAWL_CHECKPOINT_DIR', '.cache/crawl_checkpoints')
+    if not directory:
+        return None
+
+    name = hashlib.sha256(base_url.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(directory, f"{name}.jsonl")
+    max_age = float(os.getenv('CRAWL_CHECKPOINT_MAX_AGE', os.getenv('SNAPSHOT_MAX_AGE', '300')))
+    try:
+        if os.path.exists(path) and time.time() - os.path.getmtime(path) > max_age:
+            logger.info(f"Discarding stale crawl checkpoint {path}")
+            os.remove(path)
+        return CrawlCheckpoint(path, flush_interval=float(os.getenv('CRAWL_CHECKPOINT_INTERVAL', '5')))
+    except OSError as e:
+        logger.warning(f"Crawl checkpoint {path} unavailable, crawling without it: {str(e)}")
+        return None
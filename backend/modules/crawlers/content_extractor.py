@@ -1,16 +1,23 @@
 import httpx
 import asyncio
 import logging
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from .base_crawler import BaseCrawler
 from .html_extractor import HTMLExtractor
+from .page_parser import parse_page
+from ..cpu_executor import run_cpu_bound
+from ..http_clients import client_session
 
 logger = logging.getLogger(__name__)
 
 class ContentExtractor(BaseCrawler):
-    def __init__(self, base_url: str):
-        super().__init__(base_url)
+    def __init__(
+        self,
+        base_url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ):
+        super().__init__(base_url, client=client, on_progress=on_progress)
         self.html_extractor = HTMLExtractor()
         self.retry_count = 3
         self.retry_delay = 1  # seconds
@@ -24,22 +31,37 @@ class ContentExtractor(BaseCrawler):
             crawl_results = await self.crawl_site(max_pages)
             logger.info(f"Site crawl complete. Analyzing {len(crawl_results['pages'])} pages")
             
-            # Get the main content for the target page
-            main_content = await self._retry_with_backoff(
-                self.extract_page_content,
-                start_url
-            )
+            return await self.analyze_crawled_page(start_url, crawl_results)
+            
+        except Exception as e:
+            logger.error(f"Error in site analysis: {str(e)}", exc_info=True)
+            raise
+
+    async def analyze_crawled_page(self, start_url: str, crawl_results: Dict) -> Dict:
+        """Analyze one page's links against a finished crawl of its site."""
+        try:
+            # Serve the target page from the crawl when possible instead of fetching it again
+            document = self.documents.get(start_url) or self.documents.get(self._clean_url(start_url))
+            if document:
+                logger.info(f"Using crawled document for {start_url}")
+                main_content = self._build_main_content(document)
+            else:
+                main_content = await self._retry_with_backoff(
+                    self.extract_page_content,
+                    start_url
+                )
             
             if not main_content:
                 raise ValueError("Failed to extract main content after retries")
 
             logger.info(f"Main content extracted, length: {len(main_content.get('content', ''))}")
             
-            # Find all inbound links to our target page
+            # Find all inbound links to our target page, whatever variant of its URL they use
+            target_url = self._clean_url(start_url)
             inbound_links = []
             for source_url, page_links in crawl_results['link_graph'].items():
                 for link in page_links:
-                    if link['url'] == start_url:
+                    if link['is_internal'] and self._clean_url(link['url']) == target_url:
                         inbound_links.append({
                             'source_url': source_url,
                             'anchor_text': link['text'],
@@ -53,11 +75,14 @@ class ContentExtractor(BaseCrawler):
                 'inbound_links': inbound_links,
                 'outbound_links': main_content['internal_links'],
                 'external_links': main_content['external_links'],
-                'pages_analyzed': len(crawl_results['pages'])
+                'pages_analyzed': len(crawl_results['pages']),
+                'truncated_pages': crawl_results['truncated_pages'],
+                'pages': crawl_results['pages'],
+                'changes': crawl_results.get('changes', {})
             }
             
         except Exception as e:
-            logger.error(f"Error in site analysis: {str(e)}", exc_info=True)
+            logger.error(f"Error analyzing {start_url}: {str(e)}", exc_info=True)
             raise
 
     async def _retry_with_backoff(self, func, *args, **kwargs):
@@ -77,36 +102,19 @@ class ContentExtractor(BaseCrawler):
         """Extract content from a single page."""
         logger.info(f"Extracting content from {url}")
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                html = response.text
+            async with client_session(self.client) as client:
+                html, truncated = await self._fetch_html(client, url)
                 
                 if not html.strip():
                     raise ValueError("Received empty HTML response")
             
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Extract main content and links
-            main_content = self._extract_content(soup)
-            if not main_content.strip():
+            # Extract main content and links off the event loop
+            page = await run_cpu_bound(parse_page, html, url, self.domain)
+            page['truncated'] = truncated
+            if not page['content'].strip():
                 logger.warning(f"No main content extracted from {url}")
             
-            links = self._extract_links(soup, url)
-            
-            # Separate internal and external links
-            internal_links = [link for link in links if link['is_internal']]
-            external_links = [link for link in links if not link['is_internal']]
-            
-            logger.info(f"Extracted {len(internal_links)} internal and {len(external_links)} external links")
-            
-            return {
-                'url': url,
-                'title': soup.title.string if soup.title else '',
-                'content': main_content,
-                'internal_links': internal_links,
-                'external_links': external_links
-            }
+            return self._build_main_content(page)
         except httpx.HTTPError as e:
             logger.error(f"HTTP error extracting content from {url}: {str(e)}", exc_info=True)
             raise
@@ -114,12 +122,39 @@ class ContentExtractor(BaseCrawler):
             logger.error(f"Error extracting content from {url}: {str(e)}", exc_info=True)
             raise
 
-def extract_content(url: str) -> Dict:
-    """Main function to extract and analyze content."""
+    @staticmethod
+    def _build_main_content(document: Dict) -> Dict:
+        """Shape a parsed document into the main content record."""
+        links = document['links']
+        
+        # Separate internal and external links
+        internal_links = [link for link in links if link['is_internal']]
+        external_links = [link for link in links if not link['is_internal']]
+        
+        logger.info(f"Extracted {len(internal_links)} internal and {len(external_links)} external links")
+        
+        return {
+            'url': document['url'],
+            'title': document['title'],
+            'content': document['content'],
+            'internal_links': internal_links,
+            'external_links': external_links,
+            'truncated': document.get('truncated', False)
+        }
+
+async def extract_content(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """Main function to extract and analyze content.
+    
+    `on_progress` is called with the crawl's progress after every page.
+    """
     try:
         logger.info(f"Starting content extraction for {url}")
-        extractor = ContentExtractor(url)
-        result = asyncio.run(extractor.analyze_site_links(url))
+        extractor = ContentExtractor(url, client=client, on_progress=on_progress)
+        result = await extractor.analyze_site_links(url)
         logger.info("Content extraction completed successfully")
         return result
     except Exception as e:
@@ -0,0 +1,41 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+import numpy as np
+
+SIMHASH_BITS = 64
+WORD = re.compile(r'\w+')
+
+def content_hash(content: str) -> str:
+    """Hash a page's extracted main content."""
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+def link_structure_hash(links: List[Dict]) -> str:
+    """Hash a page's outgoing links (target and anchor text), ignoring their order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for url, text in sorted((link['url'], link.get('text') or '') for link in links):
+        digest.update(f"{url}\0{text}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def simhash(text: str, shingle_size: int = 3, min_tokens: int = 20) -> Optional[int]:
+    """64-bit SimHash of a text's word shingles.
+
+    Texts sharing most of their shingles get fingerprints a few bits
+    apart. Returns None for texts too short to fingerprint reliably.
+    """
+    tokens = WORD.findall(text.lower())
+    if len(tokens) < max(min_tokens, shingle_size):
+        return None
+
+    shingles = {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # Each bit is set when most shingle hashes have it set
+    shifts = np.arange(SIMHASH_BITS, dtype=np.uint64)
+    ones = ((hashes[:, None] >> shifts) & np.uint64(1)).sum(axis=0)
+    bits = np.flatnonzero(ones * 2 > len(hashes))
+    return sum(1 << int(bit) for bit in bits)
@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# URL patterns whose pages rarely matter for internal linking, and how far
+# they are pushed back (in units of link depth). Negative values pull
+# pages forward.
+DEFAULT_PATTERN_RULES = {
+    r'/(tag|tags|category|author)/': 1.5,
+    r'/page/\d+|[?&](page|p)=\d+': 2.0,
+    r'[?&](sort|order|filter|view)=': 2.0,
+    r'/(feed|rss|print|amp)(/|$)|[?&](print|replytocom)=': 3.0,
+    r'/(login|signin|register|cart|checkout|account)(/|$)': 3.0,
+    r'/\d{4}/\d{2}(/\d{2})?/?$': 1.0
+}
+
+def load_pattern_rules() -> List[Tuple[re.Pattern, float]]:
+    """Read URL pattern rules from CRAWLER_PRIORITY_RULES (a JSON object of regex -> adjustment)."""
+    rules = DEFAULT_PATTERN_RULES
+    value = os.getenv('CRAWLER_PRIORITY_RULES')
+    if value:
+        try:
+            rules = {str(pattern): float(adjustment) for pattern, adjustment in json.loads(value).items()}
+        except Exception as e:
+            logger.error(f"Invalid CRAWLER_PRIORITY_RULES, using defaults: {str(e)}")
+    return [(re.compile(pattern, re.IGNORECASE), adjustment) for pattern, adjustment in rules.items()]
+
+class CrawlFrontier:
+    """Priority queue of URLs to crawl, best first.
+
+    A URL's score is its link depth, minus a bonus that grows with the
+    number of crawled pages linking to it, plus any URL pattern
+    adjustments; lower scores are crawled first. Scores are updated as
+    more inbound links are found: the URL is pushed again and the stale
+    heap entry is skipped when popped. Once stale entries outnumber live
+    ones the heap is compacted, so it stays within twice the number of
+    queued URLs however many links point at them. Pinned URLs (the seeds)
+    always come first.
+
+    URLs are queued under their canonical form, which dedupes them, along
+    with the URL to fetch (the link as it was written, since the server
+    may not answer at the canonical form).
+
+    Workers call `get()` until it returns None, which happens once the
+    frontier is empty and no popped URL is still being processed (each
+    must be acknowledged with `task_done()`).
+    """
+
+    def __init__(
+        self,
+        inbound_weight: float = 1.0,
+        pattern_rules: Optional[List[Tuple[re.Pattern, float]]] = None
+    ):
+        self.inbound_weight = inbound_weight
+        self.pattern_rules = load_pattern_rules() if pattern_rules is None else pattern_rules
+        self._heap: List[Tuple[float, int, str]] = []
+        # url -> [depth, inbound links, pattern adjustment, current score, fetch URL] for queued URLs
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+        self._in_progress = 0
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, url: str, depth: int, pinned: bool = False, fetch_url: Optional[str] = None) -> None:
+        """Queue a newly discovered URL, to be fetched at `fetch_url` (defaults to `url`)."""
+        if url in self._entries:
+            self.reinforce(url, depth)
+            return
+        adjustment = sum(value for pattern, value in self.pattern_rules if pattern.search(url))
+        entry = [depth, 0, adjustment, -math.inf if pinned else 0.0, fetch_url or url]
+        self._entries[url] = entry
+        self._schedule(url, entry)
+
+    def reinforce(self, url: str, depth: int) -> None:
+        """Record another inbound link to a URL that is still queued."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return
+        entry[0] = min(entry[0], depth)
+        entry[1] += 1
+        # A pinned URL is already first, and an unchanged score needs no new heap entry
+        if entry[3] != -math.inf and self._score(entry) != entry[3]:
+            self._schedule(url, entry)
+
+    async def get(self) -> Optional[Tuple[str, str, int]]:
+        """Pop the best URL with its fetch URL and depth, or return None once the crawl is finished."""
+        while True:
+            while self._heap:
+                score, _, url = heapq.heappop(self._heap)
+                entry = self._entries.get(url)
+                if entry is None or entry[3] != score:
+                    continue
+                del self._entries[url]
+                self._in_progress += 1
+                return url, entry[4], entry[0]
+            if not self._in_progress:
+                self._changed.set()
+                return None
+            self._changed.clear()
+            await self._changed.wait()
+
+    def task_done(self) -> None:
+        """Mark a URL returned by get() as processed."""
+        self._in_progress -= 1
+        if not self._in_progress:
+            self._changed.set()
+
+    def heap_size(self) -> int:
+        """Return the number of heap entries, stale ones included."""
+        return len(self._heap)
+
+    def _score(self, entry: list) -> float:
+        depth, inbound, adjustment = entry[:3]
+        return depth + adjustment - self.inbound_weight * math.log1p(inbound)
+
+    def _schedule(self, url: str, entry: list) -> None:
+        if entry[3] != -math.inf:
+            entry[3] = self._score(entry)
+        heapq.heappush(self._heap, (entry[3], next(self._counter), url))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._compact()
+        self._changed.set()
+
+    def _compact(self) -> None:
+        # Each queued URL has exactly one live entry; keeping its counter keeps the pop order
+        self._heap = [
+            item for item in self._heap
+            if item[2] in self._entries and self._entries[item[2]][3] == item[0]
+        ]
+        heapq.heapify(self._heap)
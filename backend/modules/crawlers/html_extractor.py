@@ -1,14 +1,21 @@
 from bs4 import BeautifulSoup
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from urllib.parse import urljoin
+from .link_context import extract_link_contexts
+from .page_parser import make_soup
 
 logger = logging.getLogger(__name__)
 
 class HTMLExtractor:
     @staticmethod
-    def extract_main_content(soup: BeautifulSoup) -> str:
-        """Extract readable text content from HTML while excluding code blocks."""
+    def extract_main_content(soup: Union[str, BeautifulSoup]) -> str:
+        """Extract readable text content from HTML while excluding code blocks.
+        
+        Markup is parsed with the configured backend (lxml when available).
+        """
+        if isinstance(soup, str):
+            soup = make_soup(soup)
         # First remove all script and style elements
         for element in soup.find_all(['script', 'style', 'code', 'pre']):
             element.decompose()
@@ -51,10 +58,13 @@ class HTMLExtractor:
         return '\n\n'.join(paragraphs)
 
     @staticmethod
-    def extract_links(soup: BeautifulSoup, current_url: str, domain: str) -> Dict[str, List[Dict]]:
-        """Extract both internal and external links with context."""
+    def extract_links(soup: Union[str, BeautifulSoup], current_url: str, domain: str) -> Dict[str, List[Dict]]:
+        """Extract both internal and external links with context, from markup or a parsed soup."""
+        if isinstance(soup, str):
+            soup = make_soup(soup)
         internal_links = []
         external_links = []
+        contexts = extract_link_contexts(soup, 100)
         
         for link in soup.find_all('a', href=True):
             href = link.get('href', '').strip()
@@ -63,7 +73,7 @@ class HTMLExtractor:
                 
             try:
                 absolute_url = urljoin(current_url, href)
-                context = HTMLExtractor._get_link_context(link)
+                context = contexts.get(id(link), '')
                 link_data = {
                     'url': absolute_url,
                     'text': link.get_text(strip=True),
@@ -82,25 +92,3 @@ class HTMLExtractor:
             'internal_links': internal_links,
             'external_links': external_links
         }
-
-    @staticmethod
-    def _get_link_context(link_element) -> str:
-        """Get the surrounding context of a link."""
-        parent = link_element.find_parent(['p', 'div', 'section'])
-        if parent:
-            # Get text before and after the link
-            html = str(parent)
-            link_html = str(link_element)
-            parts = html.split(link_html)
-            
-            if len(parts) >= 2:
-                before = BeautifulSoup(parts[0], 'html.parser').get_text(strip=True)
-                after = BeautifulSoup(parts[1], 'html.parser').get_text(strip=True)
-                
-                # Limit context length
-                before = before[-100:] if len(before) > 100 else before
-                after = after[:100] if len(after) > 100 else after
-                
-                return f"{before} [LINK] {after}"
-        
-        return ""
\ No newline at end of file
@@ -0,0 +1,66 @@
+import logging
+from typing import Dict, List
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text bounds a link's context
+CONTEXT_PARENTS = {'p', 'div', 'section'}
+
+# String types that count as text, matching Tag.get_text()
+TEXT_TYPES = (NavigableString, CData)
+
+def extract_link_contexts(soup: BeautifulSoup, context_length: int = 150) -> Dict[int, str]:
+    """Compute the "before [LINK] after" context for every link in one traversal.
+
+    The context is the stripped text of the link's nearest <p>, <div> or
+    <section> ancestor on either side of the link, capped at
+    `context_length` characters per side. Links without such an ancestor
+    get no entry. The result is keyed by id() of the <a> element.
+    """
+    pieces: List[str] = []
+    length = 0
+
+    # [start, end] text offsets of the currently open context parents
+    open_parents: List[List[int]] = []
+    # [link, parent span, start, end] for every link with a context parent
+    link_spans: List[list] = []
+    open_links: Dict[int, list] = {}
+
+    stack = [(soup, iter(soup.contents))]
+    while stack:
+        tag, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            # Leaving `tag`: close its spans
+            stack.pop()
+            if tag.name == 'a' and id(tag) in open_links:
+                open_links.pop(id(tag))[3] = length
+            if tag.name in CONTEXT_PARENTS:
+                open_parents.pop()[1] = length
+            continue
+
+        if isinstance(child, Tag):
+            if child.name in CONTEXT_PARENTS:
+                open_parents.append([length, length])
+            if child.name == 'a' and open_parents:
+                span = [child, open_parents[-1], length, length]
+                link_spans.append(span)
+                open_links[id(child)] = span
+            stack.append((child, iter(child.contents)))
+        elif type(child) in TEXT_TYPES:
+            text = child.strip()
+            if text:
+                pieces.append(text)
+                length += len(text)
+
+    text = ''.join(pieces)
+    contexts = {}
+    for link, (parent_start, parent_end), start, end in link_spans:
+        before = text[max(parent_start, start - context_length):start]
+        after = text[end:min(parent_end, end + context_length)]
+        contexts[id(link)] = f"{before} [LINK] {after}"
+
+    logger.debug(f"Computed context for {len(contexts)} links")
+    return contexts
@@ -0,0 +1,167 @@
+import logging
+import re
+from typing import Dict, List
+from urllib.parse import urljoin
+import lxml.html
+from lxml import etree
+from .link_context import CONTEXT_PARENTS
+from .page_parser import CONTENT_TAGS, SKIPPED_CLASSES, is_internal_url
+
+logger = logging.getLogger(__name__)
+
+# lxml fast path for page_parser.parse_page. It reproduces what the
+# BeautifulSoup/html.parser path extracts from well-formed pages in a single
+# pass over the lxml tree; malformed markup may be repaired differently.
+
+def _class_xpath(name: str) -> str:
+    return f'//*[contains(concat(" ", normalize-space(@class), " "), " {name} ")]'
+
+# XPath equivalents of page_parser.CONTENT_SELECTORS, in the same order
+CONTENT_XPATHS = [etree.XPath(xpath) for xpath in [
+    '//article', '//main', '//*[@role="main"]',
+    _class_xpath('post-content'), _class_xpath('entry-content'), _class_xpath('content'),
+    _class_xpath('article-content'), '//*[@id="content"]', '//*[@itemprop="articleBody"]'
+]]
+
+CANONICAL_XPATH = etree.XPath('//link[contains(concat(" ", normalize-space(@rel), " "), " canonical ")]/@href')
+
+# Elements whose strings BeautifulSoup does not treat as text
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+BODY_TAG = re.compile(r'<body[\s>/]', re.IGNORECASE)
+
+# lxml refuses str input that carries an XML encoding declaration
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def parse_page_lxml(html: str, url: str, domain: str) -> Dict:
+    """Parse a page with lxml into the same document shape as parse_page."""
+    doc = lxml.html.document_fromstring(XML_DECLARATION.sub('', html, count=1))
+
+    title_element = doc.find('.//title')
+    title = ''
+    if title_element is not None and len(title_element) == 0 and title_element.text:
+        title = title_element.text
+
+    content_area = None
+    for xpath in CONTENT_XPATHS:
+        matches = xpath(doc)
+        if matches:
+            content_area = matches[0]
+            break
+    # lxml always adds a <body>; html.parser only has one if the page does
+    if content_area is None and BODY_TAG.search(html):
+        content_area = doc.body
+
+    content, links = _walk(doc, content_area, url, domain)
+    canonical = CANONICAL_XPATH(doc)
+    return {
+        'url': url,
+        'title': title,
+        'content': content,
+        'links': links,
+        'canonical': urljoin(url, canonical[0].strip()) if canonical else None
+    }
+
+def _walk(doc, content_area, current_url: str, domain: str, context_length: int = 150):
+    """Collect stripped text, paragraph spans and link spans in one traversal."""
+    pieces: List[str] = []
+    length = 0
+    suppressed = 0
+    in_content_area = False
+
+    # Each span is [element, start, end] in offsets of the joined text
+    paragraph_spans: List[list] = []
+    link_spans: List[list] = []
+    open_spans: Dict[object, list] = {}
+    open_parents: List[list] = []
+
+    stack = [(doc, iter(doc))]
+    if doc.text:
+        pieces.append(doc.text.strip())
+        length += len(pieces[-1])
+
+    while stack:
+        element, children = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            # Leaving `element`: close its spans, then emit its tail
+            stack.pop()
+            tag = element.tag
+            span = open_spans.pop(element, None)
+            if span is not None:
+                span[2] = length
+            if tag in CONTEXT_PARENTS and element is not doc:
+                open_parents.pop()[1] = length
+            if tag in NON_TEXT_TAGS:
+                suppressed -= 1
+            if element is content_area:
+                in_content_area = False
+            if stack and element.tail and not suppressed:
+                text = element.tail.strip()
+                if text:
+                    pieces.append(text)
+                    length += len(text)
+            continue
+
+        tag = child.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions: only the tail is text
+            if child.tail and not suppressed:
+                text = child.tail.strip()
+                if text:
+                    pieces.append(text)
+                    length += len(text)
+            continue
+
+        if child is content_area:
+            in_content_area = True
+        elif in_content_area and tag in CONTENT_TAGS:
+            if not any(cls in child.get('class', '').lower() for cls in SKIPPED_CLASSES):
+                span = [child, length, length]
+                paragraph_spans.append(span)
+                open_spans[child] = span
+
+        if tag in CONTEXT_PARENTS:
+            open_parents.append([length, length])
+        if tag == 'a' and 'href' in child.attrib:
+            span = [child, length, length, open_parents[-1] if open_parents else None]
+            link_spans.append(span)
+            open_spans[child] = span
+        if tag in NON_TEXT_TAGS:
+            suppressed += 1
+
+        stack.append((child, iter(child)))
+        if child.text and not suppressed:
+            text = child.text.strip()
+            if text:
+                pieces.append(text)
+                length += len(text)
+
+    text = ''.join(pieces)
+    paragraphs = [text[start:end] for _, start, end in paragraph_spans if end > start]
+
+    links = []
+    for element, start, end, parent in link_spans:
+        href = element.get('href', '').strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+
+        try:
+            absolute_url = urljoin(current_url, href)
+            context = ''
+            if parent is not None:
+                before = text[max(parent[0], start - context_length):start]
+                after = text[end:min(parent[1], end + context_length)]
+                context = f"{before} [LINK] {after}"
+
+            links.append({
+                'url': absolute_url,
+                'text': text[start:end],
+                'context': context,
+                'is_internal': is_internal_url(absolute_url, domain)
+            })
+        except Exception as e:
+            logger.error(f"Error processing link {href}: {str(e)}")
+
+    return '\n\n'.join(paragraphs), links
@@ -0,0 +1,89 @@
+import logging
+from typing import Dict, List, Optional, Set
+from .fingerprint import SIMHASH_BITS
+
+logger = logging.getLogger(__name__)
+
+class NearDuplicateIndex:
+    """Groups pages whose SimHash fingerprints are within `max_distance` bits.
+
+    Fingerprints are split into `max_distance + 1` bands and bucketed by
+    band value; two fingerprints that differ in at most `max_distance`
+    bits must agree on at least one band, so only pages sharing a bucket
+    are compared. A page joins the cluster of the nearest match whose
+    representative is also within `max_distance` bits, so chains of
+    small edits never pull far-apart pages together. Each cluster is
+    represented by its shortest URL (ties broken alphabetically), which
+    is usually the one without facets, print flags or page numbers, as
+    long as it is within `max_distance` of every other member.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        width = SIMHASH_BITS // band_count
+        self._bands = [
+            (i * width, SIMHASH_BITS - i * width if i == band_count - 1 else width)
+            for i in range(band_count)
+        ]
+        self._buckets: List[Dict[int, List[str]]] = [{} for _ in self._bands]
+        self._fingerprints: Dict[str, int] = {}
+        # Each page's cluster representative, and each representative's cluster
+        self._roots: Dict[str, str] = {}
+        self._members: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def add(self, url: str, fingerprint: Optional[int]) -> str:
+        """Index a page and return the canonical URL of its cluster."""
+        if fingerprint is None or url in self._fingerprints:
+            return self.canonical(url)
+
+        self._fingerprints[url] = fingerprint
+        compared: Set[str] = set()
+        roots: Set[str] = set()
+        for (start, width), buckets in zip(self._bands, self._buckets):
+            bucket = buckets.setdefault((fingerprint >> start) & ((1 << width) - 1), [])
+            for other in bucket:
+                if other not in compared:
+                    compared.add(other)
+                    if self._distance(url, other) <= self.max_distance:
+                        roots.add(self._roots[other])
+            bucket.append(url)
+
+        candidates = [root for root in roots if self._distance(url, root) <= self.max_distance]
+        if candidates:
+            self._join(url, min(candidates, key=lambda root: (self._distance(url, root), _rank(root))))
+        else:
+            self._roots[url] = url
+            self._members[url] = [url]
+        return self.canonical(url)
+
+    def canonical(self, url: str) -> str:
+        """Return the representative of a page's cluster (the page itself if it has none)."""
+        return self._roots.get(url, url)
+
+    def clusters(self) -> Dict[str, List[str]]:
+        """Map each canonical URL to the near-duplicates it stands for (excluding itself)."""
+        return {
+            root: [url for url in members if url != root]
+            for root, members in self._members.items() if len(members) > 1
+        }
+
+    def _distance(self, a: str, b: str) -> int:
+        return (self._fingerprints[a] ^ self._fingerprints[b]).bit_count()
+
+    def _join(self, url: str, root: str) -> None:
+        members = self._members[root]
+        members.append(url)
+        self._roots[url] = root
+        # The shorter URL takes over only if every member stays within reach of it
+        if _rank(url) < _rank(root) and all(self._distance(url, other) <= self.max_distance for other in members):
+            del self._members[root]
+            self._members[url] = members
+            for member in members:
+                self._roots[member] = url
+
+def _rank(url: str):
+    return (len(url), url)
@@ -0,0 +1,144 @@
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse, urljoin
+from bs4 import BeautifulSoup, Tag
+from .link_context import extract_link_contexts
+from .parser_backend import PARSER_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Parsing runs in worker processes (see modules.cpu_executor), so everything
+# here is a module-level function that takes and returns plain, picklable data.
+
+CONTENT_SELECTORS = [
+    'article', 'main', '[role="main"]',
+    '.post-content', '.entry-content', '.content',
+    '.article-content', '#content', '[itemprop="articleBody"]'
+]
+
+CONTENT_TAGS = {'p', 'article', 'section', 'div'}
+
+SKIPPED_CLASSES = ['nav', 'header', 'footer', 'sidebar', 'menu']
+
+def parse_page(html: str, url: str, domain: str) -> Dict:
+    """Parse a page's HTML once into a document with title, main text and links.
+
+    Each link carries its surrounding context, so callers never need to
+    re-fetch or re-parse the page. Uses the lxml fast path when configured
+    (see parser_backend) and falls back to BeautifulSoup if it fails.
+    """
+    if PARSER_BACKEND == 'lxml':
+        try:
+            from .lxml_parser import parse_page_lxml
+            return parse_page_lxml(html, url, domain)
+        except Exception as e:
+            logger.warning(f"lxml parsing failed for {url}, falling back to html.parser: {str(e)}")
+
+    soup = BeautifulSoup(html, 'html.parser')
+    content, links = _walk_document(soup, url, domain)
+    canonical = soup.find('link', rel='canonical', href=True)
+    return {
+        'url': url,
+        'title': str(soup.title.string) if soup.title and soup.title.string else '',
+        'content': content,
+        'links': links,
+        'canonical': urljoin(url, canonical['href'].strip()) if canonical else None
+    }
+
+def extract_main_content(page: Union[str, BeautifulSoup]) -> str:
+    """Extract main content from HTML markup (parsed like parse_page) or an already parsed soup."""
+    if isinstance(page, str):
+        return parse_page(page, '', '')['content']
+    content, _ = _walk_document(page, None, '')
+    return content
+
+def extract_links(page: Union[str, BeautifulSoup], current_url: str, domain: str) -> List[Dict]:
+    """Extract all links with context from HTML markup or an already parsed soup."""
+    if isinstance(page, str):
+        return parse_page(page, current_url, domain)['links']
+    _, links = _walk_document(page, current_url, domain, include_content=False)
+    return links
+
+def make_soup(html: str) -> BeautifulSoup:
+    """Parse HTML into a soup with the configured backend's tree builder (see parser_backend)."""
+    return BeautifulSoup(html, 'lxml' if PARSER_BACKEND == 'lxml' else 'html.parser')
+
+def _find_content_area(soup: BeautifulSoup):
+    """Locate the main content container, falling back to <body>."""
+    for selector in CONTENT_SELECTORS:
+        content_area = soup.select_one(selector)
+        if content_area:
+            return content_area
+    return soup.body
+
+def _walk_document(
+    soup: BeautifulSoup,
+    current_url: Optional[str],
+    domain: str,
+    include_content: bool = True
+) -> Tuple[str, List[Dict]]:
+    """Collect content paragraphs and links in a single pass over the document.
+
+    Links are only collected when `current_url` is given.
+    """
+    content_area = _find_content_area(soup) if include_content else None
+    area_end = content_area
+    while isinstance(area_end, Tag) and area_end.contents:
+        area_end = area_end.contents[-1]
+
+    paragraphs = []
+    links = []
+    in_content_area = False
+    contexts = extract_link_contexts(soup, 150) if current_url is not None else {}
+
+    for element in soup.descendants:
+        if isinstance(element, Tag):
+            if element is content_area:
+                in_content_area = True
+            else:
+                if in_content_area and element.name in CONTENT_TAGS:
+                    text = _paragraph_text(element)
+                    if text:
+                        paragraphs.append(text)
+
+                if current_url is not None and element.name == 'a' and element.has_attr('href'):
+                    link = _link_data(element, current_url, domain, contexts)
+                    if link:
+                        links.append(link)
+
+        if element is area_end:
+            in_content_area = False
+
+    return '\n\n'.join(paragraphs), links
+
+def _paragraph_text(element: Tag) -> str:
+    """Return the element's text, or '' for navigation, header, footer, etc."""
+    if any(cls in str(element.get('class', [])).lower() for cls in SKIPPED_CLASSES):
+        return ''
+    return element.get_text(strip=True)
+
+def _link_data(link: Tag, current_url: str, domain: str, contexts: Dict[int, str]) -> Optional[Dict]:
+    """Build the link record for an anchor, or None for non-navigational hrefs."""
+    href = link.get('href', '').strip()
+    if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+        return None
+
+    try:
+        absolute_url = urljoin(current_url, href)
+        return {
+            'url': absolute_url,
+            'text': link.get_text(strip=True),
+            'context': contexts.get(id(link), ''),
+            'is_internal': is_internal_url(absolute_url, domain)
+        }
+    except Exception as e:
+        logger.error(f"Error processing link {href}: {str(e)}")
+        return None
+
+def is_internal_url(url: str, domain: str) -> bool:
+    """Check if URL belongs to the same domain."""
+    try:
+        return urlparse(url).netloc.lower() == domain.lower()
+    except Exception as e:
+        logger.error(f"Error parsing URL {url}: {str(e)}")
+        return False
@@ -0,0 +1,34 @@
+import importlib.util
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Parser backends in order of preference for HTML_PARSER_BACKEND=auto.
+# 'html.parser' is the BeautifulSoup path and is always available.
+FAST_BACKENDS = ['lxml']
+FALLBACK_BACKEND = 'html.parser'
+
+def _is_available(backend: str) -> bool:
+    if backend == FALLBACK_BACKEND:
+        return True
+    return importlib.util.find_spec(backend) is not None
+
+def resolve_backend(backend: str) -> str:
+    """Pick the parser backend for a configured name.
+
+    `auto` uses the fastest installed backend. An explicit backend that is
+    not installed falls back to BeautifulSoup's html.parser.
+    """
+    if backend == 'auto':
+        for candidate in FAST_BACKENDS:
+            if _is_available(candidate):
+                return candidate
+        return FALLBACK_BACKEND
+
+    if backend not in FAST_BACKENDS + [FALLBACK_BACKEND] or not _is_available(backend):
+        logger.warning(f"HTML parser backend '{backend}' is not available, using {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+    return backend
+
+PARSER_BACKEND = resolve_backend(os.getenv('HTML_PARSER_BACKEND', 'auto'))
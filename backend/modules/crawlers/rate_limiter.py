@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class HostThrottle:
+    """Per-host concurrency cap combined with a per-host token-bucket politeness budget.
+
+    Hosts with no fetch in progress are forgotten once more than
+    `max_idle_hosts` are tracked and their bucket would have refilled
+    anyway, so a long-lived throttle does not grow with every host seen.
+    """
+
+    def __init__(self, per_host_concurrency: int, requests_per_second: float, burst: float,
+                 max_idle_hosts: int = 1024):
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_idle_hosts = max_idle_hosts
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._active: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Hold one of the host's concurrency slots for the duration of a fetch."""
+        if host not in self._semaphores:
+            if len(self._semaphores) >= self.max_idle_hosts:
+                self._forget_idle_hosts()
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+            self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            self._active[host] = 0
+
+        self._active[host] += 1
+        try:
+            async with self._semaphores[host]:
+                await self._buckets[host].acquire()
+                yield
+        finally:
+            self._active[host] -= 1
+            self._last_used[host] = time.monotonic()
+
+    def _forget_idle_hosts(self) -> None:
+        refill = self.burst / self.requests_per_second if self.requests_per_second > 0 else 0.0
+        cutoff = time.monotonic() - refill
+        for host in [host for host, active in self._active.items()
+                     if not active and self._last_used.get(host, 0.0) <= cutoff]:
+            del self._semaphores[host], self._buckets[host], self._active[host]
+            self._last_used.pop(host, None)
+
+_host_throttles: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HostThrottle]' = weakref.WeakKeyDictionary()
+
+def get_host_throttle() -> HostThrottle:
+    """Return the throttle shared by every crawl in the process, configured from the environment.
+
+    Concurrent crawls of one site then share its politeness budget. The
+    throttle's locks belong to an event loop, so there is one per running
+    loop (the server runs a single loop).
+    """
+    loop = asyncio.get_running_loop()
+    throttle = _host_throttles.get(loop)
+    if throttle is None:
+        per_host_concurrency = int(os.getenv('CRAWLER_PER_HOST_CONCURRENCY', '4'))
+        throttle = HostThrottle(
+            per_host_concurrency=per_host_concurrency,
+            requests_per_second=float(os.getenv('CRAWLER_REQUESTS_PER_SECOND', '20')),
+            burst=float(os.getenv('CRAWLER_BURST', str(per_host_concurrency)))
+        )
+        _host_throttles[loop] = throttle
+    return throttle
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from .url_canonicalizer import get_url_canonicalizer
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    url TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    title TEXT,
+    content TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    truncated INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Columns added after the first release, created on open when missing
+_COLUMNS = {
+    'truncated': 'INTEGER NOT NULL DEFAULT 0',
+    'host': 'TEXT',
+    'links': 'TEXT',
+    'canonical': 'TEXT',
+    'content_hash': 'TEXT',
+    'links_hash': 'TEXT',
+    'deleted_at': 'REAL'
+}
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a snapshot or dedupe key (its canonical form, see UrlCanonicalizer)."""
+    return get_url_canonicalizer().canonicalize(url)
+
+class SnapshotStore:
+    """On-disk store of crawled pages used to skip or revalidate repeat fetches.
+
+    Besides the raw HTML, each row keeps the parsed document (title, text,
+    links) and its fingerprints, so an unchanged page never needs parsing
+    again and a recrawl can tell which pages actually changed. Pages that
+    disappear are tombstoned rather than deleted.
+    """
+
+    def __init__(self, path: str, max_age: float = 300.0):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(snapshots)")}
+            for name, definition in _COLUMNS.items():
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE snapshots ADD COLUMN {name} {definition}")
+            if 'host' not in columns:
+                self._conn.executemany(
+                    "UPDATE snapshots SET host = ? WHERE url = ?",
+                    [(urlparse(row['url']).netloc, row['url'])
+                     for row in self._conn.execute("SELECT url FROM snapshots").fetchall()]
+                )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_host ON snapshots (host)")
+        logger.info(f"Snapshot store ready at {path} (max age {max_age}s)")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the stored snapshot for a URL, if any and not tombstoned."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM snapshots WHERE url = ? AND deleted_at IS NULL", (normalize_url(url),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, snapshot: Dict) -> bool:
+        """Check whether a snapshot can be served without revalidation."""
+        return time.time() - snapshot['fetched_at'] < self.max_age
+
+    def conditional_headers(self, snapshot: Optional[Dict]) -> Dict[str, str]:
+        """Build conditional GET headers for revalidating a snapshot."""
+        headers = {}
+        if snapshot:
+            if snapshot.get('etag'):
+                headers['If-None-Match'] = snapshot['etag']
+            if snapshot.get('last_modified'):
+                headers['If-Modified-Since'] = snapshot['last_modified']
+        return headers
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        truncated: bool = False
+    ) -> None:
+        """Store freshly fetched HTML, replacing any previous snapshot.
+
+        The previous fingerprints are kept so the next `record_document`
+        can tell whether the page changed; the parsed links are cleared
+        until then.
+        """
+        key = normalize_url(url)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO snapshots
+                   (url, host, html, etag, last_modified, fetched_at, truncated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       html = excluded.html, etag = excluded.etag,
+                       last_modified = excluded.last_modified, fetched_at = excluded.fetched_at,
+                       truncated = excluded.truncated, links = NULL, deleted_at = NULL""",
+                (key, urlparse(key).netloc, html, etag, last_modified, time.time(), int(truncated))
+            )
+
+    def record_document(self, url: str, document: Dict, content_hash: str, links_hash: str) -> str:
+        """Store a parsed document with its fingerprints.
+
+        Returns 'added' for a page seen for the first time, 'changed' when
+        either fingerprint differs from the stored one and 'unchanged'
+        otherwise.
+        """
+        key = normalize_url(url)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT content_hash, links_hash FROM snapshots WHERE url = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                """UPDATE snapshots
+                   SET title = ?, content = ?, links = ?, canonical = ?, content_hash = ?, links_hash = ?
+                   WHERE url = ?""",
+                (document['title'], document['content'], json.dumps(document['links']),
+                 document.get('canonical'), content_hash, links_hash, key)
+            )
+        if row is None or row['content_hash'] is None:
+            return 'added'
+        if (row['content_hash'], row['links_hash']) != (content_hash, links_hash):
+            return 'changed'
+        return 'unchanged'
+
+    def stored_document(self, snapshot: Dict) -> Optional[Dict]:
+        """Rebuild the parsed document of a snapshot, or None if it was never parsed."""
+        if snapshot.get('links') is None:
+            return None
+        return {
+            'url': snapshot['url'],
+            'title': snapshot['title'] or '',
+            'content': snapshot['content'] or '',
+            'links': json.loads(snapshot['links']),
+            'canonical': snapshot.get('canonical'),
+            'truncated': bool(snapshot['truncated'])
+        }
+
+    def live_urls(self, host: str) -> List[str]:
+        """Return the stored, non-tombstoned URLs of a host."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM snapshots WHERE host = ? AND deleted_at IS NULL", (host.lower(),)
+            ).fetchall()
+        return [row['url'] for row in rows]
+
+    def tombstone(self, urls: List[str]) -> None:
+        """Mark pages as removed from their site, dropping their stored HTML and text."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """UPDATE snapshots
+                   SET deleted_at = ?, html = '', title = NULL, content = NULL, links = NULL,
+                       content_hash = NULL, links_hash = NULL, etag = NULL, last_modified = NULL
+                   WHERE url = ? AND deleted_at IS NULL""",
+                [(now, normalize_url(url)) for url in urls]
+            )
+
+    def touch(self, url: str) -> None:
+        """Mark a snapshot as revalidated (e.g. after a 304 response)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE snapshots SET fetched_at = ? WHERE url = ?",
+                (time.time(), normalize_url(url))
+            )
+
+_snapshot_store: Optional[SnapshotStore] = None
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Return the process-wide snapshot store, or None when disabled."""
+    global _snapshot_store
+    if _snapshot_store is None:
+        path = os.getenv('SNAPSHOT_STORE_PATH', '.cache/crawl_snapshots.sqlite3')
+        if not path:
+            return None
+        try:
+            _snapshot_store = SnapshotStore(
+                path,
+                max_age=float(os.getenv('SNAPSHOT_MAX_AGE', '300'))
+            )
+        except Exception as e:
+            logger.error(f"Could not open snapshot store at {path}: {str(e)}")
+            return None
+    return _snapshot_store
@@ -0,0 +1,108 @@
+import logging
+import os
+import posixpath
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change what a page shows
+DEFAULT_DROP_PARAMS = [
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    '_ga', '_gl', 'ref_src', 'sessionid', 'phpsessid', 'jsessionid'
+]
+DEFAULT_DROP_PREFIXES = ['utm_']
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _env_list(name: str, default: Iterable[str]) -> list:
+    value = os.getenv(name)
+    if value is None:
+        return list(default)
+    return [item.strip().lower() for item in value.split(',') if item.strip()]
+
+class UrlCanonicalizer:
+    """Rewrites URLs into one canonical form so variants of a page dedupe.
+
+    Scheme and host are lowercased, default ports and fragments dropped,
+    dot segments resolved, tracking parameters removed and the remaining
+    query keys sorted. Trailing slashes are stripped from non-root paths
+    unless `strip_trailing_slash` is off.
+
+    The canonical form is only a key for dedupe and caching; it is not
+    guaranteed to be servable, so pages are fetched at the URL as linked.
+    """
+
+    def __init__(
+        self,
+        drop_params: Optional[Iterable[str]] = None,
+        drop_prefixes: Optional[Iterable[str]] = None,
+        sort_query: bool = True,
+        strip_trailing_slash: bool = True,
+        honor_rel_canonical: bool = True
+    ):
+        self.drop_params = {param.lower() for param in (DEFAULT_DROP_PARAMS if drop_params is None else drop_params)}
+        self.drop_prefixes = tuple(prefix.lower() for prefix in (DEFAULT_DROP_PREFIXES if drop_prefixes is None else drop_prefixes))
+        self.sort_query = sort_query
+        self.strip_trailing_slash = strip_trailing_slash
+        self.honor_rel_canonical = honor_rel_canonical
+
+    def canonicalize(self, url: str) -> str:
+        """Return the canonical form of an absolute URL (unparseable URLs are returned as is)."""
+        try:
+            parsed = urlparse(url.strip())
+            scheme = parsed.scheme.lower()
+            host = (parsed.hostname or '').rstrip('.')
+            netloc = host
+            if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+                netloc = f"{host}:{parsed.port}"
+            if parsed.username:
+                netloc = f"{parsed.username}{':' + parsed.password if parsed.password else ''}@{netloc}"
+
+            path = parsed.path or '/'
+            if '/.' in path:
+                trailing = path.endswith('/')
+                path = posixpath.normpath(path)
+                if trailing and path != '/':
+                    path += '/'
+            if self.strip_trailing_slash and len(path) > 1:
+                path = path.rstrip('/') or '/'
+
+            params = [
+                (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                if not self._is_dropped(key)
+            ]
+            if self.sort_query:
+                params.sort()
+
+            return urlunparse((scheme, netloc, path, parsed.params, urlencode(params, doseq=True), ''))
+        except Exception as e:
+            logger.error(f"Error canonicalizing URL {url}: {str(e)}")
+            return url
+
+    def page_url(self, url: str, declared: Optional[str], domain: str) -> str:
+        """Canonical URL of a fetched page, following its <link rel=canonical> within the same site."""
+        if self.honor_rel_canonical and declared:
+            declared = self.canonicalize(declared)
+            if urlparse(declared).netloc == domain.lower():
+                return declared
+        return self.canonicalize(url)
+
+    def _is_dropped(self, key: str) -> bool:
+        key = key.lower()
+        return key in self.drop_params or key.startswith(self.drop_prefixes)
+
+_url_canonicalizer: Optional[UrlCanonicalizer] = None
+
+def get_url_canonicalizer() -> UrlCanonicalizer:
+    """Return the process-wide canonicalizer configured from the environment."""
+    global _url_canonicalizer
+    if _url_canonicalizer is None:
+        _url_canonicalizer = UrlCanonicalizer(
+            drop_params=_env_list('CRAWLER_DROP_QUERY_PARAMS', DEFAULT_DROP_PARAMS),
+            drop_prefixes=_env_list('CRAWLER_DROP_QUERY_PREFIXES', DEFAULT_DROP_PREFIXES),
+            sort_query=os.getenv('CRAWLER_SORT_QUERY', 'true').lower() == 'true',
+            strip_trailing_slash=os.getenv('CRAWLER_STRIP_TRAILING_SLASH', 'true').lower() == 'true',
+            honor_rel_canonical=os.getenv('CRAWLER_HONOR_REL_CANONICAL', 'true').lower() == 'true'
+        )
+    return _url_canonicalizer
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import math
+import os
+from array import array
+
+logger = logging.getLogger(__name__)
+
+def url_id(url: str) -> int:
+    """64-bit hash of a URL, never 0."""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+class HashedUrlSet:
+    """Set of URLs stored as 64-bit hashes in an open-addressing table.
+
+    Costs about 16 bytes per URL (at most half full) instead of the
+    hundred-plus bytes a Python set of strings needs. Two URLs colliding
+    on all 64 bits would be treated as one, which is negligible at crawl
+    scale.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        capacity = 1 << max(4, math.ceil(math.log2(max(initial_capacity, 1) * 2)))
+        self._table = array('Q', bytes(8 * capacity))
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, url: str) -> bool:
+        return self._find(url_id(url))[1]
+
+    def add(self, url: str) -> bool:
+        """Add a URL; returns True if it was not in the set yet."""
+        key = url_id(url)
+        slot, found = self._find(key)
+        if found:
+            return False
+        self._table[slot] = key
+        self._size += 1
+        if self._size * 2 > len(self._table):
+            self._resize(len(self._table) * 2)
+        return True
+
+    def _find(self, key: int):
+        mask = len(self._table) - 1
+        slot = key & mask
+        while True:
+            current = self._table[slot]
+            if current == key:
+                return slot, True
+            if current == 0:
+                return slot, False
+            slot = (slot + 1) & mask
+
+    def _resize(self, capacity: int) -> None:
+        old = self._table
+        self._table = table = array('Q', bytes(8 * capacity))
+        mask = capacity - 1
+        for key in old:
+            if key:
+                slot = key & mask
+                while table[slot]:
+                    slot = (slot + 1) & mask
+                table[slot] = key
+
+class BloomFilter:
+    """Fixed-size Bloom filter of URLs.
+
+    Sized for `capacity` URLs at `error_rate` false positives (about 1.2
+    bytes per URL at 1%). A false positive makes the crawler skip a URL
+    it never saw, so this trades a small loss of coverage for memory on
+    very large crawls. Beyond `capacity` the error rate climbs.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        bits = max(64, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._bit_count = bits
+        self._hash_count = max(1, round(bits / capacity * math.log(2)))
+        self._bits = bytearray((bits + 7) // 8)
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Number of distinct URLs added (approximate, as false positives are not counted)."""
+        return self._size
+
+    def __contains__(self, url: str) -> bool:
+        return all(self._bits[bit >> 3] & (1 << (bit & 7)) for bit in self._positions(url))
+
+    def add(self, url: str) -> bool:
+        """Add a URL; returns True if it was (probably) not in the filter yet."""
+        new = False
+        for bit in self._positions(url):
+            if not self._bits[bit >> 3] & (1 << (bit & 7)):
+                self._bits[bit >> 3] |= 1 << (bit & 7)
+                new = True
+        if new:
+            self._size += 1
+        return new
+
+    def _positions(self, url: str):
+        # Double hashing: k positions from two 64-bit hashes
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self._bit_count for i in range(self._hash_count)]
+
+def make_url_set(expected_size: int = 1024):
+    """Build the visited/frontier set selected by CRAWLER_URL_SET (hashed or bloom)."""
+    kind = os.getenv('CRAWLER_URL_SET', 'hashed').lower()
+    if kind == 'bloom':
+        return BloomFilter(
+            capacity=int(os.getenv('CRAWLER_BLOOM_CAPACITY', '1000000')),
+            error_rate=float(os.getenv('CRAWLER_BLOOM_ERROR_RATE', '0.001'))
+        )
+    if kind != 'hashed':
+        logger.warning(f"Unknown CRAWLER_URL_SET '{kind}', using hashed")
+    return HashedUrlSet(expected_size)
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r'\w+')
+
+class DocumentIndex:
+    """Positional phrase index over one document.
+
+    Maps every normalized (lowercased, word-tokenized) n-gram of up to
+    `max_ngram` words to its character spans, so phrase lookups with regex
+    ``\\b<phrase>\\b`` semantics become dictionary hits instead of scans of
+    the full content. Phrases the index cannot answer (longer than
+    `max_ngram` words, or starting/ending with punctuation) fall back to a
+    cached regex search.
+    """
+
+    def __init__(self, content: str, max_ngram: int = 5):
+        self.content = content
+        self.max_ngram = max_ngram
+        self._ngrams: Dict[str, List[Tuple[int, int]]] = {}
+        self._fallback_cache: Dict[Tuple[str, bool], List[Tuple[int, int]]] = {}
+
+        tokens = [(match.group().lower(), match.start(), match.end()) for match in WORD.finditer(content)]
+        for i in range(len(tokens)):
+            words = []
+            for n in range(min(max_ngram, len(tokens) - i)):
+                word, _, end = tokens[i + n]
+                words.append(word)
+                self._ngrams.setdefault(' '.join(words), []).append((tokens[i][1], end))
+
+        logger.debug(f"Indexed {len(tokens)} tokens into {len(self._ngrams)} n-grams")
+
+    def find_all(self, phrase: str, case_sensitive: bool = False) -> List[Tuple[int, int]]:
+        """Return the (start, end) spans of every word-bounded occurrence of a phrase."""
+        words = WORD.findall(phrase)
+        if not words:
+            return []
+
+        indexable = (
+            len(words) <= self.max_ngram and
+            WORD.match(phrase) is not None and
+            WORD.match(phrase[-1]) is not None
+        )
+        if not indexable:
+            return self._regex_find_all(phrase, case_sensitive)
+
+        spans = self._ngrams.get(' '.join(words).lower(), [])
+        if case_sensitive:
+            return [(start, end) for start, end in spans if self.content[start:end] == phrase]
+
+        phrase_lower = phrase.lower()
+        return [(start, end) for start, end in spans if self.content[start:end].lower() == phrase_lower]
+
+    def find(self, phrase: str, case_sensitive: bool = False) -> Optional[Tuple[int, int]]:
+        """Return the span of a phrase's first occurrence, or None."""
+        spans = self.find_all(phrase, case_sensitive)
+        return spans[0] if spans else None
+
+    def context(self, phrase: str, context_length: int = 100, case_sensitive: bool = False) -> str:
+        """Return the text around a phrase's first occurrence with the phrase in [brackets]."""
+        span = self.find(phrase, case_sensitive)
+        if not span:
+            return ""
+
+        start_pos, end_pos = span
+        context_start = max(0, start_pos - context_length)
+        context_end = min(len(self.content), end_pos + context_length)
+
+        # Highlight the phrase as it appears in the text
+        exact_phrase = self.content[start_pos:end_pos]
+        context = self.content[context_start:context_end].strip()
+        return context.replace(exact_phrase, f"[{exact_phrase}]")
+
+    def _regex_find_all(self, phrase: str, case_sensitive: bool) -> List[Tuple[int, int]]:
+        key = (phrase, case_sensitive)
+        if key not in self._fallback_cache:
+            pattern = re.compile(r'\b' + re.escape(phrase) + r'\b', 0 if case_sensitive else re.IGNORECASE)
+            self._fallback_cache[key] = [match.span() for match in pattern.finditer(self.content)]
+        return self._fallback_cache[key]
+
+_index_cache: 'OrderedDict[bytes, DocumentIndex]' = OrderedDict()
+_index_cache_lock = threading.Lock()
+_INDEX_CACHE_SIZE = 8
+
+def get_document_index(content: str) -> DocumentIndex:
+    """Return the index for a document, building it once per distinct content."""
+    key = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).digest()
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    # Built outside the lock; if two threads race on one document, the first index stored wins
+    index = DocumentIndex(content)
+    with _index_cache_lock:
+        index = _index_cache.setdefault(key, index)
+        _index_cache.move_to_end(key)
+        if len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
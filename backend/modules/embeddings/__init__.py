@@ -0,0 +1,10 @@
+from .backend import EmbeddingBackend, TransformersBackend
+from .vector_store import VectorStore, content_key
+from .service import EmbeddingService, get_embedding_service
+from .ann_index import IVFFlatIndex, get_ann_index, load_ann_indexes, save_ann_index, save_ann_indexes
+
+__all__ = [
+    'EmbeddingBackend', 'TransformersBackend', 'VectorStore', 'content_key',
+    'EmbeddingService', 'get_embedding_service',
+    'IVFFlatIndex', 'get_ann_index', 'load_ann_indexes', 'save_ann_index', 'save_ann_indexes'
+]
@@ -0,0 +1,357 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ANN_INDEX_DIR = os.getenv('ANN_INDEX_DIR', '.cache/ann')
+ANN_RECALL_TARGET = float(os.getenv('ANN_RECALL_TARGET', '0.9'))
+# Below this many vectors an exact scan is as fast as probing lists, so the index stays exact
+ANN_MIN_TRAIN_SIZE = int(os.getenv('ANN_MIN_TRAIN_SIZE', '4096'))
+
+class IVFFlatIndex:
+    """Inverted-file index over normalized vectors, searched by inner product.
+
+    Vectors are bucketed under their nearest of √N k-means centroids; a
+    query scans only the `n_probe` buckets whose centroids are closest to
+    it, each held contiguously so a probe is one matrix-vector product.
+    Below `min_train_size` vectors the index answers by exact search,
+    which is as fast at that size. Inserts go straight into their nearest
+    bucket, deletes are tombstoned, and the centroids are retrained once
+    the index has doubled since they were trained, keeping the list count
+    near √N. `n_probe` is retuned for the recall target after every
+    training.
+    """
+
+    def __init__(self, dimension: int, n_probe: int = 8, min_train_size: int = ANN_MIN_TRAIN_SIZE):
+        self.dimension = dimension
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.keys: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._vectors = np.zeros((0, dimension), dtype=np.float32)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: Optional[List[np.ndarray]] = None
+        # Vectors ordered by list, with each list's [start, end) in that order
+        self._list_vectors: Optional[np.ndarray] = None
+        self._list_bounds: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Insert vectors, replacing any already stored under the same keys."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            # Keys whose vector did not change keep their slot
+            changed = [
+                i for i, key in enumerate(keys)
+                if key not in self.slots or not np.array_equal(self._vectors[self.slots[key]], vectors[i])
+            ]
+            if not changed:
+                return
+            keys = [keys[i] for i in changed]
+            vectors = vectors[changed]
+            self.remove([key for key in keys if key in self.slots])
+            start = len(self.keys)
+            self._grow(start + len(keys))
+            self._vectors[start:start + len(keys)] = vectors
+            self._assignments[start:start + len(keys)] = self._assign(vectors)
+            for offset, key in enumerate(keys):
+                self.keys.append(key)
+                self.slots[key] = start + offset
+            self._lists = None
+
+            if self.centroids is None and len(self.slots) >= self.min_train_size:
+                self.train()
+                self.tune()
+            elif self.centroids is not None and len(self.slots) > 2 * self.trained_size:
+                self.train()
+                self.tune()
+
+    def remove(self, keys: List[str]) -> None:
+        """Delete vectors by key; their slots are reclaimed on the next retrain."""
+        with self._lock:
+            for key in keys:
+                slot = self.slots.pop(key, None)
+                if slot is not None:
+                    self.keys[slot] = None
+                    self._assignments[slot] = -1
+                    self._lists = None
+
+    def search(self, query: np.ndarray, k: int = 10, n_probe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return the (key, inner product) of the approximate top-k vectors."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dimension)
+        with self._lock:
+            if self.centroids is None:
+                candidates = np.flatnonzero(self._assignments[:len(self.keys)] >= 0)
+            else:
+                probe = min(n_probe or self.n_probe, len(self.centroids))
+                nearest = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+                lists = self._inverted_lists()
+                vectors, bounds = self._list_vectors, self._list_bounds
+                candidates = np.concatenate([lists[i] for i in nearest])
+                scores = np.concatenate([vectors[bounds[i]:bounds[i + 1]] @ query for i in nearest])
+                return self._top_k(candidates, query, k, scores)
+            return self._top_k(candidates, query, k)
+
+    def exact_search(self, query: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the exact top-k by scanning every live vector."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dimension)
+        with self._lock:
+            candidates = np.flatnonzero(self._assignments[:len(self.keys)] >= 0)
+            return self._top_k(candidates, query, k)
+
+    def train(self, iterations: int = 10, seed: int = 0) -> None:
+        """Fit centroids with spherical k-means, compacting deleted slots first."""
+        with self._lock:
+            started = time.monotonic()
+            self._compact()
+            vectors = self._vectors[:len(self.keys)]
+            n_lists = max(1, int(np.sqrt(len(vectors))))
+
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(len(vectors), min(len(vectors), n_lists * 64), replace=False)]
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                centroids = np.where(empty[:, None], centroids, sums / np.where(norms == 0, 1, norms))
+
+            self.centroids = centroids.astype(np.float32)
+            self._assignments[:len(vectors)] = self._assign(vectors)
+            self.trained_size = len(vectors)
+            self._lists = None
+            logger.info(f"Trained IVF index: {len(vectors)} vectors, {n_lists} lists in {time.monotonic() - started:.2f}s")
+
+    def evaluate_recall(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        n_probe: Optional[int] = None,
+        exclude: Optional[List[Optional[str]]] = None
+    ) -> float:
+        """Measure recall@k of approximate search against exact search.
+
+        `exclude` gives, per query, a key left out of both result lists
+        (the query's own vector when held out from the stored ones).
+        """
+        exact = self._exact_sets(queries, k, exclude)
+        return self._recall(queries, exact, k, n_probe, exclude)
+
+    def tune(
+        self,
+        target: float = ANN_RECALL_TARGET,
+        k: int = 10,
+        sample_size: int = 100,
+        queries: Optional[np.ndarray] = None
+    ) -> float:
+        """Set n_probe to the smallest value whose recall@k meets the target.
+
+        Recall is measured on `queries` (e.g. recent real queries) when
+        given. Otherwise stored vectors are sampled and held out: each
+        one's own key is excluded from the results, since a vector always
+        finds itself in its own list and would inflate recall.
+        """
+        with self._lock:
+            if self.centroids is None or not self.slots:
+                return 1.0
+            exclude = None
+            if queries is None:
+                rng = np.random.default_rng(1)
+                live = np.flatnonzero(self._assignments[:len(self.keys)] >= 0)
+                sample = rng.choice(live, min(sample_size, len(live)), replace=False)
+                queries = self._vectors[sample]
+                exclude = [self.keys[slot] for slot in sample]
+            queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+
+            exact = self._exact_sets(queries, k, exclude)
+            # Double until the target is met, then bisect back down between the last two values
+            low, n_probe = 0, 1
+            recall = self._recall(queries, exact, k, n_probe, exclude)
+            while recall < target and n_probe < len(self.centroids):
+                low, n_probe = n_probe, min(len(self.centroids), n_probe * 2)
+                recall = self._recall(queries, exact, k, n_probe, exclude)
+            while n_probe - low > 1:
+                middle = (low + n_probe) // 2
+                middle_recall = self._recall(queries, exact, k, middle, exclude)
+                if middle_recall >= target:
+                    n_probe, recall = middle, middle_recall
+                else:
+                    low = middle
+            self.n_probe = n_probe
+            logger.info(
+                f"IVF index recall@{k}={recall:.3f} with n_probe={self.n_probe} "
+                f"of {len(self.centroids)} lists ({len(queries)} {'held-out' if exclude else 'given'} queries)"
+            )
+            return recall
+
+    def _exact_sets(self, queries: np.ndarray, k: int, exclude: Optional[List[Optional[str]]]) -> List[set]:
+        extra = 1 if exclude else 0
+        return [
+            {key for key, _ in self.exact_search(query, k + extra) if not exclude or key != exclude[i]}
+            for i, query in enumerate(queries)
+        ]
+
+    def _recall(
+        self,
+        queries: np.ndarray,
+        exact: List[set],
+        k: int,
+        n_probe: Optional[int],
+        exclude: Optional[List[Optional[str]]]
+    ) -> float:
+        extra = 1 if exclude else 0
+        hits = 0
+        total = 0
+        for i, query in enumerate(queries):
+            approximate = {
+                key for key, _ in self.search(query, k + extra, n_probe)
+                if not exclude or key != exclude[i]
+            }
+            hits += len(exact[i] & approximate)
+            total += len(exact[i])
+        return hits / total if total else 1.0
+
+    def save(self, path: str) -> None:
+        """Write the index to an .npz file atomically."""
+        with self._lock:
+            self._compact()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{path}.tmp.npz"
+            np.savez(
+                temp_path,
+                keys=np.array(self.keys, dtype=str),
+                vectors=self._vectors[:len(self.keys)],
+                assignments=self._assignments[:len(self.keys)],
+                centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dimension), dtype=np.float32),
+                meta=np.array([self.n_probe, self.min_train_size, self.trained_size])
+            )
+            os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'IVFFlatIndex':
+        """Read an index written by save()."""
+        with np.load(path) as data:
+            vectors = data['vectors']
+            n_probe, min_train_size, trained_size = (int(value) for value in data['meta'])
+            index = cls(vectors.shape[1], n_probe=n_probe, min_train_size=min_train_size)
+            index.keys = [str(key) for key in data['keys']]
+            index.slots = {key: slot for slot, key in enumerate(index.keys)}
+            index._vectors = vectors.astype(np.float32)
+            index._assignments = data['assignments'].astype(np.int32)
+            index.centroids = data['centroids'] if len(data['centroids']) else None
+            index.trained_size = trained_size
+        return index
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self.centroids is None or not len(vectors):
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            assignments = self._assignments[:len(self.keys)]
+            order = np.argsort(assignments, kind='stable')
+            bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+            self._list_vectors = self._vectors[order]
+            self._list_bounds = bounds
+        return self._lists
+
+    def _top_k(
+        self,
+        candidates: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        scores: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        if not len(candidates):
+            return []
+        if scores is None:
+            scores = self._vectors[candidates] @ query
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.keys[candidates[i]], float(scores[i])) for i in top]
+
+    def _grow(self, size: int) -> None:
+        if size > len(self._vectors):
+            capacity = max(size, 2 * len(self._vectors), 64)
+            vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+            vectors[:len(self.keys)] = self._vectors[:len(self.keys)]
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            assignments[:len(self.keys)] = self._assignments[:len(self.keys)]
+            self._vectors, self._assignments = vectors, assignments
+
+    def _compact(self) -> None:
+        live = [slot for slot, key in enumerate(self.keys) if key is not None]
+        if len(live) == len(self.keys):
+            return
+        self._vectors = self._vectors[live]
+        self._assignments = self._assignments[live]
+        self.keys = [self.keys[slot] for slot in live]
+        self.slots = {key: slot for slot, key in enumerate(self.keys)}
+        self._lists = None
+
+_ann_indexes: Dict[str, IVFFlatIndex] = {}
+
+def ann_index_path(name: str) -> str:
+    return os.path.join(ANN_INDEX_DIR, f"{name}.npz")
+
+def get_ann_index(name: str, dimension: int) -> IVFFlatIndex:
+    """Return the named index, loading it from disk or creating it on first use."""
+    index = _ann_indexes.get(name)
+    if index is None or index.dimension != dimension:
+        path = ann_index_path(name)
+        index = None
+        if os.path.exists(path):
+            try:
+                index = IVFFlatIndex.load(path)
+            except Exception as e:
+                logger.error(f"Could not load ANN index {path}: {str(e)}")
+        if index is None or index.dimension != dimension:
+            index = IVFFlatIndex(dimension)
+        _ann_indexes[name] = index
+    return index
+
+def load_ann_indexes() -> int:
+    """Load every saved index at startup; returns how many were loaded."""
+    if not os.path.isdir(ANN_INDEX_DIR):
+        return 0
+    for filename in os.listdir(ANN_INDEX_DIR):
+        if filename.endswith('.npz') and '.tmp.' not in filename:
+            name = filename[:-len('.npz')]
+            try:
+                _ann_indexes[name] = IVFFlatIndex.load(ann_index_path(name))
+            except Exception as e:
+                logger.error(f"Could not load ANN index {filename}: {str(e)}")
+    logger.info(f"Loaded {len(_ann_indexes)} ANN indexes from {ANN_INDEX_DIR}")
+    return len(_ann_indexes)
+
+def save_ann_index(name: str) -> None:
+    """Persist one index to disk."""
+    index = _ann_indexes.get(name)
+    if index is not None:
+        index.save(ann_index_path(name))
+
+def save_ann_indexes() -> None:
+    """Persist every index in memory, e.g. on shutdown."""
+    for name in list(_ann_indexes):
+        try:
+            save_ann_index(name)
+        except Exception as e:
+            logger.error(f"Could not save ANN index {name}: {str(e)}")
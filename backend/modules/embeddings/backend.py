@@ -0,0 +1,88 @@
+import hashlib
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBackend(ABC):
+    """Turns texts into L2-normalized float32 vectors.
+
+    Subclasses set `name` (which namespaces cached vectors, so it must
+    change with the model) and `dimension`.
+    """
+
+    name = 'base'
+    dimension = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), dimension) float32 array of unit vectors."""
+
+def transformers_backend_name(model_path: str, max_length: int) -> str:
+    """Cache namespace of a Transformers model: its short name plus a hash of where it loads from.
+
+    Local checkpoints are identified by their resolved path, so two
+    directories that happen to share a basename never share vectors.
+    """
+    source = os.path.realpath(model_path) if os.path.isdir(model_path) else model_path
+    digest = hashlib.sha256(f"{source}|{max_length}".encode('utf-8')).hexdigest()[:12]
+    return f"transformers:{os.path.basename(os.path.normpath(model_path))}-{digest}"
+
+class TransformersBackend(EmbeddingBackend):
+    """Local Hugging Face encoder run on CPU with mean pooling.
+
+    `model_path` may be a local checkpoint directory (so tests and offline
+    deployments never touch the network) or a hub model name. Texts are
+    sorted by length and split into batches of `batch_size`, so each
+    forward pass pads to a similar length.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 32, max_length: int = 256, threads: int = 0):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+        local_only = os.path.isdir(model_path)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=local_only)
+        self.model = AutoModel.from_pretrained(model_path, local_files_only=local_only)
+        self.model.to('cpu')
+        self.model.eval()
+
+        self.name = transformers_backend_name(model_path, max_length)
+        self.dimension = int(self.model.config.hidden_size)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        # The model is shared by every thread that embeds
+        self._lock = threading.Lock()
+        logger.info(f"Loaded embedding model {model_path} ({self.dimension} dimensions) on CPU")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+        with self._lock, self._torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                encoded = self.tokenizer(
+                    [texts[i] for i in batch],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors='pt'
+                )
+                hidden = self.model(**encoded).last_hidden_state
+
+                # Mean over real tokens only
+                mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                pooled = self._torch.nn.functional.normalize(pooled, dim=1)
+                vectors[batch] = pooled.numpy()
+
+        return vectors
@@ -0,0 +1,157 @@
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from .backend import EmbeddingBackend, TransformersBackend
+from .vector_store import VectorStore, content_key
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingService:
+    """Embeds texts through a backend, with dynamic batching and a persistent cache.
+
+    Concurrent `embed` calls are queued for up to `max_wait` seconds (or
+    until `max_batch` texts are waiting) and sent to the backend as one
+    batch, off the event loop. Vectors are cached in the vector store by a
+    hash of the text and the model, so each text is embedded once.
+
+    `relevance` maps cosine similarity onto the 0-1 scale the LLM scorer
+    uses: `relevance_floor` and below scores 0 and `relevance_ceiling` and
+    above scores 1. Phrase-to-page cosines of sentence encoders rarely
+    leave the 0.1-0.6 band, so raw cosines would almost never reach the
+    0.4/0.6/0.8 keyword tiers.
+    """
+
+    def __init__(self, backend: EmbeddingBackend, store: Optional[VectorStore] = None,
+                 max_batch: int = 64, max_wait: float = 0.005,
+                 relevance_floor: float = 0.1, relevance_ceiling: float = 0.6):
+        if relevance_ceiling <= relevance_floor:
+            raise ValueError("relevance_ceiling must be above relevance_floor")
+        self.backend = backend
+        self.store = store
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.relevance_floor = relevance_floor
+        self.relevance_ceiling = relevance_ceiling
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: List[tuple] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Return one normalized vector per text."""
+        keys = [content_key(text, self.backend.name) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        if self.store is not None:
+            lookup = list({key for key in keys if key not in self._pending})
+            vectors = await asyncio.to_thread(self.store.get_many, lookup)
+
+        loop = asyncio.get_running_loop()
+        waiting = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in waiting:
+                continue
+            future = self._pending.get(key)
+            if future is None:
+                future = loop.create_future()
+                self._pending[key] = future
+                self._queue.append((key, text, future))
+            waiting[key] = future
+
+        if len(self._queue) >= self.max_batch:
+            self._schedule_flush(0)
+        elif self._queue:
+            self._schedule_flush(self.max_wait)
+
+        if waiting:
+            results = await asyncio.gather(*waiting.values())
+            vectors.update(zip(waiting.keys(), results))
+
+        if not keys:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    async def relevance(self, content: str, phrases: List[str]) -> Dict[str, float]:
+        """Relevance of each phrase to the content, from cosine similarity calibrated to [0, 1]."""
+        if not phrases:
+            return {}
+        vectors = await self.embed([content] + list(phrases))
+        similarities = vectors[1:] @ vectors[0]
+        return {phrase: self.calibrate(score) for phrase, score in zip(phrases, similarities)}
+
+    def calibrate(self, similarity: float) -> float:
+        """Map a cosine similarity linearly from [floor, ceiling] onto [0, 1]."""
+        score = (similarity - self.relevance_floor) / (self.relevance_ceiling - self.relevance_floor)
+        return float(max(0.0, min(1.0, score)))
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is not None:
+            if delay > 0:
+                return
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        if self._queue:
+            self._schedule_flush(0)
+        if not batch:
+            return
+
+        keys = [key for key, _, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(self.backend.embed, [text for _, text, _ in batch])
+            if self.store is not None:
+                await asyncio.to_thread(self.store.put_many, keys, vectors)
+            for (key, _, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} texts failed: {str(e)}", exc_info=True)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key in keys:
+                self._pending.pop(key, None)
+
+_embedding_service: Optional[EmbeddingService] = None
+
+def get_embedding_service() -> Optional[EmbeddingService]:
+    """Return the process-wide embedding service, or None when no local model is configured."""
+    global _embedding_service
+    if _embedding_service is None:
+        model_path = os.getenv('EMBEDDING_MODEL_PATH')
+        if not model_path:
+            return None
+        if importlib.util.find_spec('torch') is None or importlib.util.find_spec('transformers') is None:
+            logger.warning("EMBEDDING_MODEL_PATH is set but torch/transformers are not installed")
+            return None
+
+        try:
+            backend = TransformersBackend(
+                model_path,
+                batch_size=int(os.getenv('EMBEDDING_BATCH_SIZE', '32')),
+                max_length=int(os.getenv('EMBEDDING_MAX_LENGTH', '256')),
+                threads=int(os.getenv('EMBEDDING_THREADS', '0'))
+            )
+            store = None
+            store_path = os.getenv('EMBEDDING_STORE_PATH', '.cache/embeddings')
+            if store_path:
+                directory = os.path.join(store_path, backend.name.replace(':', '_').replace('/', '_'))
+                store = VectorStore(directory, backend.dimension)
+            _embedding_service = EmbeddingService(
+                backend,
+                store,
+                max_batch=int(os.getenv('EMBEDDING_MAX_BATCH', '64')),
+                max_wait=float(os.getenv('EMBEDDING_BATCH_WAIT_MS', '5')) / 1000,
+                relevance_floor=float(os.getenv('EMBEDDING_RELEVANCE_FLOOR', '0.1')),
+                relevance_ceiling=float(os.getenv('EMBEDDING_RELEVANCE_CEILING', '0.6'))
+            )
+        except Exception as e:
+            logger.error(f"Could not load embedding model from {model_path}: {str(e)}")
+            return None
+    return _embedding_service
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    key TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+)
+"""
+
+def content_key(text: str, namespace: str) -> str:
+    """Hash a text together with the model that embeds it."""
+    return hashlib.sha256(f"{namespace}\0{text}".encode('utf-8')).hexdigest()
+
+class VectorStore:
+    """Persistent embedding cache backed by a memory-mapped float32 matrix.
+
+    Vectors live in `vectors.f32` inside `directory`, one row per key; a
+    small SQLite table maps content hashes to rows. The matrix file grows
+    by doubling, and reads go straight to the page cache through the
+    memory map instead of loading the whole file.
+
+    Several processes may share a directory. Rows are allocated inside a
+    SQLite write transaction, which also serializes growing the file, and
+    vectors are written before their keys are committed, so readers never
+    see a key whose row is not filled in yet.
+    """
+
+    def __init__(self, directory: str, dimension: int, initial_capacity: int = 1024):
+        self.directory = directory
+        self.dimension = dimension
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._matrix_path = os.path.join(directory, 'vectors.f32')
+        self._conn = sqlite3.connect(
+            os.path.join(directory, 'keys.sqlite3'),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._matrix = None
+        self._capacity = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._map()
+            finally:
+                self._conn.execute("COMMIT")
+        logger.info(f"Vector store ready at {directory} ({len(self)} vectors, {dimension} dimensions)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return stored vectors for the keys that are present."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, row in rows:
+                    # Another process may have grown the file since it was mapped
+                    if row >= self._capacity:
+                        self._map()
+                    found[key] = np.array(self._matrix[row])
+        return found
+
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Store vectors for keys that are not stored yet."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+                new = []
+                seen = set()
+                for key, vector in zip(keys, vectors):
+                    if key in seen or self._conn.execute("SELECT 1 FROM vectors WHERE key = ?", (key,)).fetchone():
+                        continue
+                    seen.add(key)
+                    if next_row >= self._capacity:
+                        self._map(next_row + 1)
+                    self._matrix[next_row] = vector
+                    new.append((key, next_row))
+                    next_row += 1
+
+                if new:
+                    # Vectors hit the file before their keys become visible
+                    self._matrix.flush()
+                    self._conn.executemany("INSERT INTO vectors (key, row) VALUES (?, ?)", new)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _map(self, required_rows: int = 0) -> None:
+        """Map the whole matrix file, first growing it by doubling to hold `required_rows` rows.
+
+        Callers that may grow it hold the SQLite write lock, so two
+        processes never resize the file at once.
+        """
+        row_bytes = self.dimension * 4
+        existing = os.path.getsize(self._matrix_path) // row_bytes if os.path.exists(self._matrix_path) else 0
+        capacity = max(existing, self.initial_capacity)
+        while capacity < required_rows:
+            capacity *= 2
+        if existing < capacity:
+            with open(self._matrix_path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimension))
+        self._capacity = capacity
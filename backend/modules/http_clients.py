@@ -0,0 +1,195 @@
+import asyncio
+import importlib.util
+import ipaddress
+import logging
+import os
+import socket
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterator, Optional, Tuple
+import httpx
+import httpcore
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that caches hostname resolution for `ttl` seconds.
+
+    TLS still uses the original hostname for SNI and certificate checks,
+    since httpcore passes it to start_tls separately from the address we
+    connect to.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._backend = httpcore.AnyIOBackend()
+        self._cache: Dict[Tuple[str, int], Tuple[str, float]] = {}
+
+    async def _resolve(self, host: str, port: int) -> str:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        cached = self._cache.get((host, port))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        address = infos[0][4][0]
+        self._cache[(host, port)] = (address, time.monotonic() + self.ttl)
+        logger.debug(f"Resolved {host} to {address}")
+        return address
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = await self._resolve(host, port)
+        return await self._backend.connect_tcp(
+            address, port, timeout=timeout,
+            local_address=local_address, socket_options=socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+# httpcore errors and the httpx errors they surface as, most specific last
+HTTPCORE_ERRORS = [
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+]
+
+@contextmanager
+def httpcore_errors_as_httpx() -> Iterator[None]:
+    """Re-raise httpcore errors as the matching httpx errors, so callers only handle httpx.HTTPError."""
+    try:
+        yield
+    except Exception as e:
+        mapped = None
+        for source, target in HTTPCORE_ERRORS:
+            if isinstance(e, source) and (mapped is None or issubclass(target, mapped)):
+                mapped = target
+        if mapped is None:
+            raise
+        raise mapped(str(e)) from e
+
+class PooledResponseStream(httpx.AsyncByteStream):
+    """Response body read from an httpcore connection, with its errors mapped to httpx."""
+
+    def __init__(self, stream: AsyncIterable[bytes]):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with httpcore_errors_as_httpx():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, 'aclose'):
+            await self._stream.aclose()
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """httpx transport over one httpcore connection pool, with keep-alive, optional HTTP/2 and DNS caching."""
+
+    def __init__(self, limits: httpx.Limits, http2: bool, dns_ttl: float):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(http2=http2),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=CachingDNSBackend(dns_ttl)
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions
+        )
+        with httpcore_errors_as_httpx():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=PooledResponseStream(response.stream),
+            extensions=response.extensions
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+def create_http_client(upstream: str, timeout: float = 30.0) -> httpx.AsyncClient:
+    """Create a pooled client for one upstream, configured from the environment.
+
+    Settings are read from HTTP_<UPSTREAM>_MAX_CONNECTIONS (and friends),
+    falling back to the unprefixed HTTP_MAX_CONNECTIONS etc.
+    """
+    def setting(name: str, default: str) -> str:
+        return os.getenv(f'HTTP_{upstream.upper()}_{name}', os.getenv(f'HTTP_{name}', default))
+
+    limits = httpx.Limits(
+        max_connections=int(setting('MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(setting('MAX_KEEPALIVE_CONNECTIONS', '20')),
+        keepalive_expiry=float(setting('KEEPALIVE_EXPIRY', '30'))
+    )
+    http2 = HTTP2_AVAILABLE and setting('HTTP2', 'true').lower() == 'true'
+    logger.info(
+        f"Creating '{upstream}' HTTP client (max {limits.max_connections} connections, "
+        f"http2={'on' if http2 else 'off'})"
+    )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        transport=PooledTransport(limits, http2, float(setting('DNS_TTL', '300')))
+    )
+
+class HTTPClients:
+    """Application-wide pooled HTTP clients, one per upstream."""
+
+    def __init__(self):
+        self.crawler = create_http_client('crawler')
+        self.openai = create_http_client('openai')
+
+    async def aclose(self) -> None:
+        await self.crawler.aclose()
+        await self.openai.aclose()
+
+@asynccontextmanager
+async def client_session(client: Optional[httpx.AsyncClient], timeout: float = 30.0) -> AsyncIterator[httpx.AsyncClient]:
+    """Yield the injected client, or a short-lived one when none was provided."""
+    if client is not None:
+        yield client
+        return
+
+    async with httpx.AsyncClient(timeout=timeout) as own_client:
+        yield own_client
@@ -1,6 +1,6 @@
 from typing import Dict, Set
-import re
 import logging
+from .phrase_matcher import PhraseMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +15,13 @@ class DensityCalculator:
             logger.warning("Empty content provided")
             return {}
         
-        # Calculate density for each phrase
+        # Count every phrase with word boundaries in a single pass
         densities = {}
-        content_lower = content.lower()
+        matcher = PhraseMatcher(phrase.lower() for phrase in phrases)
+        counts = matcher.count(content.lower())
         
         for phrase in phrases:
-            # Create pattern with word boundaries
-            pattern = r'\b' + re.escape(phrase.lower()) + r'\b'
-            count = len(re.findall(pattern, content_lower))
+            count = counts.get(phrase.lower(), 0)
             
             if count > 0:
                 # Normalize by phrase length and total words
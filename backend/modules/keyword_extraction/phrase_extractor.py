@@ -1,98 +1,75 @@
-from typing import Set, List, Dict, Tuple
+from functools import lru_cache
+from typing import FrozenSet, Iterator, List, Set, Tuple
 from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.tag import pos_tag
+from nltk.tag import PerceptronTagger
 from nltk.corpus import stopwords
 import logging
-import re
+from .phrase_matcher import PhraseMatcher
+from ..document_index import get_document_index
 
 logger = logging.getLogger(__name__)
 
+# POS tag sequences that make a candidate phrase
+BIGRAM_PATTERNS = frozenset([
+    ('JJ', 'NN'), ('NN', 'NN'), ('NNP', 'NNP'),
+    ('JJ', 'NNS'), ('VBG', 'NN'), ('NN', 'NNS')
+])
+TRIGRAM_PATTERNS = frozenset([
+    ('JJ', 'JJ', 'NN'), ('JJ', 'NN', 'NN'),
+    ('NN', 'IN', 'NN'), ('NNP', 'NNP', 'NNP')
+])
+
+@lru_cache(maxsize=None)
+def get_stop_words() -> FrozenSet[str]:
+    """Load the English stopword list once per process."""
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=None)
+def get_tagger() -> PerceptronTagger:
+    """Load the POS tagger model once per process."""
+    return PerceptronTagger()
+
+def _candidate_ngrams(pos_tags: List[Tuple[str, str]]) -> Iterator[str]:
+    """Yield bigram and trigram candidates from one scan over a tagged sentence."""
+    tags = [tag for _, tag in pos_tags]
+    for i in range(len(tags) - 1):
+        if (tags[i], tags[i+1]) in BIGRAM_PATTERNS:
+            yield f"{pos_tags[i][0]} {pos_tags[i+1][0]}"
+        if i + 2 < len(tags) and (tags[i], tags[i+1], tags[i+2]) in TRIGRAM_PATTERNS:
+            yield f"{pos_tags[i][0]} {pos_tags[i+1][0]} {pos_tags[i+2][0]}"
+
 class PhraseExtractor:
     def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+        self.stop_words = get_stop_words()
         
     def extract_phrases(self, text: str) -> Set[str]:
         """Extract phrases that EXACTLY exist in the content with their contexts."""
         logger.info("Extracting exact phrases from text")
         
-        # Split into sentences for better context
-        sentences = sent_tokenize(text)
-        phrases = set()
+        # Split into sentences for better context and tag them as one batch
+        sentences = [word_tokenize(sentence) for sentence in sent_tokenize(text)]
+        tagged_sentences = get_tagger().tag_sents(sentences)
         
         # First get candidate phrases
-        for sentence in sentences:
-            tokens = word_tokenize(sentence)
-            pos_tags = pos_tag(tokens)
-            
-            # Extract 2-word phrases
-            for i in range(len(pos_tags) - 1):
-                if self._is_valid_bigram(pos_tags[i], pos_tags[i+1]):
-                    phrase = f"{pos_tags[i][0]} {pos_tags[i+1][0]}"
-                    if self._verify_exact_match(phrase, text):
-                        phrases.add(phrase)
-            
-            # Extract 3-word phrases
-            for i in range(len(pos_tags) - 2):
-                if self._is_valid_trigram(pos_tags[i], pos_tags[i+1], pos_tags[i+2]):
-                    phrase = f"{pos_tags[i][0]} {pos_tags[i+1][0]} {pos_tags[i+2][0]}"
-                    if self._verify_exact_match(phrase, text):
-                        phrases.add(phrase)
+        candidates = set()
+        for pos_tags in tagged_sentences:
+            candidates.update(_candidate_ngrams(pos_tags))
+        
+        # Keep only candidates that exist exactly in the text, verified in one pass
+        phrases = PhraseMatcher(candidates).found_in(text)
         
         logger.info(f"Extracted {len(phrases)} exact phrases from content")
         return phrases
     
-    def _verify_exact_match(self, phrase: str, text: str) -> bool:
-        """Verify that the phrase exists exactly in the text with word boundaries."""
-        # Create pattern with word boundaries and optional spaces
-        pattern = r'\b' + re.escape(phrase) + r'\b'
-        match = re.search(pattern, text)
-        
-        if match:
-            # Get the exact phrase as it appears in the text
-            exact_phrase = text[match.start():match.end()]
-            logger.debug(f"Found exact match: '{exact_phrase}' for phrase: '{phrase}'")
-            return True
-            
-        return False
-    
-    def _is_valid_bigram(self, tag1, tag2) -> bool:
-        """Check if two consecutive POS tags form a valid bigram."""
-        valid_patterns = [
-            ('JJ', 'NN'), ('NN', 'NN'), ('NNP', 'NNP'),
-            ('JJ', 'NNS'), ('VBG', 'NN'), ('NN', 'NNS')
-        ]
-        return (tag1[1], tag2[1]) in valid_patterns
-    
-    def _is_valid_trigram(self, tag1, tag2, tag3) -> bool:
-        """Check if three consecutive POS tags form a valid trigram."""
-        valid_patterns = [
-            ('JJ', 'JJ', 'NN'), ('JJ', 'NN', 'NN'),
-            ('NN', 'IN', 'NN'), ('NNP', 'NNP', 'NNP')
-        ]
-        return (tag1[1], tag2[1], tag3[1]) in valid_patterns
-    
     def find_exact_context(self, phrase: str, text: str, context_length: int = 100) -> str:
         """Find the exact context where a phrase appears in the text."""
-        pattern = r'\b' + re.escape(phrase) + r'\b'
-        match = re.search(pattern, text)
+        highlighted_context = get_document_index(text).context(
+            phrase, context_length, case_sensitive=True
+        )
         
-        if not match:
+        if not highlighted_context:
             logger.warning(f"Could not find exact context for phrase: {phrase}")
             return ""
-            
-        start_pos = match.start()
-        end_pos = match.end()
-        
-        # Get surrounding context
-        context_start = max(0, start_pos - context_length)
-        context_end = min(len(text), end_pos + context_length)
-        
-        # Get the exact phrase as it appears in the text
-        exact_phrase = text[start_pos:end_pos]
-        context = text[context_start:context_end].strip()
-        
-        # Highlight the exact phrase in the context
-        highlighted_context = context.replace(exact_phrase, f"[{exact_phrase}]")
         
         logger.info(f"Found context for phrase '{phrase}': {highlighted_context}")
         return highlighted_context
\ No newline at end of file
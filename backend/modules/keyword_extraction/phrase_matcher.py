@@ -0,0 +1,106 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex \\w class for a single character."""
+    return char.isalnum() or char == '_'
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that finds many phrases in one pass over a text.
+
+    Matches follow the semantics of the regex ``\\b<phrase>\\b``: a match
+    only counts where both of its ends sit on a word boundary. Matching is
+    case-sensitive; lowercase both sides for case-insensitive lookups.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        seen = set()
+        for phrase in phrases:
+            if not phrase or phrase in seen:
+                continue
+            seen.add(phrase)
+            self._add(phrase)
+        self._build_failure_links()
+
+    def _add(self, phrase: str) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.phrases))
+        self.phrases.append(phrase)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, phrase) for every word-bounded occurrence, ordered by end."""
+        goto, fail, output, phrases = self._goto, self._fail, self._output, self.phrases
+        text_length = len(text)
+        state = 0
+
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not output[state]:
+                continue
+
+            end = index + 1
+            after_is_word = _is_word_char(text[end]) if end < text_length else False
+            if _is_word_char(char) == after_is_word:
+                continue
+
+            for phrase_id in output[state]:
+                phrase = phrases[phrase_id]
+                start = end - len(phrase)
+                before_is_word = _is_word_char(text[start - 1]) if start > 0 else False
+                if before_is_word != _is_word_char(phrase[0]):
+                    yield start, end, phrase
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count non-overlapping occurrences of each phrase, like re.findall would."""
+        counts: Dict[str, int] = {}
+        last_end: Dict[str, int] = {}
+        for start, end, phrase in self.iter_matches(text):
+            if start >= last_end.get(phrase, 0):
+                counts[phrase] = counts.get(phrase, 0) + 1
+                last_end[phrase] = end
+        return counts
+
+    def first_positions(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """Return the (start, end) span of each phrase's first occurrence."""
+        positions: Dict[str, Tuple[int, int]] = {}
+        for start, end, phrase in self.iter_matches(text):
+            if phrase not in positions:
+                positions[phrase] = (start, end)
+        return positions
+
+    def found_in(self, text: str) -> Set[str]:
+        """Return the phrases that occur at least once in the text."""
+        return {phrase for _, _, phrase in self.iter_matches(text)}
@@ -1,21 +1,56 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import httpx
 import json
 import os
 import logging
 import asyncio
 from dotenv import load_dotenv
+from ..http_clients import client_session
+from .score_cache import ScoreCache, content_fingerprint, get_score_cache, normalize_phrase
+from ..embeddings import get_embedding_service
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = """You are an SEO expert analyzing keyword relevance.
+Focus ONLY on 2-3 word phrases that represent:
+- Key topics and themes
+- Important concepts
+- Product/service descriptions
+- Industry terminology
+
+Return scores ONLY for 2-3 word phrases."""
+
+SCORE_SCALE = """1.0 = Essential theme/topic
+0.8 = Important supporting concept
+0.6 = Relevant but secondary phrase
+0.4 or below = Not very relevant
+
+ONLY score 2-3 word phrases."""
+
 class RelevanceScorer:
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, cache: Optional[ScoreCache] = None):
+        self.client = client
+        self.cache = cache or get_score_cache()
+        self.model = "gpt-4o-mini"
         self.api_key = os.getenv('OPENAI_API_KEY')
+        # RELEVANCE_BACKEND=local scores phrases with the local embedding model instead
+        self.embeddings = None
+        if os.getenv('RELEVANCE_BACKEND', 'openai') == 'local':
+            self.embeddings = get_embedding_service()
+            if self.embeddings is None:
+                logger.warning("Local relevance backend unavailable, falling back to OpenAI")
+            else:
+                # Cached scores depend on the calibration as well as the model
+                self.model = (f"{self.embeddings.backend.name}"
+                              f"@{self.embeddings.relevance_floor}-{self.embeddings.relevance_ceiling}")
         self.max_retries = 3
         self.base_delay = 1  # seconds
+        # Limits for packing several pages into one scoring request
+        self.max_batch_pages = int(os.getenv('SCORE_BATCH_MAX_PAGES', '5'))
+        self.max_batch_phrases = int(os.getenv('SCORE_BATCH_MAX_PHRASES', '200'))
         
-        if not self.api_key:
+        if not self.api_key and self.embeddings is None:
             logger.error("No OpenAI API key found!")
     
     async def score_phrases(self, content: str, phrases: List[str]) -> Dict[str, float]:
@@ -23,17 +58,168 @@ class RelevanceScorer:
         if not phrases:
             logger.warning("No phrases provided for scoring")
             return {}
+        
+        # Only phrases that miss the cache are sent to the API
+        fingerprint = content_fingerprint(content, self.model)
+        cached = await self.cache.get_many(fingerprint, phrases)
+        missing = [phrase for phrase in phrases if phrase not in cached]
+        logger.info(f"Score cache: {len(cached)} hits, {len(missing)} misses")
+        if not missing:
+            return cached
+        
+        if self.embeddings is not None:
+            try:
+                # The prompt only ever saw the first 1000 characters, and the cache key follows that
+                scores = await self.embeddings.relevance(content[:1000], missing)
+            except Exception as e:
+                logger.error(f"Local relevance scoring failed: {str(e)}", exc_info=True)
+                return cached
+            fresh = await self._store_scores(fingerprint, missing, scores)
+            return {**fresh, **cached}
             
         if not self.api_key:
             logger.error("Cannot score phrases: No OpenAI API key")
-            return {}
+            return cached
+        
+        scores = await self._request_scores(self._phrase_messages(content, missing), len(missing))
+        if not isinstance(scores, dict):
+            return cached
+        
+        fresh = await self._store_scores(fingerprint, missing, scores)
+        return {**fresh, **cached}
+    
+    async def score_batch(self, items: List[Tuple[str, List[str]]]) -> List[Dict[str, float]]:
+        """Score phrases for several pages, packing cache misses into as few API calls as possible.
+        
+        Takes (content, phrases) pairs and returns one score dict per pair, in order.
+        """
+        results: List[Dict[str, float]] = []
+        pending = []
+        for index, (content, phrases) in enumerate(items):
+            fingerprint = content_fingerprint(content, self.model)
+            cached = await self.cache.get_many(fingerprint, phrases)
+            results.append(cached)
+            missing = [phrase for phrase in phrases if phrase not in cached]
+            if missing:
+                pending.append((index, fingerprint, content, missing))
+        
+        logger.info(f"Batch scoring {len(items)} pages, {len(pending)} with cache misses")
+        if not pending:
+            return results
+        if self.embeddings is not None:
+            # Local scoring needs no packing; the embedding service batches across pages itself
+            scored = await asyncio.gather(*(self.score_phrases(*items[entry[0]]) for entry in pending))
+            for entry, scores in zip(pending, scored):
+                results[entry[0]] = scores
+            return results
+        if not self.api_key:
+            logger.error("Cannot score phrases: No OpenAI API key")
+            return results
+        
+        # Pack pages into requests bounded by page and phrase counts
+        groups = []
+        current = []
+        phrase_count = 0
+        for entry in pending:
+            if current and (len(current) >= self.max_batch_pages or
+                            phrase_count + len(entry[3]) > self.max_batch_phrases):
+                groups.append(current)
+                current = []
+                phrase_count = 0
+            current.append(entry)
+            phrase_count += len(entry[3])
+        groups.append(current)
         
+        responses = await asyncio.gather(*(
+            self._request_scores(self._batch_messages(group), sum(len(entry[3]) for entry in group))
+            for group in groups
+        ))
+        
+        unanswered = []
+        for group, response in zip(groups, responses):
+            for page_id, (index, fingerprint, content, missing) in enumerate(group, 1):
+                # A lone page is sent with the single-page prompt, which returns a flat dict
+                if len(group) == 1:
+                    page_scores = response
+                else:
+                    page_scores = response.get(str(page_id)) if isinstance(response, dict) else None
+                if not isinstance(page_scores, dict):
+                    unanswered.append(index)
+                    continue
+                fresh = await self._store_scores(fingerprint, missing, page_scores)
+                results[index] = {**fresh, **results[index]}
+        
+        # Pages the packed response left out are scored on their own
+        if unanswered:
+            logger.warning(f"Packed scoring missed {len(unanswered)} pages, scoring them individually")
+            fallbacks = await asyncio.gather(*(
+                self.score_phrases(*items[index]) for index in unanswered
+            ))
+            for index, scores in zip(unanswered, fallbacks):
+                results[index] = scores
+        
+        return results
+    
+    async def _store_scores(self, fingerprint: str, missing: List[str], scores: Dict) -> Dict[str, float]:
+        """Cache and return the numeric scores the model gave for the requested phrases.
+        
+        Phrases the model left out are not cached, so they are asked for again next time.
+        """
+        returned = {}
+        for phrase, score in scores.items():
+            if isinstance(score, (int, float)) and not isinstance(score, bool):
+                returned[normalize_phrase(phrase)] = float(score)
+        fresh = {
+            phrase: returned[normalize_phrase(phrase)]
+            for phrase in missing if normalize_phrase(phrase) in returned
+        }
+        if fresh:
+            await self.cache.put_many(fingerprint, fresh)
+        return fresh
+    
+    def _phrase_messages(self, content: str, phrases: List[str]) -> List[Dict]:
+        """Build the chat messages for scoring one page's phrases."""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""Content: {content[:1000]}\n\nPhrases to evaluate: {json.dumps(phrases)}
+
+Return a JSON object with phrases as keys and scores as values where:
+{SCORE_SCALE}"""
+            }
+        ]
+    
+    def _batch_messages(self, group: List[Tuple]) -> List[Dict]:
+        """Build the chat messages for scoring several pages in one request."""
+        if len(group) == 1:
+            _, _, content, missing = group[0]
+            return self._phrase_messages(content, missing)
+        
+        pages = "\n\n".join(
+            f"Page {page_id}:\nContent: {content[:1000]}\nPhrases to evaluate: {json.dumps(missing)}"
+            for page_id, (_, _, content, missing) in enumerate(group, 1)
+        )
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""{pages}
+
+Score each page's phrases against that page's content only.
+Return a JSON object with page numbers as keys (e.g. "1"), each mapping that page's phrases to scores where:
+{SCORE_SCALE}"""
+            }
+        ]
+    
+    async def _request_scores(self, messages: List[Dict], phrase_count: int) -> Optional[Dict]:
+        """Send a scoring prompt to the OpenAI API, or return None if every attempt fails."""
         try:
-            logger.info(f"Scoring {len(phrases)} phrases using OpenAI")
+            logger.info(f"Scoring {phrase_count} phrases using OpenAI")
             
-            for attempt in range(self.max_retries):
-                try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
+            async with client_session(self.client) as client:
+                for attempt in range(self.max_retries):
+                    try:
                         response = await client.post(
                             "https://api.openai.com/v1/chat/completions",
                             headers={
@@ -41,58 +227,34 @@ class RelevanceScorer:
                                 "Content-Type": "application/json"
                             },
                             json={
-                                "model": "gpt-4o-mini",
-                                "messages": [
-                                    {
-                                        "role": "system",
-                                        "content": """You are an SEO expert analyzing keyword relevance.
-                                        Focus ONLY on 2-3 word phrases that represent:
-                                        - Key topics and themes
-                                        - Important concepts
-                                        - Product/service descriptions
-                                        - Industry terminology
-                                        
-                                        Return scores ONLY for 2-3 word phrases."""
-                                    },
-                                    {
-                                        "role": "user",
-                                        "content": f"""Content: {content[:1000]}\n\nPhrases to evaluate: {json.dumps(phrases)}
-                                        
-                                        Return a JSON object with phrases as keys and scores as values where:
-                                        1.0 = Essential theme/topic
-                                        0.8 = Important supporting concept
-                                        0.6 = Relevant but secondary phrase
-                                        0.4 or below = Not very relevant
-                                        
-                                        ONLY score 2-3 word phrases."""
-                                    }
-                                ]
+                                "model": self.model,
+                                "messages": messages
                             }
                         )
                         
-                    if response.status_code != 200:
-                        logger.error(f"OpenAI API Error: {response.text}")
+                        if response.status_code != 200:
+                            logger.error(f"OpenAI API Error: {response.text}")
+                            if attempt < self.max_retries - 1:
+                                wait_time = self.base_delay * (2 ** attempt)
+                                logger.info(f"Retrying in {wait_time} seconds...")
+                                await asyncio.sleep(wait_time)
+                                continue
+                            return None
+                        
+                        result = response.json()
+                        scores = json.loads(result['choices'][0]['message']['content'])
+                        logger.info(f"Successfully scored {len(scores)} phrases")
+                        return scores
+                    
+                    except Exception as e:
                         if attempt < self.max_retries - 1:
                             wait_time = self.base_delay * (2 ** attempt)
-                            logger.info(f"Retrying in {wait_time} seconds...")
+                            logger.warning(f"Attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time} seconds...")
                             await asyncio.sleep(wait_time)
-                            continue
-                        return {}
-                        
-                    result = response.json()
-                    scores = json.loads(result['choices'][0]['message']['content'])
-                    logger.info(f"Successfully scored {len(scores)} phrases")
-                    return scores
-                    
-                except Exception as e:
-                    if attempt < self.max_retries - 1:
-                        wait_time = self.base_delay * (2 ** attempt)
-                        logger.warning(f"Attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time} seconds...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.error(f"All retry attempts failed: {str(e)}", exc_info=True)
-                        return {}
+                        else:
+                            logger.error(f"All retry attempts failed: {str(e)}", exc_info=True)
+                            return None
                 
         except Exception as e:
             logger.error(f"Error scoring phrases: {str(e)}", exc_info=True)
-            return {}
\ No newline at end of file
+            return None
\ No newline at end of file
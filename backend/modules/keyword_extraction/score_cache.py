@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS relevance_scores (
+    fingerprint TEXT NOT NULL,
+    phrase TEXT NOT NULL,
+    score REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (fingerprint, phrase)
+)
+"""
+_STORED_AT_INDEX = "CREATE INDEX IF NOT EXISTS relevance_scores_stored_at ON relevance_scores (stored_at)"
+
+def content_fingerprint(content: str, model: str) -> str:
+    """Fingerprint the part of the content the scoring prompt actually sees."""
+    return hashlib.sha256(f"{model}\0{content[:1000]}".encode('utf-8')).hexdigest()
+
+def normalize_phrase(phrase: str) -> str:
+    """Normalize a phrase for use as a cache key."""
+    return ' '.join(phrase.lower().split())
+
+class ScoreCache:
+    """Two-tier cache of LLM relevance scores.
+
+    An in-process LRU sits in front of an optional SQLite table. Entries
+    are keyed by (content fingerprint, normalized phrase), expire after
+    `ttl` seconds and are evicted oldest-first once a tier is full. The
+    disk tier is pruned after every `prune_every` rows written rather than
+    on each write, so it may briefly run over `max_disk_entries`. Memory
+    lookups run inline; disk reads, writes and pruning run in a thread so
+    they never block the event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 86400.0,
+        max_memory_entries: int = 10000,
+        max_disk_entries: int = 200000,
+        prune_every: int = 1000
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        self._memory: 'OrderedDict[Tuple[str, str], Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes the SQLite connection; never held while touching the memory tier
+        self._disk_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_prune = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._disk_lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(_SCHEMA)
+                self._conn.execute(_STORED_AT_INDEX)
+        logger.info(f"Relevance score cache ready (disk tier: {path or 'disabled'}, ttl {ttl}s)")
+
+    async def get_many(self, fingerprint: str, phrases: Iterable[str]) -> Dict[str, float]:
+        """Return cached scores for the phrases that hit, keyed by the phrases as given."""
+        now = time.time()
+        found: Dict[str, float] = {}
+        disk_lookups: Dict[str, list] = {}
+        requested = 0
+
+        with self._lock:
+            for phrase in phrases:
+                requested += 1
+                key = (fingerprint, normalize_phrase(phrase))
+                entry = self._memory.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    found[phrase] = entry[0]
+                else:
+                    if entry is not None:
+                        del self._memory[key]
+                    disk_lookups.setdefault(key[1], []).append(phrase)
+
+        rows = []
+        if disk_lookups and self._conn is not None:
+            rows = await asyncio.to_thread(self._read_disk, fingerprint, list(disk_lookups), now)
+
+        with self._lock:
+            for normalized, score, stored_at in rows:
+                self._remember((fingerprint, normalized), score, stored_at)
+                for phrase in disk_lookups[normalized]:
+                    found[phrase] = score
+                    self.disk_hits += 1
+            self.hits += len(found)
+            self.misses += requested - len(found)
+
+        return found
+
+    async def put_many(self, fingerprint: str, scores: Dict[str, float]) -> None:
+        """Store freshly computed scores in both tiers."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for phrase, score in scores.items():
+                normalized = normalize_phrase(phrase)
+                self._remember((fingerprint, normalized), score, now)
+                rows.append((fingerprint, normalized, score, now))
+
+        if rows and self._conn is not None:
+            await asyncio.to_thread(self._write_disk, rows, now)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current tier sizes."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory)
+            }
+
+    def _remember(self, key: Tuple[str, str], score: float, stored_at: float) -> None:
+        self._memory[key] = (score, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, fingerprint: str, phrases: List[str], now: float) -> List[Tuple[str, float, float]]:
+        rows = []
+        with self._disk_lock:
+            for i in range(0, len(phrases), 500):
+                chunk = phrases[i:i + 500]
+                rows.extend(self._conn.execute(
+                    f"""SELECT phrase, score, stored_at FROM relevance_scores
+                        WHERE fingerprint = ? AND stored_at > ?
+                        AND phrase IN ({','.join('?' * len(chunk))})""",
+                    (fingerprint, now - self.ttl, *chunk)
+                ).fetchall())
+        return rows
+
+    def _write_disk(self, rows: List[Tuple[str, str, float, float]], now: float) -> None:
+        with self._disk_lock, self._conn:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO relevance_scores
+                   (fingerprint, phrase, score, stored_at) VALUES (?, ?, ?, ?)""",
+                rows
+            )
+            self._writes_since_prune += len(rows)
+            if self._writes_since_prune >= self.prune_every:
+                self._prune_disk(now)
+                self._writes_since_prune = 0
+
+    def _prune_disk(self, now: float) -> None:
+        self._conn.execute("DELETE FROM relevance_scores WHERE stored_at <= ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM relevance_scores").fetchone()[0]
+        if count > self.max_disk_entries:
+            removed = self._conn.execute(
+                """DELETE FROM relevance_scores WHERE rowid IN (
+                       SELECT rowid FROM relevance_scores ORDER BY stored_at LIMIT ?
+                   )""",
+                (count - self.max_disk_entries,)
+            ).rowcount
+            with self._lock:
+                self.evictions += removed
+
+_score_cache: Optional[ScoreCache] = None
+
+def get_score_cache() -> ScoreCache:
+    """Return the process-wide relevance score cache."""
+    global _score_cache
+    if _score_cache is None:
+        settings = dict(
+            ttl=float(os.getenv('SCORE_CACHE_TTL', '86400')),
+            max_memory_entries=int(os.getenv('SCORE_CACHE_MEMORY_ENTRIES', '10000')),
+            max_disk_entries=int(os.getenv('SCORE_CACHE_DISK_ENTRIES', '200000')),
+            prune_every=int(os.getenv('SCORE_CACHE_PRUNE_EVERY', '1000'))
+        )
+        path = os.getenv('SCORE_CACHE_PATH', '.cache/relevance_scores.sqlite3')
+        try:
+            _score_cache = ScoreCache(path or None, **settings)
+        except Exception as e:
+            logger.error(f"Could not open score cache at {path}, using memory only: {str(e)}")
+            _score_cache = ScoreCache(None, **settings)
+    return _score_cache
@@ -1,91 +1,158 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import httpx
 import logging
 from .keyword_extraction import PhraseExtractor, DensityCalculator, RelevanceScorer
+from .cpu_executor import run_cpu_bound
 
 logger = logging.getLogger(__name__)
 
-async def extract_keywords(content: str) -> Dict[str, List[str]]:
+_phrase_extractor: Optional[PhraseExtractor] = None
+
+def get_phrase_extractor() -> PhraseExtractor:
+    """Return the phrase extractor shared by all requests."""
+    global _phrase_extractor
+    if _phrase_extractor is None:
+        _phrase_extractor = PhraseExtractor()
+    return _phrase_extractor
+
+def empty_keywords() -> Dict[str, List[str]]:
+    return {'exact_match': [], 'broad_match': [], 'related_match': []}
+
+async def extract_keywords(content: str, client: Optional[httpx.AsyncClient] = None) -> Dict[str, List[str]]:
     """Extract meaningful phrases that MUST exist exactly in the content."""
     try:
-        if not content or len(content.strip()) < 50:
-            logger.warning("Content too short for keyword extraction")
-            return {'exact_match': [], 'broad_match': [], 'related_match': []}
-
-        logger.info(f"Starting keyword extraction for content of length {len(content)}")
-        logger.debug("Content sample:", content[:200])
-        
-        # Extract candidate phrases that actually appear in the content
-        extractor = PhraseExtractor()
-        phrases = extractor.extract_phrases(content)
-        logger.info(f"Extracted {len(phrases)} candidate phrases that exist in content")
-        
-        if not phrases:
-            logger.warning("No valid phrases found in content")
-            return {'exact_match': [], 'broad_match': [], 'related_match': []}
-        
-        # Calculate density for verified phrases
-        calculator = DensityCalculator()
-        densities = calculator.calculate_density(content, phrases)
-        logger.info(f"Calculated density for {len(densities)} verified phrases")
+        prepared = await prepare_phrases(content)
+        if not prepared:
+            return empty_keywords()
+        phrases, densities = prepared
         
         # Score phrases for relevance
-        scorer = RelevanceScorer()
+        scorer = RelevanceScorer(client=client)
         relevance_scores = await scorer.score_phrases(content, list(phrases))
         logger.info(f"Scored relevance for {len(relevance_scores)} phrases")
         
-        # Combine density and relevance scores for verified phrases only
-        final_scores = {}
-        for phrase in phrases:
-            # Double verify the phrase exists in content with exact context
-            context = extractor.find_exact_context(phrase, content)
-            if not context:
-                logger.debug(f"Skipping phrase with no context: {phrase}")
-                continue
-                
-            density = densities.get(phrase, 0)
-            relevance = relevance_scores.get(phrase, 0)
-            final_scores[phrase] = density * relevance
-            
-            logger.debug(f"Verified phrase: {phrase}, Density: {density:.2%}, Relevance: {relevance:.2f}, Final Score: {final_scores[phrase]:.2f}")
+        return categorize_keywords(content, phrases, densities, relevance_scores)
         
-        # Sort and categorize verified phrases
-        sorted_phrases = sorted(
-            final_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
+    except Exception as e:
+        logger.error(f"Error extracting keywords: {str(e)}", exc_info=True)
+        return empty_keywords()
+
+async def extract_keywords_batch(
+    contents: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Dict[str, List[str]]]:
+    """Extract keywords for several pages, packing their relevance scoring into shared API calls."""
+    try:
+        prepared = await asyncio.gather(
+            *(prepare_phrases(content) for content in contents),
+            return_exceptions=True
         )
         
-        exact_match = []
-        broad_match = []
-        related_match = []
+        scoring_items = []
+        for content, item in zip(contents, prepared):
+            if item and not isinstance(item, Exception):
+                scoring_items.append((content, list(item[0])))
         
-        for phrase, score in sorted_phrases:
-            # Get the exact context for the phrase
-            context = extractor.find_exact_context(phrase, content)
-            if not context:
-                continue
-                
-            density_str = f"{densities.get(phrase, 0):.2%}"
-            phrase_with_context = f"{phrase} ({density_str}) - {context}"
-            
-            if score >= 0.8:
-                exact_match.append(phrase_with_context)
-            elif score >= 0.6:
-                broad_match.append(phrase_with_context)
-            elif score >= 0.4:
-                related_match.append(phrase_with_context)
+        scorer = RelevanceScorer(client=client)
+        scored = iter(await scorer.score_batch(scoring_items))
         
-        logger.info(f"Final verified keyword counts: exact={len(exact_match)}, broad={len(broad_match)}, related={len(related_match)}")
+        results = []
+        for content, item in zip(contents, prepared):
+            if isinstance(item, Exception):
+                logger.error(f"Error extracting keywords: {str(item)}")
+                results.append(empty_keywords())
+            elif not item:
+                results.append(empty_keywords())
+            else:
+                phrases, densities = item
+                results.append(categorize_keywords(content, phrases, densities, next(scored)))
+        return results
         
-        result = {
-            'exact_match': exact_match[:10],
-            'broad_match': broad_match[:10],
-            'related_match': related_match[:10]
-        }
+    except Exception as e:
+        logger.error(f"Error extracting keywords for batch: {str(e)}", exc_info=True)
+        return [empty_keywords() for _ in contents]
+
+async def prepare_phrases(content: str) -> Optional[Tuple[Set[str], Dict[str, float]]]:
+    """Run the CPU-bound stages: candidate phrases and their densities."""
+    if not content or len(content.strip()) < 50:
+        logger.warning("Content too short for keyword extraction")
+        return None
+
+    logger.info(f"Starting keyword extraction for content of length {len(content)}")
+    logger.debug(f"Content sample: {content[:200]}")
+    
+    # Extract candidate phrases that actually appear in the content
+    extractor = get_phrase_extractor()
+    phrases = await run_cpu_bound(extractor.extract_phrases, content)
+    logger.info(f"Extracted {len(phrases)} candidate phrases that exist in content")
+    
+    if not phrases:
+        logger.warning("No valid phrases found in content")
+        return None
+    
+    # Calculate density for verified phrases
+    calculator = DensityCalculator()
+    densities = await run_cpu_bound(calculator.calculate_density, content, phrases)
+    logger.info(f"Calculated density for {len(densities)} verified phrases")
+    return phrases, densities
+
+def categorize_keywords(
+    content: str,
+    phrases: Set[str],
+    densities: Dict[str, float],
+    relevance_scores: Dict[str, float]
+) -> Dict[str, List[str]]:
+    """Combine density and relevance into the exact/broad/related keyword lists."""
+    extractor = get_phrase_extractor()
+    
+    # Combine density and relevance scores for verified phrases only
+    final_scores = {}
+    contexts = {}
+    for phrase in phrases:
+        # Double verify the phrase exists in content with exact context
+        context = extractor.find_exact_context(phrase, content)
+        if not context:
+            logger.debug(f"Skipping phrase with no context: {phrase}")
+            continue
+        contexts[phrase] = context
+            
+        density = densities.get(phrase, 0)
+        relevance = relevance_scores.get(phrase, 0)
+        final_scores[phrase] = density * relevance
         
-        logger.info("Keyword extraction completed with verified phrases and contexts")
-        return result
+        logger.debug(f"Verified phrase: {phrase}, Density: {density:.2%}, Relevance: {relevance:.2f}, Final Score: {final_scores[phrase]:.2f}")
+    
+    # Sort and categorize verified phrases
+    sorted_phrases = sorted(
+        final_scores.items(),
+        key=lambda x: x[1],
+        reverse=True
+    )
+    
+    exact_match = []
+    broad_match = []
+    related_match = []
+    
+    for phrase, score in sorted_phrases:
+        context = contexts[phrase]
+        density_str = f"{densities.get(phrase, 0):.2%}"
+        phrase_with_context = f"{phrase} ({density_str}) - {context}"
         
-    except Exception as e:
-        logger.error(f"Error extracting keywords: {str(e)}", exc_info=True)
-        return {'exact_match': [], 'broad_match': [], 'related_match': []}
\ No newline at end of file
+        if score >= 0.8:
+            exact_match.append(phrase_with_context)
+        elif score >= 0.6:
+            broad_match.append(phrase_with_context)
+        elif score >= 0.4:
+            related_match.append(phrase_with_context)
+    
+    logger.info(f"Final verified keyword counts: exact={len(exact_match)}, broad={len(broad_match)}, related={len(related_match)}")
+    
+    result = {
+        'exact_match': exact_match[:10],
+        'broad_match': broad_match[:10],
+        'related_match': related_match[:10]
+    }
+    
+    logger.info("Keyword extraction completed with verified phrases and contexts")
+    return result
\ No newline at end of file
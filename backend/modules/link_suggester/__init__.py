@@ -1,4 +1,4 @@
 from .content_analyzer import analyze_content
-from .suggestion_generator import generate_link_suggestions
+from .suggestion_generator import generate_link_suggestions, iter_link_suggestions
 
-__all__ = ['analyze_content', 'generate_link_suggestions']
\ No newline at end of file
+__all__ = ['analyze_content', 'generate_link_suggestions', 'iter_link_suggestions']
\ No newline at end of file
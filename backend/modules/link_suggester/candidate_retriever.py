@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from .page_index import update_site_indexes
+from .utils import tokenize
+from ..crawlers.snapshot_store import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Keywords resolved per candidate search; larger keyword sets run as concurrent searches
+CANDIDATE_QUERY_CHUNK = int(os.getenv('CANDIDATE_QUERY_CHUNK', '10'))
+# Rows fetched for each keyword, so local ranking has more than the final top N to choose from
+CANDIDATE_ROWS_PER_KEYWORD = int(os.getenv('CANDIDATE_ROWS_PER_KEYWORD', '10'))
+# Rows per Supabase write or URL listing request
+SUPABASE_WRITE_BATCH = 500
+
+def _quote(keyword: str) -> str:
+    return '"' + keyword.replace('"', '""') + '"'
+
+class SupabasePageStore:
+    """Full-text candidate search against the Supabase `pages` table.
+
+    Crawl results are written back to the table (see apply_crawl_changes).
+    Rows are matched to crawled pages by canonical URL, so a row stored as
+    `/post/` is updated by a crawl of `/post`; only the rows of the
+    changed pages are looked up, never the whole site. Removed pages keep
+    their row, which links may reference, but lose their title and content.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._website_ids: Dict[str, Optional[str]] = {}
+        # Cleared when the database lacks the search_pages_per_keyword function
+        self._search_rpc = True
+
+    async def search(self, keywords: List[str], per_keyword: int) -> List[Dict]:
+        """Return up to `per_keyword` pages matching each keyword as a phrase.
+
+        One call to the `search_pages_per_keyword` database function (see
+        supabase/migrations) ranks and caps the rows of every keyword, so a
+        common keyword cannot starve the rest. Databases without it get one
+        request per keyword instead, run concurrently.
+        """
+        if not keywords:
+            return []
+        if self._search_rpc:
+            try:
+                response = await asyncio.to_thread(self.client.rpc('search_pages_per_keyword', {
+                    'keywords': [keyword.replace('"', '') for keyword in keywords],
+                    'per_keyword': per_keyword
+                }).execute)
+                return _dedupe_pages(response.data or [])
+            except Exception as e:
+                logger.warning(f"search_pages_per_keyword unavailable, searching per keyword: {str(e)}")
+                self._search_rpc = False
+
+        responses = await asyncio.gather(*(
+            asyncio.to_thread(self._phrase_query(keyword, per_keyword).execute) for keyword in keywords
+        ))
+        return _dedupe_pages(row for response in responses for row in (response.data or []))
+
+    def _phrase_query(self, keyword: str, limit: int):
+        # websearch syntax: a quoted phrase
+        return self.client.table('pages').select('url, title, content') \
+            .text_search('content', _quote(keyword.replace('"', '')), options={'type': 'websearch'}) \
+            .limit(limit)
+
+    async def site_pages(self, domain: str, since: Optional[str], offset: int, limit: int) -> List[Dict]:
+        """Return one range of a site's pages crawled at or after `since`, oldest crawl first."""
+        website_id = await self.website_id(domain)
+        query = self.client.table('pages').select('url, title, content, last_crawled_at')
+        if website_id:
+            query = query.eq('website_id', website_id)
+        else:
+            query = query.like('url', f'%://{domain}/%')
+        if since:
+            # gte rather than gt: pages crawled in the same instant as the newest one may be new
+            query = query.gte('last_crawled_at', since)
+        query = query.order('last_crawled_at').range(offset, offset + limit - 1)
+        response = await asyncio.to_thread(query.execute)
+        return response.data or []
+
+    async def website_id(self, domain: str) -> Optional[str]:
+        """Return the `websites` row id of a domain, or None when it has none."""
+        if domain not in self._website_ids:
+            await asyncio.to_thread(self._website_id, domain)
+        return self._website_ids[domain]
+
+    def add_pages(self, pages: Iterable[Dict]) -> None:
+        """Upsert crawled pages (url, title, content), stamping them as crawled now."""
+        crawled_at = datetime.now(timezone.utc).isoformat()
+        for domain, domain_pages in _group_by_domain(pages, lambda page: page['url']).items():
+            website_id = self._website_id(domain)
+            stored = self._stored_urls(page['url'] for page in domain_pages)
+            rows = []
+            for page in domain_pages:
+                row = {
+                    'url': stored.get(normalize_url(page['url']), page['url']),
+                    'title': page.get('title') or '',
+                    'content': page.get('content') or '',
+                    'last_crawled_at': crawled_at
+                }
+                if website_id:
+                    row['website_id'] = website_id
+                rows.append(row)
+            for i in range(0, len(rows), SUPABASE_WRITE_BATCH):
+                self.client.table('pages').upsert(rows[i:i + SUPABASE_WRITE_BATCH], on_conflict='url').execute()
+
+    def remove_pages(self, urls: Iterable[str]) -> None:
+        """Clear the title and content of removed pages, so searches and site indexes drop them."""
+        crawled_at = datetime.now(timezone.utc).isoformat()
+        stored = self._stored_urls(urls)
+        targets = list(stored.values())
+        for i in range(0, len(targets), SUPABASE_WRITE_BATCH):
+            self.client.table('pages') \
+                .update({'title': None, 'content': None, 'last_crawled_at': crawled_at}) \
+                .in_('url', targets[i:i + SUPABASE_WRITE_BATCH]) \
+                .execute()
+
+    def _website_id(self, domain: str) -> Optional[str]:
+        if domain not in self._website_ids:
+            response = self.client.table('websites').select('id').eq('domain', domain).limit(1).execute()
+            if response.data:
+                self._website_ids[domain] = response.data[0]['id']
+            else:
+                logger.warning(f"No website row for {domain}, matching its pages by URL instead")
+                self._website_ids[domain] = None
+        return self._website_ids[domain]
+
+    def _stored_urls(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Map the canonical form of each given URL that has a stored row to the URL as stored.
+
+        Rows are looked up by the spellings a page is likely stored under:
+        as given, canonical, and canonical with a trailing slash.
+        """
+        urls = set(urls)
+        keys = {normalize_url(url) for url in urls}
+        spellings = sorted(urls | keys | {f"{key}/" for key in keys if urlparse(key).path != '/'})
+        stored: Dict[str, str] = {}
+        for i in range(0, len(spellings), SUPABASE_WRITE_BATCH):
+            rows = self.client.table('pages').select('url') \
+                .in_('url', spellings[i:i + SUPABASE_WRITE_BATCH]).execute().data or []
+            for row in rows:
+                key = normalize_url(row['url'])
+                if key in keys:
+                    stored.setdefault(key, row['url'])
+        return stored
+
+def _dedupe_pages(pages: Iterable[Dict]) -> List[Dict]:
+    unique: Dict[str, Dict] = {}
+    for page in pages:
+        unique.setdefault(page.get('url'), page)
+    return list(unique.values())
+
+def _group_by_domain(items: Iterable, url_of) -> Dict[str, List]:
+    groups: Dict[str, List] = {}
+    for item in items:
+        groups.setdefault(urlparse(url_of(item)).netloc.lower(), []).append(item)
+    return groups
+
+class SQLitePageStore:
+    """Local FTS5 stand-in for the `pages` table, for tests and offline runs."""
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(url UNINDEXED, title, content)"
+            )
+
+    def add_pages(self, pages: Iterable[Dict]) -> None:
+        """Insert or replace pages given as dicts with url, title and content."""
+        with self._lock, self._conn:
+            for page in pages:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (page['url'],))
+                self._conn.execute(
+                    "INSERT INTO pages (url, title, content) VALUES (?, ?, ?)",
+                    (page['url'], page.get('title') or '', page.get('content') or '')
+                )
+
+    def remove_pages(self, urls: Iterable[str]) -> None:
+        """Delete pages by URL."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in urls])
+
+    async def search(self, keywords: List[str], per_keyword: int) -> List[Dict]:
+        """Return the `per_keyword` best FTS5 matches (by bm25) for each keyword as a phrase, in one query."""
+        return await asyncio.to_thread(self._search, keywords, per_keyword)
+
+    async def site_pages(self, domain: str, since: Optional[str], offset: int, limit: int) -> List[Dict]:
+        """Return one range of a site's pages; `since` is ignored as rows carry no crawl time."""
+        return await asyncio.to_thread(self._site_pages, domain, offset, limit)
+
+    def _site_pages(self, domain: str, offset: int, limit: int) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, title, content FROM pages WHERE url LIKE ? ORDER BY rowid LIMIT ? OFFSET ?",
+                (f'%://{domain}/%', limit, offset)
+            ).fetchall()
+        return [{**dict(row), 'last_crawled_at': None} for row in rows]
+
+    def _search(self, keywords: List[str], per_keyword: int) -> List[Dict]:
+        if not keywords:
+            return []
+        # One ranked, limited subquery per keyword, so each keyword gets its own quota
+        member = "SELECT * FROM (SELECT url, title, content FROM pages WHERE pages MATCH ? ORDER BY rank LIMIT ?)"
+        params = []
+        for keyword in keywords:
+            params.extend((f"content:{_quote(keyword)}", per_keyword))
+        with self._lock:
+            rows = self._conn.execute(' UNION ALL '.join([member] * len(keywords)), params).fetchall()
+        return _dedupe_pages(dict(row) for row in rows)
+
+_page_store = None
+
+def get_page_store():
+    """Return the configured page store: SQLite when PAGE_STORE_SQLITE_PATH is set, else Supabase."""
+    global _page_store
+    if _page_store is None:
+        sqlite_path = os.getenv('PAGE_STORE_SQLITE_PATH')
+        if sqlite_path:
+            _page_store = SQLitePageStore(sqlite_path)
+        else:
+            from supabase import create_client
+            _page_store = SupabasePageStore(create_client(
+                os.getenv('SUPABASE_URL', ''),
+                os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
+            ))
+    return _page_store
+
+async def apply_crawl_changes(store, pages: Dict[str, Dict], changes: Dict[str, List[str]]) -> int:
+    """Write only the pages a crawl found added, changed or removed into the page store.
+
+    Crawled pages missing from `pages` (collapsed near-duplicates) are
+    removed too, and loaded site indexes are updated to match. Returns
+    the number of pages written or removed.
+    """
+    crawled = changes.get('added', []) + changes.get('changed', [])
+    updated = [pages[url] for url in crawled if url in pages]
+    removed = changes.get('removed', []) + [
+        url for url in crawled + changes.get('unchanged', []) if url not in pages
+    ]
+    if updated:
+        await asyncio.to_thread(store.add_pages, updated)
+    if removed:
+        await asyncio.to_thread(store.remove_pages, removed)
+    await update_site_indexes(updated, removed)
+    logger.info(
+        f"Page store updated from crawl: {len(updated)} written, {len(removed)} removed, "
+        f"{len(changes.get('unchanged', []))} unchanged skipped"
+    )
+    return len(updated) + len(removed)
+
+# Background page store updates still running, kept referenced until they finish
+_pending_updates: Set[asyncio.Task] = set()
+
+def schedule_crawl_changes(pages: Dict[str, Dict], changes: Dict[str, List[str]]) -> asyncio.Task:
+    """Run apply_crawl_changes on the configured page store in the background, so requests do not wait on the index write.
+
+    Failures are logged; the next crawl of the site writes the pages again.
+    """
+    async def apply():
+        try:
+            await apply_crawl_changes(get_page_store(), pages, changes)
+        except Exception as e:
+            logger.error(f"Page store update failed: {str(e)}")
+
+    task = asyncio.create_task(apply())
+    _pending_updates.add(task)
+    task.add_done_callback(_pending_updates.discard)
+    return task
+
+async def wait_for_crawl_changes() -> None:
+    """Wait for the background page store updates still running (called on shutdown)."""
+    if _pending_updates:
+        await asyncio.gather(*_pending_updates, return_exceptions=True)
+
+async def retrieve_candidates(store, keywords: List[str]) -> List[Dict]:
+    """Fetch candidate pages for all keywords in one query per chunk, with the chunks run concurrently."""
+    results = [result async for result in iter_candidate_chunks(store, keywords)]
+    results.sort(key=lambda result: result[0])
+
+    pages: Dict[str, Dict] = {}
+    for _, _, chunk_pages in results:
+        for page in chunk_pages:
+            pages.setdefault(page['url'], page)
+
+    logger.info(f"Retrieved {len(pages)} candidate pages for {len(keywords)} keywords in {len(results)} queries")
+    return list(pages.values())
+
+async def iter_candidate_chunks(store, keywords: List[str]) -> AsyncIterator[Tuple[int, List[str], List[Dict]]]:
+    """Run the chunked candidate queries concurrently, yielding (chunk index, keywords, pages) as each returns.
+
+    A failed query is logged and yields no pages.
+    """
+    chunks = [keywords[i:i + CANDIDATE_QUERY_CHUNK] for i in range(0, len(keywords), CANDIDATE_QUERY_CHUNK)]
+
+    async def query(index: int, chunk: List[str]):
+        try:
+            return index, chunk, await store.search(chunk, CANDIDATE_ROWS_PER_KEYWORD)
+        except Exception as e:
+            logger.error(f"Candidate search failed for {len(chunk)} keywords: {str(e)}")
+            return index, chunk, []
+
+    tasks = [asyncio.ensure_future(query(index, chunk)) for index, chunk in enumerate(chunks)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            index, chunk, response = await next_result
+            yield index, chunk, [page for page in response if page.get('url')]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def rank_candidates(
+    keywords: List[str],
+    pages: List[Dict],
+    per_keyword: int = 3,
+    k1: float = 1.5,
+    b: float = 0.75
+) -> Dict[str, List[Dict]]:
+    """Rank the retrieved pages for each keyword with BM25 over the retrieved set.
+
+    Only pages containing every term of a keyword are kept, mirroring the
+    full-text match that retrieved them.
+    """
+    documents = [Counter(tokenize(f"{page.get('title') or ''} {page.get('content') or ''}")) for page in pages]
+    lengths = [sum(document.values()) for document in documents]
+    average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+    document_frequency: Dict[str, int] = {}
+
+    def idf(term: str) -> float:
+        if term not in document_frequency:
+            document_frequency[term] = sum(1 for document in documents if term in document)
+        df = document_frequency[term]
+        return math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+
+    ranked: Dict[str, List[Dict]] = {}
+    for keyword in keywords:
+        terms = tokenize(keyword)
+        if not terms:
+            ranked[keyword] = []
+            continue
+
+        scored = []
+        for page, document, length in zip(pages, documents, lengths):
+            if not all(term in document for term in terms):
+                continue
+            norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+            score = sum(
+                idf(term) * document[term] * (k1 + 1) / (document[term] + norm)
+                for term in terms
+            )
+            scored.append((score, page))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        ranked[keyword] = [page for _, page in scored[:per_keyword]]
+
+    return ranked
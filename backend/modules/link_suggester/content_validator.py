@@ -1,6 +1,6 @@
 import logging
 from typing import List, Dict
-import re
+from ..document_index import get_document_index
 
 logger = logging.getLogger(__name__)
 
@@ -9,19 +9,19 @@ def validate_suggestions_against_content(content: str, suggestions: List[Dict])
     logger.info(f"Validating {len(suggestions)} suggestions against content")
     
     validated_suggestions = []
+    index = get_document_index(content)
     
     for suggestion in suggestions:
         anchor_text = suggestion.get('suggestedAnchorText', '')
         if not anchor_text:
             continue
             
-        # Create pattern with word boundaries
-        pattern = r'\b' + re.escape(anchor_text) + r'\b'
-        match = re.search(pattern, content)
+        # Look up the anchor with word boundaries
+        span = index.find(anchor_text, case_sensitive=True)
         
-        if match:
+        if span:
             # Get the exact phrase as it appears in the content
-            exact_phrase = content[match.start():match.end()]
+            exact_phrase = content[span[0]:span[1]]
             logger.info(f"Found exact match: '{exact_phrase}'")
             
             # Find the actual context where this anchor appears
@@ -40,26 +40,13 @@ def validate_suggestions_against_content(content: str, suggestions: List[Dict])
 def find_actual_context(content: str, exact_phrase: str, context_length: int = 100) -> str:
     """Find the actual context where the exact phrase appears in the content."""
     try:
-        # Find the position of the exact phrase
-        pattern = r'\b' + re.escape(exact_phrase) + r'\b'
-        match = re.search(pattern, content)
+        highlighted_context = get_document_index(content).context(
+            exact_phrase, context_length, case_sensitive=True
+        )
         
-        if not match:
+        if not highlighted_context:
             return ""
             
-        start_pos = match.start()
-        end_pos = match.end()
-        
-        # Get surrounding context
-        context_start = max(0, start_pos - context_length)
-        context_end = min(len(content), end_pos + context_length)
-        
-        # Extract the context with the exact phrase
-        context = content[context_start:context_end].strip()
-        
-        # Highlight the exact phrase in the context
-        highlighted_context = context.replace(exact_phrase, f"[{exact_phrase}]")
-        
         logger.info(f"Found context for phrase '{exact_phrase}': {highlighted_context}")
         return highlighted_context
         
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from urllib.parse import urlparse
+from .tfidf_engine import TfidfEngine
+from ..embeddings import IVFFlatIndex, get_ann_index, get_embedding_service, save_ann_index
+from .url_validator import is_valid_webpage_url
+from .utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Field bits stored per posting, and how much a phrase token matching each field counts
+CONTENT_FIELD = 1
+SLUG_FIELD = 2
+TITLE_FIELD = 4
+FIELD_WEIGHTS = {CONTENT_FIELD: 1.0, SLUG_FIELD: 2.0, TITLE_FIELD: 3.0}
+
+PAGE_INDEX_REFRESH_SECONDS = float(os.getenv('PAGE_INDEX_REFRESH_SECONDS', '60'))
+PAGE_INDEX_FETCH_SIZE = int(os.getenv('PAGE_INDEX_FETCH_SIZE', '1000'))
+
+def slug_tokens(url: str) -> List[str]:
+    """Tokens of a URL's path, e.g. /blog/content-marketing -> blog, content, marketing."""
+    return tokenize(urlparse(url).path)
+
+class SitePageIndex:
+    """In-memory inverted index over one site's pages in the page store.
+
+    Each token maps to the pages whose title, URL slug or content contain
+    it, so finding candidate target pages for a phrase is a postings
+    intersection instead of a scan of the whole table. The index loads on
+    first use and afterwards only pulls pages whose `last_crawled_at` moved
+    past the newest one already indexed (stores without crawl timestamps
+    are re-read in full). Pages without content (removed, or not crawled
+    yet) are not indexed.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._page_tokens: Dict[str, Set[str]] = {}
+        # The site's TF-IDF engine, and the page changes not yet applied to it
+        self._tfidf: Optional[TfidfEngine] = None
+        self._tfidf_counts: Dict[str, Counter] = {}
+        self._tfidf_removed: Set[str] = set()
+        self._tfidf_lock = asyncio.Lock()
+        # Nearest-neighbour index over page embeddings, when a local model is configured
+        self.ann: Optional[IVFFlatIndex] = None
+        self._ann_name: Optional[str] = None
+        self._last_crawled_at: Optional[str] = None
+        self._refreshed_at = 0.0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def ensure_fresh(self, store) -> None:
+        """Load the index on first use, then pull recently crawled pages at most every refresh interval."""
+        if self._loaded and time.monotonic() - self._refreshed_at < PAGE_INDEX_REFRESH_SECONDS:
+            return
+
+        async with self._lock:
+            if self._loaded and time.monotonic() - self._refreshed_at < PAGE_INDEX_REFRESH_SECONDS:
+                return
+            try:
+                started = time.monotonic()
+                if not self._loaded:
+                    self._attach_ann_index()
+                count = await self._pull_pages(store)
+                if self.ann is not None and count:
+                    await asyncio.to_thread(save_ann_index, self._ann_name)
+                logger.info(
+                    f"Page index for {self.domain}: {'refreshed' if self._loaded else 'loaded'} "
+                    f"{count} pages in {time.monotonic() - started:.2f}s ({len(self.pages)} indexed)"
+                )
+                self._loaded = True
+                self._refreshed_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error refreshing page index for {self.domain}: {str(e)}")
+                if not self._loaded:
+                    raise
+
+    def add_page(self, page: Dict[str, Any]) -> None:
+        """Index a page, replacing any previous version of it."""
+        url = page['url']
+        self._unindex(url)
+        if not page.get('content') or not is_valid_webpage_url(url):
+            if self.ann is not None:
+                self.ann.remove([url])
+            return
+
+        content_tokens = tokenize(page.get('content') or '')
+        title_tokens = tokenize(page.get('title') or '')
+        fields: Dict[str, int] = {}
+        for field, tokens in (
+            (CONTENT_FIELD, content_tokens),
+            (SLUG_FIELD, slug_tokens(url)),
+            (TITLE_FIELD, title_tokens)
+        ):
+            for token in tokens:
+                fields[token] = fields.get(token, 0) | field
+
+        for token, mask in fields.items():
+            self._postings.setdefault(token, {})[url] = mask
+        self._page_tokens[url] = set(fields)
+        self._tfidf_counts[url] = Counter(title_tokens + content_tokens)
+        self.pages[url] = {
+            'url': url,
+            'title': page.get('title'),
+            'last_crawled_at': page.get('last_crawled_at')
+        }
+
+    def remove_page(self, url: str) -> None:
+        """Drop a page from the index."""
+        self._unindex(url)
+        if self.ann is not None:
+            self.ann.remove([url])
+
+    async def apply_pages(self, pages: List[Dict[str, Any]], removed: List[str]) -> None:
+        """Index freshly crawled pages and drop removed ones, without waiting for the next pull."""
+        for url in removed:
+            self.remove_page(url)
+        for page in pages:
+            self.add_page(page)
+        await self._embed_pages(pages)
+
+    def nearest_pages(self, vector: np.ndarray, k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """Return the approximate k pages whose embeddings are closest to a vector."""
+        if self.ann is None:
+            return []
+        return [(self.pages[url], score) for url, score in self.ann.search(vector, k) if url in self.pages]
+
+    def _unindex(self, url: str) -> None:
+        for token in self._page_tokens.pop(url, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(url, None)
+                if not postings:
+                    del self._postings[token]
+        if self.pages.pop(url, None) is not None:
+            self._tfidf_counts.pop(url, None)
+            self._tfidf_removed.add(url)
+
+    async def tfidf_engine(self) -> TfidfEngine:
+        """Return the site's TF-IDF engine, with the pages changed since the last call applied in one batch."""
+        async with self._tfidf_lock:
+            if self._tfidf is None or self._tfidf_counts or self._tfidf_removed:
+                counts, removed = self._tfidf_counts, self._tfidf_removed
+                self._tfidf_counts, self._tfidf_removed = {}, set()
+                try:
+                    if self._tfidf is None:
+                        self._tfidf = await asyncio.to_thread(TfidfEngine.build, counts)
+                    else:
+                        self._tfidf = await asyncio.to_thread(self._tfidf.updated, counts, removed)
+                except Exception:
+                    # Keep the changes for the next call, behind any made meanwhile
+                    self._tfidf_counts = {
+                        **{url: page_counts for url, page_counts in counts.items() if url not in self._tfidf_removed},
+                        **self._tfidf_counts
+                    }
+                    self._tfidf_removed |= removed
+                    raise
+            return self._tfidf
+
+    def candidates(self, phrase: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return pages containing every token of a phrase, best field matches first."""
+        tokens = list(dict.fromkeys(tokenize(phrase)))
+        if not tokens:
+            return []
+
+        postings = [self._postings.get(token) for token in tokens]
+        if any(not posting for posting in postings):
+            return []
+
+        # Intersect starting from the rarest token
+        postings.sort(key=len)
+        scores = {
+            url: sum(weight for field, weight in FIELD_WEIGHTS.items() if mask & field)
+            for url, mask in postings[0].items()
+        }
+        for posting in postings[1:]:
+            scores = {
+                url: score + sum(weight for field, weight in FIELD_WEIGHTS.items() if posting[url] & field)
+                for url, score in scores.items() if url in posting
+            }
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.pages[url] for url in ranked]
+
+    def _attach_ann_index(self) -> None:
+        embeddings = get_embedding_service()
+        if embeddings is not None:
+            self._ann_name = f"{self.domain}-{embeddings.backend.name}".replace(':', '_').replace('/', '_')
+            self.ann = get_ann_index(self._ann_name, embeddings.backend.dimension)
+
+    async def _embed_pages(self, rows: List[Dict[str, Any]]) -> None:
+        """Embed freshly pulled pages into the ANN index."""
+        rows = [row for row in rows if row['url'] in self.pages]
+        if self.ann is None or not rows:
+            return
+        vectors = await get_embedding_service().embed(
+            [f"{row.get('title') or ''}\n{(row.get('content') or '')[:1000]}" for row in rows]
+        )
+        # Training and n_probe tuning happen inside add as the index grows
+        await asyncio.to_thread(self.ann.add, [row['url'] for row in rows], vectors)
+
+    async def _pull_pages(self, store) -> int:
+        """Fetch pages crawled since the last pull in fixed-size ranges and index them."""
+        count = 0
+        offset = 0
+        since = self._last_crawled_at
+        while True:
+            rows = await store.site_pages(self.domain, since, offset, PAGE_INDEX_FETCH_SIZE)
+            for row in rows:
+                self.add_page(row)
+                crawled_at = row.get('last_crawled_at')
+                if crawled_at and (not self._last_crawled_at or crawled_at > self._last_crawled_at):
+                    self._last_crawled_at = crawled_at
+            count += len(rows)
+            await self._embed_pages(rows)
+
+            if len(rows) < PAGE_INDEX_FETCH_SIZE:
+                return count
+            offset += PAGE_INDEX_FETCH_SIZE
+
+_site_indexes: Dict[str, SitePageIndex] = {}
+
+async def get_site_page_index(store, url: str) -> SitePageIndex:
+    """Return the up-to-date page index for the site a URL belongs to, loaded from a page store."""
+    domain = urlparse(url).netloc.lower()
+    index = _site_indexes.get(domain)
+    if index is None:
+        index = SitePageIndex(domain)
+        _site_indexes[domain] = index
+    await index.ensure_fresh(store)
+    return index
+
+async def update_site_indexes(pages: List[Dict[str, Any]], removed: List[str]) -> None:
+    """Apply crawled and removed pages to the site indexes already loaded; others load them on first use."""
+    by_domain: Dict[str, Tuple[List[Dict[str, Any]], List[str]]] = {}
+    for page in pages:
+        by_domain.setdefault(urlparse(page['url']).netloc.lower(), ([], []))[0].append(page)
+    for url in removed:
+        by_domain.setdefault(urlparse(url).netloc.lower(), ([], []))[1].append(url)
+    for domain, (domain_pages, domain_removed) in by_domain.items():
+        index = _site_indexes.get(domain)
+        if index is not None and index._loaded:
+            await index.apply_pages(domain_pages, domain_removed)
@@ -1,89 +1,54 @@
+import asyncio
 import logging
-from typing import Dict, List
-from .utils import find_phrase_context, calculate_relevance_score
-from supabase import create_client
 import os
-import re
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from .utils import tokenize
+from .candidate_retriever import get_page_store, iter_candidate_chunks, rank_candidates, retrieve_candidates
+from .page_index import SitePageIndex, get_site_page_index
+from .tfidf_engine import TfidfEngine
+from ..crawlers.snapshot_store import normalize_url
+from ..document_index import get_document_index
+from ..embeddings import get_embedding_service
 
 logger = logging.getLogger(__name__)
 
+# Target pages suggested per keyword, chosen by relevance from a larger candidate pool
+SUGGESTIONS_PER_KEYWORD = 3
+MAX_CANDIDATES_PER_KEYWORD = int(os.getenv('MAX_CANDIDATES_PER_KEYWORD', '20'))
+# Embedding similarity a page needs to a keyword to become a candidate through the ANN index
+ANN_MIN_SIMILARITY = float(os.getenv('ANN_MIN_SIMILARITY', '0.35'))
+# Use the in-memory site index for candidates when the analyzed page's URL is known
+USE_SITE_PAGE_INDEX = os.getenv('USE_SITE_PAGE_INDEX', 'true').lower() == 'true'
+
 async def generate_link_suggestions(
     content: str,
     keywords: Dict[str, List[str]],
-    existing_links: List[Dict]
+    existing_links: List[Dict],
+    url: Optional[str] = None
 ) -> Dict[str, List[Dict]]:
-    """Generate link suggestions based on content analysis and find relevant target pages."""
+    """Generate link suggestions based on content analysis and find relevant target pages.
+    
+    With the analyzed page's `url`, target pages come from the site's
+    in-memory page index (see SitePageIndex); otherwise, or if the index
+    cannot load, from a full-text search of the page store. Each
+    keyword's candidates are scored with TF-IDF (see tfidf_relevance).
+    """
     try:
         logger.info("Starting link suggestion generation")
         logger.info(f"Content length: {len(content)}")
         
-        # Combine all keywords into a single list for processing
-        all_keywords = []
-        for keyword_list in keywords.values():
-            all_keywords.extend([kw.split('(')[0].strip() for kw in keyword_list])  # Remove density info
-            
-        logger.info(f"Processing {len(all_keywords)} potential keywords")
-        
-        # Initialize Supabase client
-        supabase = create_client(
-            os.getenv('SUPABASE_URL', ''),
-            os.getenv('SUPABASE_SERVICE_ROLE_KEY', '')
-        )
-        
-        suggestions = []
-        content_lower = content.lower()
+        contexts = find_keyword_contexts(content, keywords)
         
-        # For each keyword, verify it exists in content and find its exact context
-        for keyword in all_keywords:
-            keyword = keyword.strip()
-            if not keyword:
-                continue
-                
-            # Create pattern with word boundaries
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            
-            # Check if keyword exists in content with word boundaries
-            if not re.search(pattern, content_lower):
-                logger.info(f"Keyword not found in content: {keyword}")
-                continue
-                
-            try:
-                # Find the exact context where this keyword appears
-                exact_context = find_exact_context(content, keyword)
-                if not exact_context:
-                    logger.warning(f"Could not find exact context for keyword: {keyword}")
-                    continue
-                    
-                # Search for relevant pages containing this keyword
-                response = await supabase.table('pages').select('url, title, content') \
-                    .textSearch('content', keyword) \
-                    .limit(3) \
-                    .execute()
-                    
-                relevant_pages = response.data
-                logger.info(f"Found {len(relevant_pages)} relevant pages for keyword: {keyword}")
-                
-                # Create suggestions for relevant pages
-                for page in relevant_pages:
-                    if not page.get('url'):
-                        continue
-                        
-                    suggestions.append({
-                        "suggestedAnchorText": keyword,
-                        "context": exact_context,
-                        "matchType": "keyword_based",
-                        "relevanceScore": calculate_relevance_score(keyword, page),
-                        "targetUrl": page['url'],
-                        "targetTitle": page.get('title', '')
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Error processing keyword {keyword}: {str(e)}")
-                continue
-        
-        # Sort by relevance and limit suggestions
-        suggestions.sort(key=lambda x: x['relevanceScore'], reverse=True)
-        suggestions = suggestions[:10]
+        page_index = await load_site_index(url)
+        if page_index is not None:
+            suggestions = await indexed_suggestions(page_index, contexts, content, url)
+        else:
+            # Resolve candidate pages for all keywords at once, then rank them locally
+            pages = await retrieve_candidates(get_page_store(), list(contexts))
+            candidates = rank_candidates(list(contexts), pages, per_keyword=MAX_CANDIDATES_PER_KEYWORD)
+            engine = await build_candidate_engine(pages)
+            suggestions = top_suggestions(build_suggestions(contexts, candidates, tfidf_relevance(engine, content)))
         
         logger.info(f"Generated {len(suggestions)} final suggestions")
         return {'outboundSuggestions': suggestions}
@@ -92,34 +57,224 @@ async def generate_link_suggestions(
         logger.error(f"Error generating suggestions: {str(e)}", exc_info=True)
         return {'outboundSuggestions': []}
 
-def find_exact_context(content: str, keyword: str, context_length: int = 100) -> str:
-    """Find the exact context where a keyword appears in the content."""
+async def iter_link_suggestions(
+    content: str,
+    keywords: Dict[str, List[str]],
+    existing_links: List[Dict],
+    url: Optional[str] = None
+) -> AsyncIterator[Dict]:
+    """Yield link suggestions progressively as candidate queries return.
+
+    Each keyword chunk's suggestions are yielded as
+    {'suggestion': ..., 'provisional': True} as soon as its query
+    finishes; they are ranked against that chunk's pages only. The last
+    item is {'outboundSuggestions': [...]}, the same final ranking
+    generate_link_suggestions returns, built from the pages already
+    retrieved, and it supersedes the provisional ones. Candidates from
+    the site page index need no queries, so that path yields the final
+    suggestions directly, with 'provisional' False.
+    """
+    contexts = find_keyword_contexts(content, keywords)
+    page_index = await load_site_index(url)
+    if page_index is not None:
+        suggestions = await indexed_suggestions(page_index, contexts, content, url)
+        for suggestion in suggestions:
+            yield {'suggestion': suggestion, 'provisional': False}
+        yield {'outboundSuggestions': suggestions}
+        return
+    
+    results = []
+    async for index, chunk, pages in iter_candidate_chunks(get_page_store(), list(contexts)):
+        results.append((index, pages))
+        candidates = rank_candidates(chunk, pages, per_keyword=MAX_CANDIDATES_PER_KEYWORD)
+        chunk_contexts = {keyword: contexts[keyword] for keyword in chunk}
+        scorer = tfidf_relevance(await build_candidate_engine(pages), content)
+        for suggestion in top_suggestions(build_suggestions(chunk_contexts, candidates, scorer)):
+            yield {'suggestion': suggestion, 'provisional': True}
+    
+    # Rank over everything retrieved, in query order, exactly as retrieve_candidates would
+    results.sort(key=lambda result: result[0])
+    pages: Dict[str, Dict] = {}
+    for _, chunk_pages in results:
+        for page in chunk_pages:
+            pages.setdefault(page['url'], page)
+    candidates = rank_candidates(list(contexts), list(pages.values()), per_keyword=MAX_CANDIDATES_PER_KEYWORD)
+    scorer = tfidf_relevance(await build_candidate_engine(list(pages.values())), content)
+    yield {'outboundSuggestions': top_suggestions(build_suggestions(contexts, candidates, scorer))}
+
+async def load_site_index(url: Optional[str]) -> Optional[SitePageIndex]:
+    """Return the page index of the analyzed page's site, or None to fall back to full-text search."""
+    if not url or not USE_SITE_PAGE_INDEX:
+        return None
     try:
-        content_lower = content.lower()
-        keyword_lower = keyword.lower()
-        
-        # Find the position of the keyword with word boundaries
-        pattern = r'\b' + re.escape(keyword_lower) + r'\b'
-        match = re.search(pattern, content_lower)
+        return await get_site_page_index(get_page_store(), url)
+    except Exception as e:
+        logger.error(f"Site page index unavailable for {url}, using full-text search: {str(e)}")
+        return None
+
+async def indexed_suggestions(
+    page_index: SitePageIndex,
+    contexts: Dict[str, str],
+    content: str,
+    url: str
+) -> List[Dict]:
+    """Build the final suggestions from the site index's candidates and TF-IDF engine."""
+    candidates, similarities = await rank_indexed_candidates(page_index, list(contexts), url)
+    scorer = tfidf_relevance(await page_index.tfidf_engine(), content, similarities)
+    return top_suggestions(build_suggestions(contexts, candidates, scorer))
+
+async def rank_indexed_candidates(
+    page_index: SitePageIndex,
+    keywords: List[str],
+    url: str
+) -> Tuple[Dict[str, List[Dict]], Dict[Tuple[str, str], float]]:
+    """Look up each keyword's candidate target pages in the site index, excluding the analyzed page.
+
+    Pages containing the keyword come first. With a local embedding
+    model, the pages nearest to the keyword's embedding in the site's ANN
+    index are added when at least ANN_MIN_SIMILARITY similar, so related
+    pages that word it differently qualify too. Returns the candidates
+    and the embedding similarity of each (keyword, url) found that way.
+    """
+    source = normalize_url(url)
+    keyword_vectors = None
+    if page_index.ann is not None and len(page_index.ann) and keywords:
+        try:
+            keyword_vectors = await get_embedding_service().embed(keywords)
+        except Exception as e:
+            logger.error(f"Could not embed keywords, using index lookups only: {str(e)}")
+    
+    ranked: Dict[str, List[Dict]] = {}
+    similarities: Dict[Tuple[str, str], float] = {}
+    for i, keyword in enumerate(keywords):
+        candidates = page_index.candidates(keyword, limit=MAX_CANDIDATES_PER_KEYWORD + 1)
+        if keyword_vectors is not None:
+            for page, similarity in page_index.nearest_pages(keyword_vectors[i], MAX_CANDIDATES_PER_KEYWORD + 1):
+                if similarity >= ANN_MIN_SIMILARITY:
+                    candidates.append(page)
+                    similarities[(keyword, page['url'])] = similarity
+        pages: Dict[str, Dict] = {}
+        for page in candidates:
+            if normalize_url(page['url']) != source:
+                pages.setdefault(page['url'], page)
+        ranked[keyword] = list(pages.values())[:2 * MAX_CANDIDATES_PER_KEYWORD]
+    return ranked, similarities
+
+async def build_candidate_engine(pages: List[Dict]) -> TfidfEngine:
+    """Build a TF-IDF engine over full-text search results, for scoring without a site index."""
+    term_counts = {
+        page['url']: Counter(tokenize(f"{page.get('title') or ''} {page.get('content') or ''}"))
+        for page in pages
+    }
+    return await asyncio.to_thread(TfidfEngine.build, term_counts)
+
+def tfidf_relevance(
+    engine: TfidfEngine,
+    content: str,
+    keyword_similarities: Optional[Dict[Tuple[str, str], float]] = None
+) -> Callable[[str, Dict], float]:
+    """Score (keyword, target page) pairs with an engine's cosine similarities.
+
+    The score is the mean of the target's similarity to the whole source
+    content and to the keyword itself, so a target must fit both the page
+    it is linked from and the anchor text. An embedding similarity in
+    `keyword_similarities` replaces the keyword's TF-IDF similarity when
+    higher, since TF-IDF misses pages that use other words. Pages outside
+    the engine's corpus score 0.
+    """
+    keyword_similarities = keyword_similarities or {}
+    content_scores = engine.score(content)
+    keyword_scores: Dict[str, object] = {}
+
+    def score(keyword: str, page: Dict) -> float:
+        row = engine.rows.get(page['url'])
+        if row is None:
+            return 0.0
+        if keyword not in keyword_scores:
+            keyword_scores[keyword] = engine.score(keyword)
+        keyword_score = max(
+            float(keyword_scores[keyword][row]),
+            keyword_similarities.get((keyword, page['url']), 0.0)
+        )
+        return (float(content_scores[row]) + keyword_score) / 2
+
+    return score
+
+def find_keyword_contexts(content: str, keywords: Dict[str, List[str]]) -> Dict[str, str]:
+    """Map each keyword found in the content to the exact context it appears in."""
+    # Combine all keywords into a single list for processing
+    all_keywords = []
+    for keyword_list in keywords.values():
+        all_keywords.extend([kw.split('(')[0].strip() for kw in keyword_list])  # Remove density info
         
-        if not match:
-            return ""
+    logger.info(f"Processing {len(all_keywords)} potential keywords")
+    
+    index = get_document_index(content)
+    contexts = {}
+    
+    # For each keyword, verify it exists in content and find its exact context
+    for keyword in all_keywords:
+        keyword = keyword.strip()
+        if not keyword:
+            continue
             
-        start_pos = match.start()
-        end_pos = match.end()
-        
-        # Get surrounding context
-        context_start = max(0, start_pos - context_length)
-        context_end = min(len(content), end_pos + context_length)
-        
-        # Get the exact case from the original content
-        original_keyword = content[start_pos:end_pos]
-        context = content[context_start:context_end].strip()
+        # Check if keyword exists in content with word boundaries
+        if not index.find(keyword):
+            logger.info(f"Keyword not found in content: {keyword}")
+            continue
+            
+        try:
+            # Find the exact context where this keyword appears
+            exact_context = find_exact_context(content, keyword)
+            if not exact_context:
+                logger.warning(f"Could not find exact context for keyword: {keyword}")
+                continue
+            contexts[keyword] = exact_context
+                
+        except Exception as e:
+            logger.error(f"Error processing keyword {keyword}: {str(e)}")
+            continue
+    
+    return contexts
+
+def build_suggestions(
+    contexts: Dict[str, str],
+    candidates: Dict[str, List[Dict]],
+    scorer: Callable[[str, Dict], float],
+    per_keyword: int = SUGGESTIONS_PER_KEYWORD
+) -> List[Dict]:
+    """Turn each keyword's most relevant candidate pages into suggestions."""
+    suggestions = []
+    for keyword, exact_context in contexts.items():
+        scored = sorted(
+            ((scorer(keyword, page), page) for page in candidates.get(keyword, [])),
+            key=lambda item: item[0],
+            reverse=True
+        )[:per_keyword]
+        logger.info(f"Found {len(scored)} relevant pages for keyword: {keyword}")
         
+        # Create suggestions for relevant pages
+        for score, page in scored:
+            suggestions.append({
+                "suggestedAnchorText": keyword,
+                "context": exact_context,
+                "matchType": "keyword_based",
+                "relevanceScore": score,
+                "targetUrl": page['url'],
+                "targetTitle": page.get('title', '')
+            })
+    return suggestions
+
+def top_suggestions(suggestions: List[Dict], limit: int = 10) -> List[Dict]:
+    """Sort suggestions by relevance and keep the best `limit`."""
+    suggestions.sort(key=lambda x: x['relevanceScore'], reverse=True)
+    return suggestions[:limit]
+
+def find_exact_context(content: str, keyword: str, context_length: int = 100) -> str:
+    """Find the exact context where a keyword appears in the content."""
+    try:
         # Highlight the keyword while preserving its original case
-        highlighted_context = context.replace(original_keyword, f"[{original_keyword}]")
-        
-        return highlighted_context
+        return get_document_index(content).context(keyword, context_length)
         
     except Exception as e:
         logger.error(f"Error finding exact context: {str(e)}")
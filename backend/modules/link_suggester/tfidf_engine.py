@@ -0,0 +1,181 @@
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Share of entries that may sit unsorted or belong to removed pages before the matrix is recompacted
+COMPACT_RATIO = 0.25
+
+class TfidfEngine:
+    """TF-IDF vectors for every page of a site, stored as one sparse matrix.
+
+    Rows are L2-normalized sublinear TF-IDF vectors. Entries hold the
+    sublinear TF of a (term, page) pair, mostly grouped by term (CSC: term
+    pointers, page rows, weights) in NumPy arrays; IDF and row norms are
+    derived from the document frequencies, so they need no per-entry
+    rewrite when the corpus changes. Scoring a source text against every
+    page is a single sparse matrix-vector product that only touches the
+    columns of the text's terms, so the cosine similarity of all targets
+    comes out of one vectorized pass.
+
+    Engines are immutable: `updated` returns a new engine for changed and
+    removed pages at a cost that grows with the changed pages, not the
+    corpus. Its entries are appended unsorted and removed pages' rows are
+    left empty until they make up COMPACT_RATIO of the matrix, when it is
+    regrouped by term.
+    """
+
+    def __init__(
+        self,
+        urls: List[Optional[str]],
+        vocabulary: Dict[str, int],
+        document_frequency: np.ndarray,
+        row_terms: List[Optional[np.ndarray]],
+        entry_terms: np.ndarray,
+        entry_rows: np.ndarray,
+        entry_tf: np.ndarray,
+        col_ptr: np.ndarray
+    ):
+        self.urls = urls
+        self.rows = {url: row for row, url in enumerate(urls) if url is not None}
+        # Shared between an engine and the ones updated from it; only ever appended to
+        self.vocabulary = vocabulary
+        self.document_frequency = document_frequency
+        self._row_terms = row_terms
+        self._entry_terms = entry_terms
+        self._entry_rows = entry_rows
+        self._entry_tf = entry_tf
+        # Entries before col_ptr[-1] are grouped by term; the rest are unsorted appends
+        self._col_ptr = col_ptr
+
+        # Smoothed IDF over the live pages
+        self.idf = (np.log((1 + len(self.rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        live = np.zeros(len(urls), dtype=bool)
+        live[list(self.rows.values())] = True
+        weights = entry_tf * self.idf[entry_terms]
+        norms = np.sqrt(np.bincount(entry_rows, weights=weights * weights, minlength=len(urls)))
+        # Removed pages score 0
+        norms[(norms == 0) | ~live] = np.inf
+        self._norms = norms.astype(np.float32)
+
+    @classmethod
+    def build(cls, term_counts: Dict[str, Counter]) -> 'TfidfEngine':
+        """Build the engine from per-page term counts keyed by URL."""
+        started = time.monotonic()
+        empty = cls([], {}, np.zeros(0, dtype=np.float32), [], np.zeros(0, dtype=np.int32),
+                    np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32), np.zeros(1, dtype=np.int64))
+        # Every entry starts out unsorted, so updating the empty engine compacts it
+        engine = empty.updated(term_counts)
+        logger.info(
+            f"Built TF-IDF matrix for {len(engine.rows)} pages, {len(engine.vocabulary)} terms, "
+            f"{len(engine._entry_tf)} entries in {time.monotonic() - started:.2f}s"
+        )
+        return engine
+
+    def updated(self, term_counts: Dict[str, Counter], removed: Iterable[str] = ()) -> 'TfidfEngine':
+        """Return an engine with the given pages (re)indexed and the `removed` ones dropped."""
+        dropped = [self.rows[url] for url in set(removed) | set(term_counts) if url in self.rows]
+        urls = list(self.urls)
+        row_terms = list(self._row_terms)
+        document_frequency = self.document_frequency.copy()
+        for row in dropped:
+            np.subtract.at(document_frequency, row_terms[row], 1)
+            urls[row] = None
+            row_terms[row] = None
+
+        ids_per_row, tf_per_row, rows_per_row = [], [], []
+        for url, counts in term_counts.items():
+            if not counts:
+                continue
+            ids = np.fromiter(
+                (self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts),
+                dtype=np.int32, count=len(counts)
+            )
+            row = len(urls)
+            urls.append(url)
+            row_terms.append(ids)
+            ids_per_row.append(ids)
+            tf_per_row.append(1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))))
+            rows_per_row.append(np.full(len(ids), row, dtype=np.int32))
+
+        new_terms = np.concatenate(ids_per_row) if ids_per_row else np.zeros(0, dtype=np.int32)
+        grown = np.zeros(len(self.vocabulary), dtype=np.float32)
+        grown[:len(document_frequency)] = document_frequency
+        grown += np.bincount(new_terms, minlength=len(self.vocabulary))
+
+        engine = TfidfEngine(
+            urls, self.vocabulary, grown, row_terms,
+            np.concatenate([self._entry_terms, new_terms]),
+            np.concatenate([self._entry_rows] + rows_per_row) if rows_per_row else self._entry_rows,
+            np.concatenate([self._entry_tf] + tf_per_row) if tf_per_row else self._entry_tf,
+            self._col_ptr
+        )
+        if engine._needs_compaction():
+            return engine.compacted()
+        return engine
+
+    def compacted(self) -> 'TfidfEngine':
+        """Return this engine with removed pages dropped and every entry grouped by term."""
+        live_rows = sorted(self.rows.values())
+        renumber = np.full(len(self.urls), -1, dtype=np.int32)
+        renumber[live_rows] = np.arange(len(live_rows), dtype=np.int32)
+        keep = renumber[self._entry_rows] >= 0
+        terms = self._entry_terms[keep]
+        order = np.argsort(terms, kind='stable')
+        col_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=col_ptr[1:])
+        return TfidfEngine(
+            [self.urls[row] for row in live_rows], self.vocabulary, self.document_frequency,
+            [self._row_terms[row] for row in live_rows],
+            terms[order], renumber[self._entry_rows[keep]][order], self._entry_tf[keep][order], col_ptr
+        )
+
+    def vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (term ids, weights) of a text's normalized TF-IDF vector in this corpus."""
+        known = len(self.idf)
+        counts = Counter(token for token in tokenize(text) if self.vocabulary.get(token, known) < known)
+        if not counts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        ids = np.fromiter((self.vocabulary[term] for term in counts), dtype=np.int32, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        weights = (1 + np.log(tf)) * self.idf[ids]
+        norm = np.linalg.norm(weights)
+        if not norm:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return ids, weights / norm
+
+    def score(self, text: str) -> np.ndarray:
+        """Cosine similarity of a text to every page, indexed like `urls`."""
+        ids, weights = self.vectorize(text)
+        if not len(ids):
+            return np.zeros(len(self.urls), dtype=np.float32)
+
+        # Gather the grouped columns of the query terms, plus the unsorted appends that hit them
+        sorted_ids = ids[ids < len(self._col_ptr) - 1]
+        starts = self._col_ptr[sorted_ids]
+        lengths = self._col_ptr[sorted_ids + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        entries = offsets + np.arange(offsets.size)
+        appended = self._col_ptr[-1] + np.flatnonzero(np.isin(self._entry_terms[self._col_ptr[-1]:], ids))
+        entries = np.concatenate([entries, appended])
+
+        query = np.zeros(len(self.idf), dtype=np.float32)
+        query[ids] = weights
+        terms = self._entry_terms[entries]
+        rows = self._entry_rows[entries]
+        return np.bincount(
+            rows,
+            weights=self._entry_tf[entries] * self.idf[terms] * query[terms] / self._norms[rows],
+            minlength=len(self.urls)
+        )
+
+    def _needs_compaction(self) -> bool:
+        unsorted = len(self._entry_tf) - self._col_ptr[-1]
+        removed_rows = len(self.urls) - len(self.rows)
+        return (unsorted > COMPACT_RATIO * max(len(self._entry_tf), 1) or
+                removed_rows > COMPACT_RATIO * max(len(self.urls), 1))
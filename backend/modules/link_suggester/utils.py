@@ -1,55 +1,21 @@
 import logging
-from typing import Dict
+import re
+from typing import List
+from ..document_index import get_document_index
 
 logger = logging.getLogger(__name__)
 
+TOKEN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of a text."""
+    return TOKEN.findall(text.lower()) if text else []
+
 def find_phrase_context(content: str, phrase: str, context_length: int = 100) -> str:
     """Find the surrounding context for a phrase in the content."""
     try:
-        phrase_lower = phrase.lower()
-        content_lower = content.lower()
-        
-        # Find exact phrase position
-        pos = content_lower.find(f" {phrase_lower} ")
-        if pos == -1:
-            return ""
-            
-        # Get surrounding context
-        start = max(0, pos - context_length)
-        end = min(len(content), pos + len(phrase) + context_length)
-        
-        context = content[start:end].strip()
-        # Highlight the phrase
-        context = context.replace(phrase, f"[{phrase}]")
-        
-        return context
+        return get_document_index(content).context(phrase, context_length)
         
     except Exception as e:
         logger.error(f"Error finding context: {str(e)}")
         return ""
-
-def calculate_relevance_score(phrase: str, page: Dict) -> float:
-    """Calculate relevance score based on exact phrase matches in title and content."""
-    try:
-        score = 0.0
-        phrase_lower = phrase.lower()
-        
-        # Check exact phrase in title
-        if page.get('title'):
-            title_lower = page['title'].lower()
-            if f" {phrase_lower} " in f" {title_lower} ":
-                score += 0.5
-                
-        # Check exact phrase in content
-        if page.get('content'):
-            content_lower = page['content'].lower()
-            if f" {phrase_lower} " in f" {content_lower} ":
-                # Calculate exact phrase frequency
-                frequency = content_lower.count(f" {phrase_lower} ")
-                score += min(0.5, frequency * 0.1)  # Cap at 0.5
-                
-        return min(1.0, score)
-        
-    except Exception as e:
-        logger.error(f"Error calculating relevance: {str(e)}")
-        return 0.0
\ No newline at end of file
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class _StreamFlight:
+    """Events produced so far by one shared stream, and who is following it."""
+
+    def __init__(self):
+        self.events: List = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight task.
+
+    The first caller for a key starts the task; callers arriving while it
+    runs await the same task and get the same result or exception. A
+    caller that is cancelled (e.g. the client disconnected) does not cancel
+    the shared task for the others.
+
+    Streams are coalesced the same way with `stream()`: callers joining a
+    stream already in flight first replay the events it has produced,
+    then follow the live ones. A shared stream is cancelled once all of
+    its callers have gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _StreamFlight] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func` for `key`, or join the call already in flight for it."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight call for {key}")
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, func: Callable[[], AsyncGenerator[T, None]]) -> AsyncIterator[T]:
+        """Iterate `func()` for `key`, or join the stream already in flight for it."""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, func))
+        else:
+            logger.info(f"Joining in-flight stream for {key}")
+        
+        flight.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: position < len(flight.events) or flight.finished)
+                    events = flight.events[position:]
+                position += len(events)
+                for event in events:
+                    yield event
+                if flight.finished and position == len(flight.events):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.task.done():
+                logger.info(f"Every caller left stream {key}, cancelling it")
+                self._forget_stream(key, flight)
+                flight.task.cancel()
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls and streams currently running."""
+        return len(self._calls) + len(self._streams)
+
+    async def _pump(self, key: Hashable, flight: _StreamFlight, func: Callable[[], AsyncGenerator[T, None]]) -> None:
+        iterator = func()
+        try:
+            async for event in iterator:
+                async with flight.changed:
+                    flight.events.append(event)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            await iterator.aclose()
+            self._forget_stream(key, flight)
+            async with flight.changed:
+                flight.finished = True
+                flight.changed.notify_all()
+
+    def _forget_stream(self, key: Hashable, flight: _StreamFlight) -> None:
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
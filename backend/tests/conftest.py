@@ -0,0 +1,30 @@
+import asyncio
+import httpx
+import pytest
+from modules import keyword_extractor
+from modules.crawlers import base_crawler, content_extractor
+from modules.crawlers.base_crawler import BaseCrawler
+
+@pytest.fixture
+def inline_cpu_work(monkeypatch):
+    """Run the CPU-bound analysis stages inline instead of in the process pool."""
+    async def direct(func, *args):
+        return func(*args)
+    monkeypatch.setattr(base_crawler, 'run_cpu_bound', direct)
+    monkeypatch.setattr(content_extractor, 'run_cpu_bound', direct)
+    monkeypatch.setattr(keyword_extractor, 'run_cpu_bound', direct)
+
+@pytest.fixture
+def crawl(inline_cpu_work):
+    """Crawl https://site.test/ served by an httpx.MockTransport handler and return crawl_site's result.
+
+    Without a `snapshot_store` the crawl runs with none, rather than the process-wide default.
+    """
+    def run(handler, max_pages=10, snapshot_store=None, **options):
+        async def scenario():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                crawler = BaseCrawler('https://site.test/', snapshot_store=snapshot_store, client=client, **options)
+                crawler.snapshot_store = snapshot_store
+                return await crawler.crawl_site(max_pages)
+        return asyncio.run(scenario())
+    return run
@@ -0,0 +1,80 @@
+import time
+import numpy as np
+from modules.embeddings.ann_index import IVFFlatIndex
+
+def clustered(rng, count, centres, spread=1.5):
+    vectors = centres[rng.integers(0, len(centres), count)] + spread * rng.normal(size=(count, centres.shape[1]))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def build_index(rng, centres, count):
+    index = IVFFlatIndex(centres.shape[1], min_train_size=1024)
+    vectors = clustered(rng, count, centres)
+    index.add([f"page-{i}" for i in range(count)], vectors)
+    return index
+
+def test_tuned_recall_holds_on_unseen_queries():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(50, 32))
+    index = build_index(rng, centres, 4000)
+    assert index.centroids is not None
+
+    recall = index.evaluate_recall(clustered(rng, 100, centres), k=10)
+    assert recall >= 0.85
+    assert index.n_probe < len(index.centroids)
+
+def test_held_out_tuning_excludes_the_query_itself():
+    rng = np.random.default_rng(1)
+    centres = rng.normal(size=(50, 32))
+    index = build_index(rng, centres, 2000)
+    sample = index._vectors[:20]
+    keys = index.keys[:20]
+
+    held_out = index.evaluate_recall(sample, k=1, n_probe=1, exclude=keys)
+    self_queries = index.evaluate_recall(sample, k=1, n_probe=1)
+    assert self_queries == 1.0
+    assert held_out <= self_queries
+
+def test_retraining_retunes_n_probe():
+    rng = np.random.default_rng(2)
+    centres = rng.normal(size=(50, 32))
+    index = build_index(rng, centres, 1024)
+    first_lists = len(index.centroids)
+
+    index.n_probe = 10 ** 6
+    more = clustered(rng, 4000, centres)
+    index.add([f"more-{i}" for i in range(len(more))], more)
+    assert len(index.centroids) > first_lists
+    assert index.n_probe <= len(index.centroids)
+
+def timed(search, queries, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for query in queries:
+            search(query, 10)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def test_probing_beats_exact_search_at_target_recall():
+    rng = np.random.default_rng(3)
+    centres = rng.normal(size=(200, 64))
+    index = IVFFlatIndex(64)
+    vectors = clustered(rng, 20000, centres, spread=1.0)
+    for start in range(0, len(vectors), 5000):
+        index.add([f"page-{i}" for i in range(start, start + 5000)], vectors[start:start + 5000])
+    queries = clustered(rng, 200, centres, spread=1.0)
+
+    assert len(index.centroids) >= int(np.sqrt(10000))
+    assert index.n_probe <= 8
+    assert index.evaluate_recall(queries, k=10) >= 0.9
+    assert timed(index.exact_search, queries) / timed(index.search, queries) >= 3
+
+def test_small_indexes_stay_exact():
+    rng = np.random.default_rng(4)
+    centres = rng.normal(size=(20, 32))
+    index = IVFFlatIndex(32)
+    index.add([f"page-{i}" for i in range(2000)], clustered(rng, 2000, centres))
+
+    query = clustered(rng, 1, centres)[0]
+    assert index.centroids is None
+    assert index.search(query) == index.exact_search(query)
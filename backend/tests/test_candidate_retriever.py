@@ -0,0 +1,189 @@
+import asyncio
+import pytest
+
+# The link_suggester package imports the OpenAI client on load
+pytest.importorskip('openai')
+from modules.link_suggester.candidate_retriever import SQLitePageStore, rank_candidates, retrieve_candidates
+
+def page(url, content, title=''):
+    return {'url': url, 'title': title, 'content': content}
+
+def test_popular_keywords_do_not_starve_the_others():
+    store = SQLitePageStore()
+    store.add_pages([page(f"https://site.test/bread-{i}", "Sourdough bread recipe and more bread.") for i in range(30)])
+    store.add_pages([page("https://site.test/rye", "Notes on rye flour hydration.")])
+
+    pages = asyncio.run(store.search(['bread', 'rye flour'], 5))
+    urls = [result['url'] for result in pages]
+    assert "https://site.test/rye" in urls
+    assert len(urls) == 6
+
+def test_search_matches_phrases_and_ranks_by_bm25():
+    store = SQLitePageStore()
+    store.add_pages([
+        page("https://site.test/scattered", "Flour for the oven. " + "Filler text about kitchens. " * 20 + "Rye is a grain."),
+        page("https://site.test/passing", "We used rye flour once. " + "Other notes on baking. " * 20),
+        page("https://site.test/focused", "Rye flour guide: rye flour types, rye flour hydration and rye flour storage."),
+    ])
+
+    pages = asyncio.run(store.search(['rye flour'], 1))
+    assert [result['url'] for result in pages] == ["https://site.test/focused"]
+
+    pages = asyncio.run(store.search(['rye flour'], 10))
+    assert "https://site.test/scattered" not in [result['url'] for result in pages]
+
+def test_removed_pages_are_not_found():
+    store = SQLitePageStore()
+    store.add_pages([page("https://site.test/a", "Sourdough starter care."), page("https://other.test/b", "Sourdough starter.")])
+    store.remove_pages(["https://site.test/a"])
+
+    assert [result['url'] for result in asyncio.run(store.search(['sourdough starter'], 5))] == ["https://other.test/b"]
+    assert asyncio.run(store.site_pages('site.test', None, 0, 10)) == []
+
+def test_retrieve_candidates_merges_chunks_without_duplicates(monkeypatch):
+    monkeypatch.setattr('modules.link_suggester.candidate_retriever.CANDIDATE_QUERY_CHUNK', 1)
+    store = SQLitePageStore()
+    store.add_pages([page("https://site.test/a", "Sourdough starter and rye flour."), page("https://site.test/b", "Rye flour.")])
+
+    pages = asyncio.run(retrieve_candidates(store, ['sourdough starter', 'rye flour']))
+    assert sorted(result['url'] for result in pages) == ["https://site.test/a", "https://site.test/b"]
+
+def test_rank_candidates_orders_by_bm25_and_requires_every_term():
+    pages = [
+        page("https://site.test/partial", "Rye bread without the other word."),
+        page("https://site.test/long", "Rye flour mention. " + "Unrelated words about ovens and kitchens. " * 30),
+        page("https://site.test/dense", "Rye flour, rye flour and more rye flour."),
+    ]
+
+    ranked = rank_candidates(['rye flour', 'oven'], pages, per_keyword=5)
+    assert [result['url'] for result in ranked['rye flour']] == ["https://site.test/dense", "https://site.test/long"]
+    assert ranked['oven'] == []
+
+def test_rank_candidates_keeps_the_top_per_keyword():
+    pages = [page(f"https://site.test/{i}", "rye " * (i + 1) + "filler " * 10) for i in range(6)]
+
+    ranked = rank_candidates(['rye'], pages, per_keyword=2)
+    assert [result['url'] for result in ranked['rye']] == ["https://site.test/5", "https://site.test/4"]
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+class FakeQuery:
+    """Just enough of the PostgREST query builder for the page store's writes."""
+
+    def __init__(self, table, log):
+        self.table, self.log = table, log
+        self.filters, self.action = [], ('select', None)
+
+    def select(self, columns):
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        self.log.append(('in', len(values)))
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def limit(self, count):
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.action = ('upsert', rows)
+        return self
+
+    def update(self, values):
+        self.action = ('update', values)
+        return self
+
+    def execute(self):
+        kind, payload = self.action
+        if kind == 'upsert':
+            for row in payload:
+                existing = next((stored for stored in self.table if stored['url'] == row['url']), None)
+                existing.update(row) if existing else self.table.append(dict(row))
+            return FakeResponse(payload)
+        matched = [row for row in self.table if all(check(row) for check in self.filters)]
+        if kind == 'update':
+            for row in matched:
+                row.update(payload)
+        return FakeResponse(matched)
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        self.client.log.append(('rpc', self.name))
+        if not self.client.functions:
+            raise RuntimeError("function does not exist")
+        rows = []
+        for keyword in self.params['keywords']:
+            matches = [row for row in self.client.pages if keyword in (row.get('content') or '').lower()]
+            rows.extend({'keyword': keyword, **row} for row in matches[:self.params['per_keyword']])
+        return FakeResponse(rows)
+
+class FakeSupabase:
+    def __init__(self, pages, functions=True):
+        self.pages, self.log, self.functions = pages, [], functions
+
+    def table(self, name):
+        return FakeQuery(self.pages if name == 'pages' else [], self.log)
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+def test_supabase_writes_look_up_only_the_changed_urls():
+    from modules.link_suggester.candidate_retriever import SupabasePageStore
+
+    rows = [{'url': f"https://site.test/post-{i}/", 'title': 'Old', 'content': 'Old'} for i in range(2000)]
+    client = FakeSupabase(rows)
+    store = SupabasePageStore(client)
+
+    store.add_pages([page("https://site.test/post-7", "New content", "New"), page("https://site.test/fresh", "Fresh")])
+    store.remove_pages(["https://site.test/post-9?utm_source=x"])
+
+    assert all(size <= 8 for _, size in client.log)
+    by_url = {row['url']: row for row in rows}
+    assert by_url["https://site.test/post-7/"]['content'] == "New content"
+    assert by_url["https://site.test/fresh"]['content'] == "Fresh"
+    assert by_url["https://site.test/post-9/"]['content'] is None
+    assert len(rows) == 2001
+
+def test_crawl_changes_are_applied_in_the_background(monkeypatch):
+    from modules.link_suggester import candidate_retriever
+
+    store = SQLitePageStore()
+    monkeypatch.setattr(candidate_retriever, 'get_page_store', lambda: store)
+    release = asyncio.Event()
+    original = candidate_retriever.apply_crawl_changes
+
+    async def slow_apply(*args):
+        await release.wait()
+        return await original(*args)
+    monkeypatch.setattr(candidate_retriever, 'apply_crawl_changes', slow_apply)
+
+    async def scenario():
+        candidate_retriever.schedule_crawl_changes(
+            {"https://site.test/a": page("https://site.test/a", "Rye flour.")}, {'added': ["https://site.test/a"]}
+        )
+        before = await store.search(['rye flour'], 5)
+        release.set()
+        await candidate_retriever.wait_for_crawl_changes()
+        return before, await store.search(['rye flour'], 5)
+
+    before, after = asyncio.run(scenario())
+    assert before == [] and [result['url'] for result in after] == ["https://site.test/a"]
+
+def test_supabase_search_is_one_call_with_a_quota_per_keyword():
+    from modules.link_suggester.candidate_retriever import SupabasePageStore
+
+    rows = [page(f"https://site.test/bread-{i}", "bread recipe") for i in range(30)] + [page("https://site.test/rye", "rye flour")]
+    client = FakeSupabase(rows)
+
+    pages = asyncio.run(SupabasePageStore(client).search(['bread', 'rye flour'], 5))
+    assert client.log == [('rpc', 'search_pages_per_keyword')]
+    assert len(pages) == 6 and "https://site.test/rye" in [result['url'] for result in pages]
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+import time
+import httpx
+from modules.crawlers.checkpoint import CrawlCheckpoint, open_checkpoint
+from modules.crawlers.fingerprint import content_hash, link_structure_hash
+from modules.crawlers.page_parser import parse_page
+from modules.crawlers.snapshot_store import SnapshotStore
+
+STALE_HTML = '<html><body><article><p>Stale page, fetched again.</p></article></body></html>'
+
+def page(url, links):
+    return {'url': url, 'title': url, 'content': f"Content of {url}", 'links': [{'url': link} for link in links],
+            'canonical': None, 'truncated': False}
+
+def test_flush_runs_off_the_event_loop(tmp_path, monkeypatch):
+    flushed_in = []
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'log.jsonl'), flush_interval=0)
+    original = checkpoint.flush
+    monkeypatch.setattr(checkpoint, 'flush', lambda: (flushed_in.append(threading.current_thread()), original()))
+
+    asyncio.run(checkpoint.append({'type': 'gone', 'url': 'https://site.test/a'}))
+    checkpoint.close()
+
+    assert flushed_in and flushed_in[0] is not threading.main_thread()
+    assert CrawlCheckpoint(str(tmp_path / 'log.jsonl')).replay() == [{'type': 'gone', 'url': 'https://site.test/a'}]
+
+def test_checkpoints_default_to_the_snapshot_freshness_window(tmp_path, monkeypatch):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', str(tmp_path))
+    monkeypatch.delenv('CRAWL_CHECKPOINT_MAX_AGE', raising=False)
+    monkeypatch.setenv('SNAPSHOT_MAX_AGE', '300')
+    checkpoint = open_checkpoint('https://site.test/')
+    asyncio.run(checkpoint.append({'type': 'gone', 'url': 'https://site.test/a'}))
+    checkpoint.close()
+    old = time.time() - 301
+    os.utime(checkpoint.path, (old, old))
+
+    assert open_checkpoint('https://site.test/').replay() == []
+
+def test_stale_pages_are_refetched_on_resume_and_keep_their_change(crawl, tmp_path, monkeypatch):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', str(tmp_path))
+    monkeypatch.setenv('CRAWL_CHECKPOINT_MAX_AGE', '86400')
+    snapshots = SnapshotStore(str(tmp_path / 'snapshots.sqlite3'), max_age=300)
+    # The interrupted crawl fetched the stale page an hour ago and recorded its new fingerprints
+    snapshots.put('https://site.test/stale', STALE_HTML)
+    snapshots._conn.execute("UPDATE snapshots SET fetched_at = ?", (time.time() - 3600,))
+    stale = parse_page(STALE_HTML, 'https://site.test/stale', 'site.test')
+    snapshots.record_document('https://site.test/stale', stale, content_hash(stale['content']),
+                              link_structure_hash(stale['links']))
+
+    checkpoint = open_checkpoint('https://site.test/')
+    now = time.time()
+    for record in [
+        {'type': 'page', 'url': 'https://site.test/', 'depth': 0, 'status': 'unchanged',
+         'page': page('https://site.test/', ['https://site.test/fresh', 'https://site.test/stale']), 'at': now},
+        {'type': 'page', 'url': 'https://site.test/fresh', 'depth': 1, 'status': 'changed',
+         'page': page('https://site.test/fresh', []), 'at': now},
+        {'type': 'page', 'url': 'https://site.test/stale', 'depth': 1, 'status': 'changed',
+         'page': page('https://site.test/stale', []), 'at': now - 3600},
+    ]:
+        asyncio.run(checkpoint.append(record))
+    checkpoint.close()
+
+    completed_in = []
+    complete = CrawlCheckpoint.complete
+    monkeypatch.setattr(CrawlCheckpoint, 'complete', lambda self: (completed_in.append(threading.current_thread()), complete(self)))
+
+    fetched = []
+    def handler(request):
+        fetched.append(request.url.path)
+        return httpx.Response(200, text=STALE_HTML, headers={'content-type': 'text/html'})
+
+    result = crawl(handler, snapshot_store=snapshots, max_concurrency=1)
+    assert fetched == ['/stale']
+    assert sorted(result['changes']['changed']) == ['https://site.test/fresh', 'https://site.test/stale']
+    assert result['pages']['https://site.test/stale']['content'] != "Content of https://site.test/stale"
+    # The finished crawl discards its log from a worker thread
+    assert completed_in and completed_in[0] is not threading.main_thread()
+    assert not os.path.exists(checkpoint.path)
@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+from modules.crawlers import base_crawler, content_extractor
+from modules.crawlers.content_extractor import ContentExtractor
+from modules.crawlers.page_parser import parse_page
+
+PAGES = {
+    '/': '<html><head><title>Home</title></head><body><article><p>Welcome to the bakery blog.</p>'
+         '<p>Start with our <a href="/starter">starter guide</a> today.</p></article></body></html>',
+    '/starter': '<html><head><title>Starter</title></head><body><article><p>Feed the starter daily.</p>'
+                '<p>Back to the <a href="/">home page</a>.</p>'
+                '<p>See <a href="https://flour.example/rye">rye flour</a>.</p></article></body></html>',
+}
+
+def analyze(start_url, max_pages, monkeypatch):
+    fetched, parsed = [], []
+    def handler(request):
+        fetched.append(request.url.path)
+        return httpx.Response(200, text=PAGES[request.url.path], headers={'content-type': 'text/html'})
+
+    async def counting(func, *args):
+        parsed.append(args[1])
+        return func(*args)
+    monkeypatch.setattr(base_crawler, 'run_cpu_bound', counting)
+    monkeypatch.setattr(content_extractor, 'run_cpu_bound', counting)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            extractor = ContentExtractor('https://site.test/', client=client)
+            extractor.snapshot_store = None
+            return await extractor.analyze_site_links(start_url, max_pages)
+    return asyncio.run(scenario()), fetched, parsed
+
+def test_target_page_is_served_from_the_crawl(monkeypatch, tmp_path):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', str(tmp_path))
+    result, fetched, parsed = analyze('https://site.test/starter', 10, monkeypatch)
+
+    assert sorted(fetched) == ['/', '/starter']
+    assert sorted(parsed) == ['https://site.test/', 'https://site.test/starter']
+    main = result['main_content']
+    document = parse_page(PAGES['/starter'], 'https://site.test/starter', 'site.test')
+    assert (main['title'], main['content']) == ('Starter', document['content'])
+    assert [link['url'] for link in main['internal_links']] == ['https://site.test/']
+    assert [link['url'] for link in main['external_links']] == ['https://flour.example/rye']
+    assert [link['source_url'] for link in result['inbound_links']] == ['https://site.test/']
+
+def test_target_page_outside_the_crawl_is_fetched_once(monkeypatch, tmp_path):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', str(tmp_path))
+    result, fetched, parsed = analyze('https://site.test/starter', 1, monkeypatch)
+
+    assert fetched == ['/', '/starter']
+    assert parsed == ['https://site.test/', 'https://site.test/starter']
+    assert result['main_content']['title'] == 'Starter'
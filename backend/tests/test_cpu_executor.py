@@ -0,0 +1,53 @@
+import asyncio
+import glob
+import os
+import time
+import pytest
+from modules import cpu_executor
+from modules.crawlers import page_parser
+from modules.crawlers.page_parser import parse_page
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'html', '*.html')))
+URL = 'https://bread.example/guides/post'
+
+def spin(seconds):
+    """Hold the CPU (and the GIL) for a while, then report where it ran."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return os.getpid()
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_PROCESS_WORKERS', '2')
+    yield
+    cpu_executor.shutdown_process_pool()
+
+def test_cpu_work_leaves_the_event_loop_free(process_pool):
+    async def scenario():
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.create_task(tick())
+        pids = await asyncio.gather(cpu_executor.run_cpu_bound(spin, 0.5), cpu_executor.run_cpu_bound(spin, 0.5))
+        ticker.cancel()
+        return pids, ticks
+
+    pids, ticks = asyncio.run(scenario())
+    assert os.getpid() not in pids
+    assert ticks >= 20
+
+def test_pooled_parsing_matches_inline_html_parser(process_pool, monkeypatch):
+    documents = [open(path, encoding='utf-8').read() for path in CORPUS]
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cpu_executor.run_cpu_bound(parse_page, html, URL, 'bread.example') for html in documents
+        ))
+
+    pooled = asyncio.run(scenario())
+    monkeypatch.setattr(page_parser, 'PARSER_BACKEND', 'html.parser')
+    assert pooled == [parse_page(html, URL, 'bread.example') for html in documents]
@@ -0,0 +1,34 @@
+import asyncio
+import httpx
+from modules.crawlers.base_crawler import BaseCrawler
+from modules.crawlers.rate_limiter import get_host_throttle
+
+def link_page(links):
+    body = ''.join(f'<p>Read <a href="{link}">{link}</a> next.</p>' for link in links)
+    return f'<html><body><article><p>Some page content.</p>{body}</article></body></html>'
+
+def test_failed_fetches_do_not_use_up_the_budget(crawl, monkeypatch, tmp_path):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', str(tmp_path))
+
+    async def handler(request):
+        if request.url.path == '/':
+            return httpx.Response(200, text=link_page(['/broken', '/a', '/b']), headers={'content-type': 'text/html'})
+        await asyncio.sleep(0.01)
+        if request.url.path == '/broken':
+            # Fails while the other fetches are in flight
+            return httpx.Response(500)
+        return httpx.Response(200, text=link_page([]), headers={'content-type': 'text/html'})
+
+    result = crawl(handler, 3, max_concurrency=4)
+    assert sorted(result['pages']) == ['https://site.test/', 'https://site.test/a', 'https://site.test/b']
+
+def test_crawls_share_the_process_throttle():
+    async def scenario():
+        first = BaseCrawler('https://site.test/', snapshot_store=None)
+        second = BaseCrawler('https://site.test/blog/', snapshot_store=None)
+        own = BaseCrawler('https://site.test/', snapshot_store=None, per_host_concurrency=1)
+        return first.throttle, second.throttle, own.throttle, get_host_throttle()
+
+    first, second, own, shared = asyncio.run(scenario())
+    assert first is second is shared
+    assert own is not shared and own.per_host_concurrency == 1
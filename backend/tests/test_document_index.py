@@ -0,0 +1,46 @@
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from modules import document_index
+from modules.document_index import DocumentIndex, get_document_index
+
+WORDS = ['sourdough', 'starter', 'flour', 'bread', 'Bread', 'rye', 'oven', 'a', 'the', 'of']
+
+def legacy_context(content: str, phrase: str, context_length: int = 100) -> str:
+    """The per-phrase regex scan the context finders used before the index."""
+    match = re.search(r'\b' + re.escape(phrase.lower()) + r'\b', content.lower())
+    if not match:
+        return ""
+    start_pos, end_pos = match.span()
+    original_phrase = content[start_pos:end_pos]
+    context = content[max(0, start_pos - context_length):min(len(content), end_pos + context_length)].strip()
+    return context.replace(original_phrase, f"[{original_phrase}]")
+
+def test_index_lookups_match_the_regex_scan():
+    rng = random.Random(0)
+    content = ' '.join(rng.choice(WORDS) + rng.choice(['', '', ',', '.', '-']) for _ in range(400))
+    index = DocumentIndex(content)
+    phrases = [' '.join(rng.choices(WORDS, k=rng.randint(1, 3))) for _ in range(200)]
+    phrases += ['sourdough starter of the rye oven', 'bread.', 'missing phrase']
+    for phrase in phrases:
+        pattern = re.compile(r'\b' + re.escape(phrase) + r'\b', re.IGNORECASE)
+        assert index.find_all(phrase) == [match.span() for match in pattern.finditer(content)]
+        assert index.context(phrase, 40) == legacy_context(content, phrase, 40)
+
+def test_indexes_are_cached_by_content(monkeypatch):
+    monkeypatch.setattr(document_index, '_index_cache', type(document_index._index_cache)())
+    monkeypatch.setattr(document_index, '_INDEX_CACHE_SIZE', 2)
+    first = get_document_index('the bread')
+    assert get_document_index(''.join(['the ', 'bread'])) is first
+    get_document_index('rye')
+    get_document_index('oven')
+    assert get_document_index('the bread') is not first
+    assert all(isinstance(key, bytes) for key in document_index._index_cache)
+
+def test_concurrent_lookups_share_one_cache(monkeypatch):
+    monkeypatch.setattr(document_index, '_index_cache', type(document_index._index_cache)())
+    documents = [f"post {i} about sourdough" for i in range(20)]
+    with ThreadPoolExecutor(8) as pool:
+        found = list(pool.map(lambda i: get_document_index(documents[i % 20]).find('sourdough'), range(2000)))
+    assert found == [(len(f"post {i % 20} about "), len(f"post {i % 20} about sourdough")) for i in range(2000)]
+    assert len(document_index._index_cache) == document_index._INDEX_CACHE_SIZE
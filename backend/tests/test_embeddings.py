@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import multiprocessing
+import numpy as np
+import pytest
+from modules.embeddings import EmbeddingBackend, EmbeddingService, VectorStore
+from modules.embeddings.backend import transformers_backend_name
+
+class HashingBackend(EmbeddingBackend):
+    """Offline backend: bag of hashed words, so shared words mean similar vectors."""
+
+    name = 'hashing'
+    dimension = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, hashlib.md5(word.encode()).digest()[0] % self.dimension] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+def test_backend_must_implement_embed():
+    class Incomplete(EmbeddingBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_checkpoints_sharing_a_basename_get_distinct_names(tmp_path):
+    (tmp_path / 'a' / 'model').mkdir(parents=True)
+    (tmp_path / 'b' / 'model').mkdir(parents=True)
+    (tmp_path / 'link').symlink_to(tmp_path / 'a')
+
+    first = transformers_backend_name(str(tmp_path / 'a' / 'model'), 256)
+    assert first.startswith('transformers:model-')
+    assert first != transformers_backend_name(str(tmp_path / 'b' / 'model'), 256)
+    assert first != transformers_backend_name(str(tmp_path / 'a' / 'model'), 128)
+    assert first == transformers_backend_name(str(tmp_path / 'link' / 'model') + '/', 256)
+
+def test_concurrent_calls_share_one_batch_and_the_store(tmp_path):
+    async def scenario():
+        backend = HashingBackend()
+        service = EmbeddingService(backend, VectorStore(str(tmp_path), backend.dimension), max_wait=0.01)
+        first, second = await asyncio.gather(service.embed(['sourdough starter', 'rye bread']),
+                                             service.embed(['rye bread', 'oven steam']))
+        again = await service.embed(['oven steam'])
+        return backend.calls, first, second, again
+
+    calls, first, second, again = asyncio.run(scenario())
+    assert calls == [3]
+    assert np.allclose(first[1], second[0])
+    assert np.allclose(again[0], second[1])
+
+def test_relevance_is_calibrated_onto_the_scoring_scale():
+    service = EmbeddingService(HashingBackend(), relevance_floor=0.1, relevance_ceiling=0.6)
+    assert service.calibrate(0.05) == 0.0
+    assert service.calibrate(0.35) == pytest.approx(0.5)
+    assert service.calibrate(0.9) == 1.0
+
+    scores = asyncio.run(service.relevance('sourdough bread baking guide', ['sourdough bread', 'car insurance']))
+    assert scores['sourdough bread'] > 0.8
+    assert scores['car insurance'] == 0.0
+
+def write_vectors(directory, offset, count):
+    store = VectorStore(directory, 8, initial_capacity=4)
+    for i in range(offset, offset + count):
+        store.put_many([f"key-{i}"], np.full((1, 8), i, dtype=np.float32))
+
+def test_processes_sharing_a_store_get_distinct_rows(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=write_vectors, args=(str(tmp_path), offset, 50)) for offset in (0, 1000)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    store = VectorStore(str(tmp_path), 8, initial_capacity=4)
+    keys = [f"key-{i}" for i in list(range(50)) + list(range(1000, 1050))]
+    found = store.get_many(keys)
+    assert len(store) == 100
+    for key in keys:
+        assert np.all(found[key] == int(key.split('-')[1]))
@@ -0,0 +1,72 @@
+import asyncio
+import random
+from benchmarks.blog_site import budget_coverage, build_blog_site
+from modules.crawlers.frontier import CrawlFrontier
+
+class RandomFrontier(CrawlFrontier):
+    def __init__(self, seed):
+        super().__init__(pattern_rules=[])
+        self.rng = random.Random(seed)
+
+    def _score(self, entry):
+        return self.rng.random()
+
+def crawl_order(graph, frontier, budget):
+    """Visit the graph the way the crawler's workers do, one page at a time."""
+    async def crawl():
+        frontier.push('/', 0, pinned=True)
+        seen = {'/'}
+        crawled = []
+        while len(crawled) < budget:
+            item = await frontier.get()
+            if item is None:
+                break
+            url, _, depth = item
+            crawled.append(url)
+            for target in dict.fromkeys(graph.get(url, [])):
+                if target in seen:
+                    frontier.reinforce(target, depth + 1)
+                else:
+                    seen.add(target)
+                    frontier.push(target, depth + 1)
+            frontier.task_done()
+        return crawled
+    return asyncio.run(crawl())
+
+def test_priority_order_spends_the_budget_on_linked_content():
+    graph = build_blog_site()
+    priority = budget_coverage(graph, crawl_order(graph, CrawlFrontier(), 50), 50)
+    random_order = sum(
+        budget_coverage(graph, crawl_order(graph, RandomFrontier(seed), 50), 50) for seed in range(5)
+    ) / 5
+    assert priority >= 0.85
+    assert priority > random_order + 0.2
+
+def test_heap_stays_bounded_under_repeated_links():
+    frontier = CrawlFrontier(pattern_rules=[])
+    for i in range(100):
+        frontier.push(f"/page-{i}", 3)
+    rng = random.Random(0)
+    for _ in range(20000):
+        frontier.reinforce(f"/page-{rng.randrange(100)}", 3)
+    assert frontier.heap_size() <= 2 * len(frontier) + 64
+
+def test_compaction_keeps_the_pop_order():
+    frontier = CrawlFrontier(pattern_rules=[])
+    rng = random.Random(1)
+    for i in range(200):
+        frontier.push(f"/page-{i}", rng.randrange(1, 6))
+    for _ in range(5000):
+        frontier.reinforce(f"/page-{rng.randrange(200)}", rng.randrange(1, 6))
+    scores = {url: entry[3] for url, entry in frontier._entries.items()}
+
+    async def drain():
+        popped = []
+        while (item := await frontier.get()) is not None:
+            popped.append(item[0])
+            frontier.task_done()
+        return popped
+
+    popped = asyncio.run(drain())
+    assert sorted(popped) == sorted(scores)
+    assert [scores[url] for url in popped] == sorted(scores.values())
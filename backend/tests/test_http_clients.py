@@ -0,0 +1,70 @@
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from modules.http_clients import PooledTransport, create_http_client
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = f"path {self.path}".encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_requests_share_one_pool_and_connection(server, monkeypatch):
+    monkeypatch.setenv('HTTP_HTTP2', 'false')
+    lookups = []
+
+    async def scenario():
+        client = create_http_client('test')
+        transport = client._transport
+        loop = asyncio.get_running_loop()
+        original = loop.getaddrinfo
+
+        async def counting_getaddrinfo(host, *args, **kwargs):
+            lookups.append(host)
+            # The test server only listens on IPv4
+            return [info for info in await original(host, *args, **kwargs) if info[0] == socket.AF_INET]
+        loop.getaddrinfo = counting_getaddrinfo
+
+        async with client:
+            first = await client.get(f"{server}/a")
+            second = await client.get(f"{server}/b")
+            connections = len(transport._pool.connections)
+        return transport, first.text, second.text, connections
+
+    transport, first, second, connections = asyncio.run(scenario())
+    assert isinstance(transport, PooledTransport)
+    assert not isinstance(transport, httpx.AsyncHTTPTransport)
+    assert (first, second) == ("path /a", "path /b")
+    assert connections == 1
+    assert lookups == ['localhost']
+
+def test_connection_errors_surface_as_httpx_errors():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=PooledTransport(httpx.Limits(), False, 60)) as client:
+            await client.get(f"http://127.0.0.1:{port}/")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scenario())
@@ -0,0 +1,40 @@
+import asyncio
+from modules import keyword_extractor
+from modules.keyword_extraction import relevance_scorer
+from modules.keyword_extraction.relevance_scorer import RelevanceScorer
+from modules.keyword_extraction.score_cache import ScoreCache
+
+PAGES = {
+    "sourdough starter " * 4: {'sourdough starter'},
+    "rye flour " * 6: {'rye flour'},
+    "whole grains " * 5: {'whole grains'},
+}
+
+class Extractor:
+    def extract_phrases(self, content):
+        return PAGES[content]
+
+    def find_exact_context(self, phrase, content):
+        return f"[{phrase}]"
+
+def test_batch_packs_every_page_into_one_scoring_request(inline_cpu_work, monkeypatch):
+    monkeypatch.setattr(keyword_extractor, 'get_phrase_extractor', lambda: Extractor())
+    monkeypatch.setattr(relevance_scorer, 'get_score_cache', lambda: ScoreCache(None))
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.delenv('RELEVANCE_BACKEND', raising=False)
+
+    requests = []
+    async def request_scores(self, messages, phrase_count):
+        requests.append(messages[-1]['content'])
+        return {'1': {'sourdough starter': 0.9}, '2': {'rye flour': 0.7}, '3': {'whole grains': 0.5}}
+    monkeypatch.setattr(RelevanceScorer, '_request_scores', request_scores)
+
+    results = asyncio.run(keyword_extractor.extract_keywords_batch(list(PAGES) + ['too short']))
+    assert len(requests) == 1
+    assert all(f"Page {i}:" in requests[0] for i in (1, 2, 3))
+    assert results == [
+        {'exact_match': ['sourdough starter (100.00%) - [sourdough starter]'], 'broad_match': [], 'related_match': []},
+        {'exact_match': [], 'broad_match': ['rye flour (100.00%) - [rye flour]'], 'related_match': []},
+        {'exact_match': [], 'broad_match': [], 'related_match': ['whole grains (100.00%) - [whole grains]']},
+        keyword_extractor.empty_keywords(),
+    ]
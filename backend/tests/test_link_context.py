@@ -0,0 +1,67 @@
+import glob
+import os
+import random
+from bs4 import BeautifulSoup
+from modules.crawlers.link_context import extract_link_contexts
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'html', '*.html')))
+
+def legacy_context(link_element, context_length):
+    """The re-serialize-and-reparse context the crawlers computed per link before."""
+    parent = link_element.find_parent(['p', 'div', 'section'])
+    if parent:
+        parts = str(parent).split(str(link_element))
+        if len(parts) >= 2:
+            before = BeautifulSoup(parts[0], 'html.parser').get_text(strip=True)
+            after = BeautifulSoup(parts[1], 'html.parser').get_text(strip=True)
+            before = before[-context_length:] if len(before) > context_length else before
+            after = after[:context_length] if len(after) > context_length else after
+            return f"{before} [LINK] {after}"
+    return ""
+
+def random_page(rng):
+    words = ['sourdough', 'starter', 'rye', 'flour', 'oven', 'crust', 'bake']
+    def text():
+        return ' '.join(rng.choices(words, k=rng.randint(0, 40)))
+    def block(depth):
+        tag = rng.choice(['p', 'div', 'section', 'span', 'li'])
+        children = []
+        for i in range(rng.randint(1, 4)):
+            choice = rng.random()
+            if choice < 0.4:
+                children.append(text())
+            elif choice < 0.7:
+                children.append(f'<a href="/post-{rng.randrange(10**6)}">{text()}<b>{text()}</b></a>')
+            elif depth < 4:
+                children.append(block(depth + 1))
+        return f"<{tag}>{''.join(children)}</{tag}>"
+    return f"<html><body><nav>{text()}</nav>{''.join(block(0) for _ in range(5))}</body></html>"
+
+def assert_matches_legacy(html, context_length):
+    soup = BeautifulSoup(html, 'html.parser')
+    contexts = extract_link_contexts(soup, context_length)
+    for link in soup.find_all('a'):
+        # Inert <template> text is not page text; the old reparse of the bare markup counted it
+        if link.find_parent('template'):
+            assert contexts[id(link)] == ' [LINK] '
+            continue
+        assert contexts.get(id(link), '') == legacy_context(link, context_length)
+
+def test_contexts_match_the_legacy_output_on_the_corpus():
+    for path in CORPUS:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        for context_length in (100, 150):
+            assert_matches_legacy(html, context_length)
+
+def test_contexts_match_the_legacy_output_on_nested_markup():
+    rng = random.Random(0)
+    for _ in range(200):
+        assert_matches_legacy(random_page(rng), rng.choice([5, 100, 150]))
+
+def test_repeated_links_each_get_their_own_context():
+    soup = BeautifulSoup('<p>first <a href="/a">more</a> middle <a href="/a">more</a> last</p>', 'html.parser')
+    contexts = extract_link_contexts(soup)
+    assert [contexts[id(link)] for link in soup.find_all('a')] == [
+        'first [LINK] middlemorelast', 'firstmoremiddle [LINK] last'
+    ]
@@ -0,0 +1,53 @@
+import glob
+import os
+import pytest
+from modules.crawlers import page_parser
+from modules.crawlers.base_crawler import BaseCrawler
+from modules.crawlers.html_extractor import HTMLExtractor
+from modules.crawlers.lxml_parser import parse_page_lxml
+
+CORPUS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'fixtures', 'html', '*.html')))
+URL = 'https://bread.example/guides/post'
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+def parse_with_html_parser(html, url, domain, monkeypatch):
+    monkeypatch.setattr(page_parser, 'PARSER_BACKEND', 'html.parser')
+    return page_parser.parse_page(html, url, domain)
+
+@pytest.mark.parametrize('path', CORPUS, ids=os.path.basename)
+def test_lxml_matches_html_parser(path, monkeypatch):
+    html = read(path)
+    expected = parse_with_html_parser(html, URL, 'bread.example', monkeypatch)
+
+    assert expected['content'] or expected['links']
+    assert parse_page_lxml(html, URL, 'bread.example') == expected
+
+def test_corpus_covers_the_tricky_cases():
+    documents = {os.path.basename(path): parse_page_lxml(read(path), URL, 'bread.example') for path in CORPUS}
+
+    article = documents['blog_article.html']
+    assert article['canonical'] == 'https://bread.example/guides/sourdough-starter/'
+    assert 'Privacy' not in article['content']
+    assert article['content'].startswith('A healthy')
+    assert 'https://bread.example/rye-flour' in [link['url'] for link in article['links']]
+    assert 'mailto:baker@example.com' not in [link['url'] for link in article['links']]
+    assert documents['no_body_tag.html']['content'] == ''
+    assert 'not content' not in documents['body_fallback.html']['content']
+
+@pytest.mark.skipif(page_parser.PARSER_BACKEND != 'lxml', reason="lxml is not installed")
+def test_markup_helpers_use_the_configured_parser(monkeypatch):
+    html = read(CORPUS[0])
+    expected = parse_with_html_parser(html, URL, 'bread.example', monkeypatch)
+    monkeypatch.setattr(page_parser, 'PARSER_BACKEND', 'lxml')
+
+    crawler = BaseCrawler('https://bread.example/', snapshot_store=None)
+    assert crawler._extract_content(html) == expected['content']
+    assert crawler._extract_links(html, URL) == expected['links']
+    assert page_parser.make_soup(html).builder.NAME == 'lxml'
+
+    links = HTMLExtractor.extract_links(html, URL, 'bread.example')
+    assert 'https://bread.example/rye-flour' in [link['url'] for link in links['internal_links']]
+    assert 'How to keep a sourdough starter alive' in HTMLExtractor.extract_main_content(html)
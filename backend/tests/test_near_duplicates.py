@@ -0,0 +1,41 @@
+from modules.crawlers.near_duplicates import NearDuplicateIndex
+
+BASE = (1 << 40) - 1
+
+def flip(fingerprint, *bits):
+    for bit in bits:
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+def test_near_duplicates_collapse_onto_the_shortest_url():
+    index = NearDuplicateIndex(max_distance=3)
+    index.add('https://site.test/post?print=1', flip(BASE, 1))
+    index.add('https://site.test/post', BASE)
+    index.add('https://site.test/post?utm=x', flip(BASE, 2, 3))
+    index.add('https://site.test/other', flip(BASE, 10, 20, 30, 50, 60))
+
+    assert index.clusters() == {'https://site.test/post': ['https://site.test/post?print=1', 'https://site.test/post?utm=x']}
+    assert index.canonical('https://site.test/other') == 'https://site.test/other'
+
+def test_chains_of_small_edits_do_not_merge_distant_pages():
+    index = NearDuplicateIndex(max_distance=3)
+    # Each page is 2 bits from the previous one, so the ends of the chain are 8 bits apart
+    bits = []
+    for i in range(5):
+        index.add(f"https://site.test/page-{i}", flip(BASE, *bits))
+        bits += [2 * i + 50, 2 * i + 51]
+
+    for url, members in index.clusters().items():
+        for member in members:
+            assert (index._fingerprints[url] ^ index._fingerprints[member]).bit_count() <= 3
+    assert index.canonical('https://site.test/page-4') != index.canonical('https://site.test/page-0')
+
+def test_a_shorter_url_only_takes_over_when_it_is_close_to_every_member():
+    index = NearDuplicateIndex(max_distance=3)
+    index.add('https://site.test/article-long', BASE)
+    index.add('https://site.test/article-longer', flip(BASE, 50, 51, 52))
+    # Within reach of the representative but 6 bits from the other member
+    index.add('https://site.test/a', flip(BASE, 0, 1, 2))
+
+    assert index.canonical('https://site.test/a') == 'https://site.test/article-long'
+    assert index.canonical('https://site.test/article-longer') == 'https://site.test/article-long'
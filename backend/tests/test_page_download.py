@@ -0,0 +1,42 @@
+import httpx
+
+CHUNK = b'<p>' + b'x' * 93 + b'</p>\n'
+
+def streamed(chunks, pulled, closed):
+    """A response body that records how many chunks were read and whether the stream was closed."""
+    async def body():
+        try:
+            for chunk in chunks:
+                pulled.append(len(chunk))
+                yield chunk
+        finally:
+            closed.append(True)
+    return body()
+
+def test_large_pages_stop_at_the_byte_cap(crawl, monkeypatch):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', '')
+    pulled, closed = [], []
+    chunks = [b'<html><body><article>'] + [CHUNK] * 10000
+
+    def handler(request):
+        return httpx.Response(200, content=streamed(chunks, pulled, closed), headers={'content-type': 'text/html'})
+
+    result = crawl(handler, max_page_bytes=1000)
+    assert sum(pulled) <= 1000 + len(CHUNK)
+    assert closed == [True]
+    assert result['truncated_pages'] == ['https://site.test/']
+    assert result['pages']['https://site.test/']['truncated']
+
+def test_pages_stop_after_the_body_even_when_split_across_chunks(crawl, monkeypatch):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', '')
+    pulled, closed = [], []
+    chunks = [b'<html><body><article><p>Short page.</p></article></', b'BODY >', b'</html>'] + [b'<!-- padding -->'] * 1000
+
+    def handler(request):
+        return httpx.Response(200, content=streamed(chunks, pulled, closed), headers={'content-type': 'text/html'})
+
+    result = crawl(handler, max_page_bytes=1000)
+    assert len(pulled) == 2
+    assert closed == [True]
+    assert result['truncated_pages'] == []
+    assert result['pages']['https://site.test/']['content'] == 'Short page.'
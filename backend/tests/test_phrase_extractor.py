@@ -0,0 +1,28 @@
+import random
+from benchmarks.phrase_extraction import legacy_candidates, tagged_sentence
+from modules.keyword_extraction import phrase_extractor
+from modules.keyword_extraction.phrase_extractor import PhraseExtractor, _candidate_ngrams
+
+def test_single_scan_finds_the_same_candidates():
+    rng = random.Random(0)
+    for _ in range(200):
+        sentence = tagged_sentence(rng, rng.randint(1, 20))
+        assert set(_candidate_ngrams(sentence)) == legacy_candidates(sentence)
+
+def test_sentences_are_tagged_in_one_batch(monkeypatch):
+    tags = {'Wild': 'JJ', 'yeast': 'NN', 'starter': 'NN', 'Rye': 'NN', 'flour': 'NN'}
+    batches = []
+
+    class Tagger:
+        def tag_sents(self, sentences):
+            batches.append(sentences)
+            return [[(word, tags.get(word, 'DT')) for word in sentence] for sentence in sentences]
+
+    monkeypatch.setattr(phrase_extractor, 'get_stop_words', lambda: frozenset())
+    monkeypatch.setattr(phrase_extractor, 'get_tagger', lambda: Tagger())
+    monkeypatch.setattr(phrase_extractor, 'sent_tokenize', lambda text: text.split('. '))
+    monkeypatch.setattr(phrase_extractor, 'word_tokenize', str.split)
+
+    phrases = PhraseExtractor().extract_phrases("Wild yeast starter. Rye flour")
+    assert len(batches) == 1 and len(batches[0]) == 2
+    assert {'Wild yeast', 'yeast starter', 'Wild yeast starter', 'Rye flour'} <= set(phrases)
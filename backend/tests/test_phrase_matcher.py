@@ -0,0 +1,47 @@
+import random
+import re
+from modules.keyword_extraction.density_calculator import DensityCalculator
+from modules.keyword_extraction.phrase_matcher import PhraseMatcher
+
+ALPHABET = 'aab ba_1é-. '
+
+def legacy_pattern(phrase):
+    return re.compile(r'\b' + re.escape(phrase) + r'\b')
+
+def random_phrases(rng, text, count):
+    phrases = set()
+    for _ in range(count):
+        start = rng.randrange(len(text))
+        phrases.add(text[start:start + rng.randint(1, 6)])
+    phrases.update(''.join(rng.choices(ALPHABET, k=rng.randint(1, 4))) for _ in range(count // 4))
+    return phrases
+
+def test_matches_agree_with_word_bounded_regex_search():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = ''.join(rng.choices(ALPHABET, k=rng.randint(1, 120)))
+        phrases = random_phrases(rng, text, 20)
+        matcher = PhraseMatcher(phrases)
+
+        counts = matcher.count(text)
+        positions = matcher.first_positions(text)
+        found = matcher.found_in(text)
+        for phrase in phrases:
+            matches = list(legacy_pattern(phrase).finditer(text))
+            assert counts.get(phrase, 0) == len(matches), (text, phrase)
+            assert positions.get(phrase) == (matches[0].span() if matches else None), (text, phrase)
+            assert (phrase in found) == bool(matches), (text, phrase)
+
+def test_density_matches_the_per_phrase_regex_scan():
+    rng = random.Random(1)
+    words = ['sourdough', 'starter', 'rye', 'flour', 'rye-flour', 'bake', 'baked', 'Bake']
+    content = ' '.join(rng.choices(words, k=500)) + '.'
+    phrases = {'sourdough starter', 'rye', 'flour', 'bake', 'rye flour', 'baked bake', 'missing'}
+
+    total_words = len(content.split())
+    expected = {}
+    for phrase in phrases:
+        count = len(re.findall(r'\b' + re.escape(phrase.lower()) + r'\b', content.lower()))
+        if count > 0:
+            expected[phrase] = (count * len(phrase.split())) / total_words
+    assert DensityCalculator().calculate_density(content, phrases) == expected
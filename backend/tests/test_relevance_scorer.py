@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from modules.keyword_extraction.relevance_scorer import RelevanceScorer
+from modules.keyword_extraction.score_cache import ScoreCache, content_fingerprint
+
+CONTENT = "Guide to sourdough baking with a starter, long fermentation and steam."
+
+def make_scorer(reply, cache):
+    scorer = RelevanceScorer(cache=cache)
+    scorer.api_key = 'test'
+    scorer.embeddings = None
+    requests = []
+
+    async def request_scores(messages, phrase_count):
+        requests.append(phrase_count)
+        return reply
+    scorer._request_scores = request_scores
+    return scorer, requests
+
+def test_phrases_missing_from_the_reply_are_not_cached():
+    cache = ScoreCache(None)
+    scorer, requests = make_scorer({'sourdough baking': 0.9}, cache)
+
+    scores = asyncio.run(scorer.score_phrases(CONTENT, ['sourdough baking', 'long fermentation']))
+    assert scores == {'sourdough baking': 0.9}
+
+    fingerprint = content_fingerprint(CONTENT, scorer.model)
+    assert asyncio.run(cache.get_many(fingerprint, ['sourdough baking', 'long fermentation'])) == {'sourdough baking': 0.9}
+
+    asyncio.run(scorer.score_phrases(CONTENT, ['sourdough baking', 'long fermentation']))
+    assert requests == [2, 1]
+
+def test_non_numeric_scores_are_dropped():
+    scorer, _ = make_scorer({'Sourdough  Baking': '0.9', 'long fermentation': 0.6, 'steam': True}, ScoreCache(None))
+
+    scores = asyncio.run(scorer.score_phrases(CONTENT, ['sourdough baking', 'long fermentation', 'steam']))
+    assert scores == {'long fermentation': 0.6}
+
+def test_batch_results_hold_only_filtered_scores():
+    scorer, _ = make_scorer({'1': {'sourdough baking': 0.8, 'extra': 'high'}, '2': {}}, ScoreCache(None))
+
+    results = asyncio.run(scorer.score_batch([
+        (CONTENT, ['sourdough baking']),
+        (CONTENT + " Second page.", ['long fermentation'])
+    ]))
+    assert results == [{'sourdough baking': 0.8}, {}]
+
+def test_disk_tier_is_pruned_every_n_writes(tmp_path):
+    cache = ScoreCache(str(tmp_path / 'scores.sqlite3'), max_disk_entries=5, prune_every=10)
+    count = lambda: cache._conn.execute("SELECT COUNT(*) FROM relevance_scores").fetchone()[0]
+
+    asyncio.run(cache.put_many('page', {f"phrase {i}": 0.5 for i in range(8)}))
+    assert count() == 8
+
+    asyncio.run(cache.put_many('page', {f"phrase {i}": 0.5 for i in range(8, 12)}))
+    assert count() == 5
+
+def test_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ScoreCache(str(tmp_path / 'scores.sqlite3'), max_memory_entries=1, prune_every=1)
+    threads = []
+    for name in ('_read_disk', '_write_disk'):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method: (threads.append(threading.current_thread()), method(*args))[1])
+
+    asyncio.run(cache.put_many('page', {'sourdough baking': 0.9, 'rye flour': 0.4}))
+    # The memory tier holds one entry, so the other is read back from disk
+    assert asyncio.run(cache.get_many('page', ['sourdough baking', 'rye flour'])) == {'sourdough baking': 0.9, 'rye flour': 0.4}
+    assert cache.stats()['disk_hits'] == 1
+    assert len(threads) == 2 and threading.main_thread() not in threads
@@ -0,0 +1,71 @@
+import asyncio
+from modules.request_coalescer import SingleFlight
+
+def test_joiners_replay_earlier_events_and_share_one_run():
+    async def scenario():
+        flights = SingleFlight()
+        runs = []
+        release = asyncio.Event()
+
+        async def produce():
+            runs.append(1)
+            yield 1
+            await release.wait()
+            yield 2
+
+        async def collect():
+            return [event async for event in flights.stream('page', produce)]
+
+        first = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        release.set()
+        return await first, await second, runs, flights.in_flight()
+
+    first, second, runs, in_flight = asyncio.run(scenario())
+    assert first == second == [1, 2]
+    assert runs == [1]
+    assert in_flight == 0
+
+def test_stream_is_cancelled_once_every_caller_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        cleaned_up = asyncio.Event()
+
+        async def produce():
+            try:
+                yield 1
+                await asyncio.sleep(60)
+                yield 2
+            finally:
+                cleaned_up.set()
+
+        events = flights.stream('page', produce)
+        assert await events.__anext__() == 1
+        await events.aclose()
+        await asyncio.wait_for(cleaned_up.wait(), 1)
+        return flights.in_flight()
+
+    assert asyncio.run(scenario()) == 0
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def produce():
+            yield 1
+            raise ValueError("boom")
+
+        async def collect():
+            seen = []
+            try:
+                async for event in flights.stream('page', produce):
+                    seen.append(event)
+            except ValueError as e:
+                seen.append(str(e))
+            return seen
+
+        return await asyncio.gather(collect(), collect())
+
+    assert asyncio.run(scenario()) == [[1, 'boom'], [1, 'boom']]
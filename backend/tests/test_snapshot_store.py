@@ -0,0 +1,37 @@
+import threading
+import httpx
+from modules.crawlers.snapshot_store import SnapshotStore
+
+PAGE = '<html><body><article><p>Crawled page.</p><a href="/gone">Gone</a></article></body></html>'
+
+class RecordingStore(SnapshotStore):
+    """Snapshot store that records the thread each call runs in."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = []
+
+        for name in ('get', 'put', 'touch', 'record_document', 'live_urls', 'tombstone'):
+            setattr(self, name, self._recorded(name, getattr(self, name)))
+
+    def _recorded(self, name, method):
+        def call(*args, **kwargs):
+            self.calls.append((name, threading.current_thread()))
+            return method(*args, **kwargs)
+        return call
+
+def test_crawler_keeps_sqlite_off_the_event_loop(crawl, tmp_path, monkeypatch):
+    monkeypatch.setenv('CRAWL_CHECKPOINT_DIR', '')
+    store = RecordingStore(str(tmp_path / 'snapshots.sqlite3'))
+    store.put('https://site.test/old', PAGE)
+    store.calls.clear()
+
+    def handler(request):
+        if request.url.path == '/gone':
+            return httpx.Response(404)
+        return httpx.Response(200, text=PAGE, headers={'content-type': 'text/html'})
+
+    result = crawl(handler, snapshot_store=store)
+    assert sorted(result['changes']['removed']) == ['https://site.test/gone', 'https://site.test/old']
+    assert {name for name, _ in store.calls} == {'get', 'put', 'record_document', 'live_urls', 'tombstone'}
+    assert all(thread is not threading.main_thread() for _, thread in store.calls)
@@ -0,0 +1,64 @@
+import asyncio
+import random
+from collections import Counter
+import numpy as np
+import pytest
+
+# The link_suggester package imports the OpenAI client on load
+pytest.importorskip('openai')
+from modules.link_suggester import page_index as page_index_module
+from modules.link_suggester.page_index import SitePageIndex
+from modules.link_suggester.tfidf_engine import TfidfEngine
+
+WORDS = [f"word{i}" for i in range(300)]
+
+def random_counts(rng):
+    return Counter(rng.choices(WORDS, k=rng.randint(5, 40)))
+
+def assert_same_scores(engine, expected, text):
+    scores, reference = engine.score(text), expected.score(text)
+    assert set(engine.rows) == set(expected.rows)
+    for url, row in expected.rows.items():
+        assert scores[engine.rows[url]] == pytest.approx(reference[row], abs=1e-5)
+
+def test_updates_score_like_a_rebuild():
+    rng = random.Random(0)
+    pages = {f"https://site.test/{i}": random_counts(rng) for i in range(500)}
+    engine = TfidfEngine.build(pages)
+    query = ' '.join(rng.choices(WORDS, k=20))
+
+    for _ in range(40):
+        changed = {f"https://site.test/{rng.randint(0, 600)}": random_counts(rng) for _ in range(3)}
+        removed = [url for url in rng.sample(sorted(pages), 2) if url not in changed]
+        for url in removed:
+            del pages[url]
+        pages.update(changed)
+        engine = engine.updated(changed, removed)
+        assert_same_scores(engine, TfidfEngine.build(pages), query)
+
+    # New terms are scored too
+    engine = engine.updated({"https://site.test/new": Counter({'sourdough': 3, 'word1': 1})})
+    scores = engine.score('sourdough')
+    assert scores[engine.rows["https://site.test/new"]] > 0
+    assert np.count_nonzero(scores) == 1
+
+def test_the_site_index_applies_changes_without_rebuilding(monkeypatch):
+    index = SitePageIndex('site.test')
+    for i in range(50):
+        index.add_page({'url': f"https://site.test/post-{i}", 'title': f"Post {i}", 'content': f"Bread notes {i} rye"})
+    builds = []
+    original = TfidfEngine.build
+    monkeypatch.setattr(page_index_module.TfidfEngine, 'build', lambda counts: (builds.append(len(counts)), original(counts))[1])
+
+    async def scenario():
+        first = await index.tfidf_engine()
+        index.add_page({'url': "https://site.test/post-3", 'title': "Sourdough", 'content': "Sourdough starter guide"})
+        index.remove_page("https://site.test/post-4")
+        second = await index.tfidf_engine()
+        return first, second, await index.tfidf_engine()
+
+    first, second, third = asyncio.run(scenario())
+    assert builds == [50]
+    assert second is not first and third is second
+    assert "https://site.test/post-4" not in second.rows
+    assert second.score('sourdough starter')[second.rows["https://site.test/post-3"]] > 0.5
@@ -0,0 +1,29 @@
+import pytest
+from modules.crawlers.url_canonicalizer import UrlCanonicalizer
+
+@pytest.mark.parametrize('url, canonical', [
+    ('HTTPS://Site.TEST/Blog/Post', 'https://site.test/Blog/Post'),
+    ('https://site.test:443/a', 'https://site.test/a'),
+    ('http://site.test:80/a', 'http://site.test/a'),
+    ('https://site.test:8443/a', 'https://site.test:8443/a'),
+    ('https://site.test/a#comments', 'https://site.test/a'),
+    ('https://site.test/a?utm_source=mail&gclid=1&fbclid=2&page=2', 'https://site.test/a?page=2'),
+    ('https://site.test/a?b=2&a=1&c=', 'https://site.test/a?a=1&b=2&c='),
+    ('https://site.test/a/', 'https://site.test/a'),
+    ('https://site.test', 'https://site.test/'),
+    ('https://site.test/a/./b/../c', 'https://site.test/a/c'),
+])
+def test_variants_canonicalize_to_one_form(url, canonical):
+    assert UrlCanonicalizer().canonicalize(url) == canonical
+
+def test_ref_parameters_that_select_content_are_kept():
+    assert UrlCanonicalizer().canonicalize('https://site.test/compare?ref=v2') == 'https://site.test/compare?ref=v2'
+
+def test_query_order_and_trailing_slash_can_be_kept():
+    canonicalizer = UrlCanonicalizer(sort_query=False, strip_trailing_slash=False)
+    assert canonicalizer.canonicalize('https://site.test/a/?b=2&a=1') == 'https://site.test/a/?b=2&a=1'
+
+def test_same_site_rel_canonical_is_followed():
+    canonicalizer = UrlCanonicalizer()
+    assert canonicalizer.page_url('https://site.test/a?page=1', 'https://site.test/a', 'site.test') == 'https://site.test/a'
+    assert canonicalizer.page_url('https://site.test/a', 'https://other.test/a', 'site.test') == 'https://site.test/a'
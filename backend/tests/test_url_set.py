@@ -0,0 +1,27 @@
+from modules.crawlers.url_set import BloomFilter, HashedUrlSet
+
+URLS = [f"https://site.test/post-{i}" for i in range(20000)]
+
+def test_hashed_set_keeps_every_url_across_resizes():
+    urls = HashedUrlSet(initial_capacity=4)
+    assert all(urls.add(url) for url in URLS)
+    assert len(urls) == len(URLS)
+    assert not any(urls.add(url) for url in URLS)
+    assert all(url in urls for url in URLS)
+    assert not any(f"https://site.test/page-{i}" in urls for i in range(20000))
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=len(URLS), error_rate=0.01)
+    for url in URLS:
+        bloom.add(url)
+    assert all(url in bloom for url in URLS)
+    assert len(bloom) <= len(URLS)
+
+    false_positives = sum(f"https://site.test/page-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+def test_bloom_filter_reports_only_new_urls_as_added():
+    bloom = BloomFilter(capacity=1000, error_rate=0.001)
+    assert bloom.add('https://site.test/a')
+    assert not bloom.add('https://site.test/a')
+    assert len(bloom) == 1
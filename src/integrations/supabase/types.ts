@@ -192,7 +192,18 @@ export type Database = {
       }
     }
     Functions: {
-      [_ in never]: never
+      search_pages_per_keyword: {
+        Args: {
+          keywords: string[]
+          per_keyword: number
+        }
+        Returns: {
+          keyword: string
+          url: string
+          title: string | null
+          content: string | null
+        }[]
+      }
     }
     Enums: {
       [_ in never]: never
@@ -0,0 +1,20 @@
+-- Candidate search for the link suggester: the top `per_keyword` pages
+-- matching each keyword as a phrase, ranked per keyword, in one call.
+create index if not exists pages_content_search
+  on public.pages using gin (to_tsvector('english', coalesce(content, '')));
+
+create or replace function public.search_pages_per_keyword(keywords text[], per_keyword integer)
+returns table (keyword text, url text, title text, content text)
+language sql
+stable
+as $$
+  select k.keyword, p.url, p.title, p.content
+  from unnest(keywords) as k(keyword)
+  cross join lateral (
+    select pages.url, pages.title, pages.content
+    from public.pages
+    where to_tsvector('english', coalesce(pages.content, '')) @@ phraseto_tsquery('english', k.keyword)
+    order by ts_rank(to_tsvector('english', coalesce(pages.content, '')), phraseto_tsquery('english', k.keyword)) desc
+    limit per_keyword
+  ) p;
+$$;